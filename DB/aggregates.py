@@ -0,0 +1,186 @@
+# DB/aggregates.py
+from collections import Counter, defaultdict
+from sqlalchemy import select, delete
+from sqlalchemy.orm import Session
+from sqlalchemy.dialects.sqlite import insert
+from . import models
+from .utils import parse_review_date
+
+# SQLite erlaubt nur eine begrenzte Anzahl gebundener Parameter pro Statement
+UPSERT_CHUNK_SIZE = 100
+LOOKUP_CHUNK_SIZE = 500
+
+# Die produkt_id von Produkten und Reviews wird je Session neu vergeben (1..n). Die Tabellen je Produkt
+# verweisen deshalb auf products.id, die Marken-Kennzahlen gelten je Marke und Session, damit erneut
+# gecrawlte Produkte und Reviews nicht über alle Sessions aufsummiert werden.
+BRAND_KEY = ["marke", "session_date", "session_time"]
+
+
+def upsert_counts(db: Session, model, key_columns: list, rows: list):
+    """
+    Addiert die Zählerwerte der übergebenen Zeilen auf die bestehenden Aggregat-Zeilen (UPSERT).
+    Fehlende Zeilen werden angelegt, vorhandene um die Werte erhöht.
+    :param db: Die Datenbank-Session
+    :param model: Die Aggregat-Tabelle (ORM-Klasse)
+    :param key_columns: Namen der Schlüsselspalten
+    :param rows: Liste von Dictionaries mit Schlüssel- und Zählerspalten
+    """
+    if not rows:
+        return
+    table = model.__table__
+    value_columns = [column for column in rows[0] if column not in key_columns]
+    for start in range(0, len(rows), UPSERT_CHUNK_SIZE):
+        stmt = insert(table).values(rows[start:start + UPSERT_CHUNK_SIZE])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=key_columns,
+            set_={column: table.c[column] + stmt.excluded[column] for column in value_columns}
+        )
+        db.execute(stmt)
+
+
+def update_product_aggregates(db: Session, products: list):
+    """
+    Schreibt Preisverlauf und Marken-Kennzahlen für neu eingefügte Produkte fort.
+    Es wird kein Commit ausgeführt, damit die Aggregate in derselben Transaktion wie der Ingest landen.
+    :param db: Die Datenbank-Session
+    :param products: Liste bereits geflushter Product-Objekte (mit gesetzter id)
+    """
+    brands = defaultdict(Counter)
+    history = []
+    for product in products:
+        history.append({
+            "produkt_id": product.id,
+            "artikelnummer": product.artikelnummer,
+            "preis": product.preis,
+            "promo_preis": product.promo_preis,
+            "on_promo": bool(product.on_promo),
+            "session_date": product.session_date,
+            "session_time": product.session_time,
+        })
+        if product.marke is None:
+            continue
+        brand = brands[(product.marke, product.session_date, product.session_time)]
+        brand["anzahl_produkte"] += 1
+        brand["anzahl_promo"] += 1 if product.on_promo else 0
+        if product.preis is not None:
+            brand["preis_summe"] += product.preis
+            brand["preis_anzahl"] += 1
+
+    if history:
+        db.execute(insert(models.PriceHistory.__table__), history)
+
+    upsert_counts(db, models.BrandRollup, BRAND_KEY, [
+        {
+            "marke": marke,
+            "session_date": session_date,
+            "session_time": session_time,
+            "anzahl_produkte": counts["anzahl_produkte"],
+            "anzahl_promo": counts["anzahl_promo"],
+            "preis_summe": float(counts["preis_summe"]),
+            "preis_anzahl": counts["preis_anzahl"],
+            "anzahl_reviews": 0,
+            "rating_summe": 0,
+        }
+        for (marke, session_date, session_time), counts in brands.items()
+    ])
+
+
+def _products_of_reviews(db: Session, reviews: list) -> dict:
+    """
+    Ordnet die Reviews den Produkt-Zeilen ihrer Session zu (eine Abfrage je Session und Block von IDs).
+    :return: Dictionary (produkt_id, session_date, session_time) -> (products.id, marke)
+    """
+    produkt_ids = defaultdict(set)
+    for review in reviews:
+        produkt_ids[(review.session_date, review.session_time)].add(review.produkt_id)
+
+    product = models.Product
+    lookup = {}
+    for (session_date, session_time), ids in produkt_ids.items():
+        ids = list(ids)
+        for start in range(0, len(ids), LOOKUP_CHUNK_SIZE):
+            rows = db.execute(
+                select(product.id, product.produkt_id, product.marke)
+                .where(product.session_date == session_date, product.session_time == session_time,
+                       product.produkt_id.in_(ids[start:start + LOOKUP_CHUNK_SIZE]))
+            )
+            for product_id, produkt_id, marke in rows:
+                lookup[(produkt_id, session_date, session_time)] = (product_id, marke)
+    return lookup
+
+
+def update_review_aggregates(db: Session, reviews: list):
+    """
+    Schreibt Rating-Histogramme, Review-Anzahl pro Monat und die Review-Kennzahlen der Marken fort.
+    Es wird kein Commit ausgeführt, damit die Aggregate in derselben Transaktion wie der Ingest landen.
+    :param db: Die Datenbank-Session
+    :param reviews: Liste bereits geflushter Review-Objekte
+    """
+    # Reviews ohne Produkt-Zeile in ihrer Session lassen sich keinem Produkt zuordnen und werden übersprungen
+    lookup = _products_of_reviews(db, reviews)
+    ratings = Counter()
+    months = Counter()
+    brands = defaultdict(Counter)
+    for review in reviews:
+        product = lookup.get((review.produkt_id, review.session_date, review.session_time))
+        if product is None:
+            continue
+        product_id, marke = product
+        if review.rating is not None:
+            ratings[(product_id, review.rating)] += 1
+            if marke is not None:
+                brand = brands[(marke, review.session_date, review.session_time)]
+                brand["anzahl_reviews"] += 1
+                brand["rating_summe"] += review.rating
+        review_date = review.review_date or parse_review_date(review.date, review.session_date)
+        if review_date is not None:
+            months[(product_id, review_date.strftime("%Y-%m"))] += 1
+
+    upsert_counts(db, models.ProductRatingHistogram, ["produkt_id", "rating"], [
+        {"produkt_id": produkt_id, "rating": rating, "anzahl": count}
+        for (produkt_id, rating), count in ratings.items()
+    ])
+    upsert_counts(db, models.ReviewMonthCount, ["produkt_id", "monat"], [
+        {"produkt_id": produkt_id, "monat": monat, "anzahl": count}
+        for (produkt_id, monat), count in months.items()
+    ])
+    upsert_counts(db, models.BrandRollup, BRAND_KEY, [
+        {
+            "marke": marke,
+            "session_date": session_date,
+            "session_time": session_time,
+            "anzahl_produkte": 0,
+            "anzahl_promo": 0,
+            "preis_summe": 0.0,
+            "preis_anzahl": 0,
+            "anzahl_reviews": counts["anzahl_reviews"],
+            "rating_summe": counts["rating_summe"],
+        }
+        for (marke, session_date, session_time), counts in brands.items()
+    ])
+
+
+def rebuild_aggregates(db: Session, chunk_size: int = 5000):
+    """
+    Baut alle Aggregat-Tabellen aus den Basistabellen neu auf, z.B. für eine bereits befüllte DB
+    (siehe ``migrate_database``).
+    :param db: Die Datenbank-Session
+    :param chunk_size: Anzahl der Datensätze, die pro Schritt verarbeitet werden
+    """
+    for model in (models.ProductRatingHistogram, models.ReviewMonthCount,
+                  models.PriceHistory, models.BrandRollup):
+        db.execute(delete(model))
+
+    for source, update in ((models.Product, update_product_aggregates),
+                           (models.Review, update_review_aggregates)):
+        last_id = 0
+        while True:
+            batch = db.scalars(
+                select(source).where(source.id > last_id).order_by(source.id).limit(chunk_size)
+            ).all()
+            if not batch:
+                break
+            update(db, batch)
+            last_id = batch[-1].id
+            db.expunge_all()
+    db.commit()
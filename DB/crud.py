@@ -2,65 +2,131 @@
 from sqlalchemy.orm import Session
 from datetime import date, time
 from . import models
+from .aggregates import update_product_aggregates, update_review_aggregates
+from .dedup import flag_duplicates
+from .utils import parse_review_date
+from .records import (ProductRecord, ReviewRecord, PRODUCT_HASH_FIELDS, REVIEW_HASH_FIELDS, to_record,
+                      content_hash)
+from metrics import METRICS
+
+
+def _build_product(product_data, session_date: date, session_time: time) -> models.Product:
+    product = to_record(product_data, ProductRecord)
+    return models.Product(
+        product_url=product.produkt_url,
+        artikelnummer=product.artikelnummer,
+        produktname=product.produktname,
+        preis=product.preis,
+        promo_preis=product.promo_preis,
+        on_promo=product.on_promo,
+        waehrung=product.waehrung,
+        marke=product.marke,
+        artikelbeschreibung=product.artikelbeschreibung,
+        inhaltsstoffe=product.inhaltsstoffe,
+        gesamtrating=product.gesamtrating,
+        gesamtanzahl_reviews=product.gesamtanzahl_reviews,
+        produkt_id=product.produkt_id,
+        session_date=session_date,
+        session_time=session_time,
+        content_hash=content_hash(product, PRODUCT_HASH_FIELDS)
+    )
+
+
+def _build_review(review_data, session_date: date, session_time: time) -> models.Review:
+    review = to_record(review_data, ReviewRecord)
+    return models.Review(
+        reviewer=review.reviewer,
+        review=review.review,
+        rating=review.rating,
+        date=review.date,
+        review_date=parse_review_date(review.date, session_date),
+        author_location=review.author_location,
+        review_count=review.review_count,
+        review_votes=review.review_votes,
+        gender=review.gender,
+        age=review.age,
+        review_id=review.review_id,
+        produkt_id=review.produkt_id,
+        session_date=session_date,
+        session_time=session_time,
+        content_hash=content_hash(review, REVIEW_HASH_FIELDS)
+    )
 
 
 def create_product(db: Session, product_data: dict, session_date: date, session_time: time):
     """
     Fügt ein neues Produkt zur Datenbank hinzu.
     :param db: Die Datenbank-Session
-    :param product_data: Ein Dictionary mit den Produktdaten
+    :param product_data: Die Produktdaten (ProductRecord oder Dictionary mit den JSON-Schlüsseln)
     :param session_date: Datum der Crawling-Session
     :param session_time: Uhrzeit der Crawling-Session
     :return: Das hinzugefügte Produkt
     """
-    db_product = models.Product(
-        product_url=product_data["Produkt_URL"],
-        artikelnummer=product_data["Artikelnummer"],
-        produktname=product_data["Produktname"],
-        preis=product_data["Preis"],
-        promo_preis=product_data["Promo_Preis"],
-        on_promo=product_data["on_promo"],
-        waehrung=product_data["Währung"],
-        marke=product_data["Marke"],
-        artikelbeschreibung=product_data["Artikelbeschreibung"],
-        inhaltsstoffe=product_data["Inhaltsstoffe"],
-        gesamtrating=product_data["GesamtRating"],
-        gesamtanzahl_reviews=product_data["Gesamtanzahl_Reviews"],
-        produkt_id=product_data["Produkt_ID"],
-        session_date=session_date,
-        session_time=session_time
-    )
-    db.add(db_product)
-    db.commit()
-    db.refresh(db_product)
-    return db_product
+    return create_products(db, [product_data], session_date, session_time)[0]
 
 
 def create_review(db: Session, review_data: dict, session_date: date, session_time: time):
     """
     Fügt eine neue Bewertung zur Datenbank hinzu.
     :param db: Die Datenbank-Session
-    :param review_data: Ein Dictionary mit den Bewertungsdaten
+    :param review_data: Die Bewertungsdaten (ReviewRecord oder Dictionary mit den JSON-Schlüsseln)
     :param session_date: Datum der Crawling-Session
     :param session_time: Uhrzeit der Crawling-Session
     :return: Die hinzugefügte Bewertung
     """
-    db_review = models.Review(
-        reviewer=review_data["Reviewer"],
-        review=review_data["Review"],
-        rating=review_data["Rating"],
-        date=review_data["Date"],
-        author_location=review_data["Author_Location"],
-        review_count=review_data["Review_Count"],
-        review_votes=review_data["Review_Votes"],
-        gender=review_data["Gender"],
-        age=review_data["Age"],
-        review_id=review_data["Review_ID"],
-        produkt_id=review_data["Produkt_ID"],
-        session_date=session_date,
-        session_time=session_time
-    )
-    db.add(db_review)
-    db.commit()
-    db.refresh(db_review)
-    return db_review
+    return create_reviews(db, [review_data], session_date, session_time)[0]
+
+
+def create_products(db: Session, products_data: list, session_date: date, session_time: time):
+    """
+    Fügt mehrere Produkte in einer Transaktion hinzu und schreibt die Aggregat-Tabellen fort.
+    :param db: Die Datenbank-Session
+    :param products_data: Eine Liste von Produktdaten (ProductRecord oder Dictionary)
+    :param session_date: Datum der Crawling-Session
+    :param session_time: Uhrzeit der Crawling-Session
+    :return: Die hinzugefügten Produkte
+    """
+    with METRICS.timer("db_batch_seconds", table="products", phase="aufbau"):
+        db_products = [_build_product(product_data, session_date, session_time) for product_data in products_data]
+    try:
+        with METRICS.timer("db_batch_seconds", table="products", phase="insert"):
+            db.add_all(db_products)
+            db.flush()
+        with METRICS.timer("db_batch_seconds", table="products", phase="aggregate"):
+            update_product_aggregates(db, db_products)
+        with METRICS.timer("db_batch_seconds", table="products", phase="commit"):
+            db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    METRICS.inc("db_rows_total", len(db_products), table="products")
+    return db_products
+
+
+def create_reviews(db: Session, reviews_data: list, session_date: date, session_time: time):
+    """
+    Fügt mehrere Bewertungen in einer Transaktion hinzu, markiert nahezu identische Texte als Duplikat
+    und schreibt die Aggregat-Tabellen fort.
+    :param db: Die Datenbank-Session
+    :param reviews_data: Eine Liste von Bewertungsdaten (ReviewRecord oder Dictionary)
+    :param session_date: Datum der Crawling-Session
+    :param session_time: Uhrzeit der Crawling-Session
+    :return: Die hinzugefügten Bewertungen
+    """
+    with METRICS.timer("db_batch_seconds", table="reviews", phase="aufbau"):
+        db_reviews = [_build_review(review_data, session_date, session_time) for review_data in reviews_data]
+    try:
+        with METRICS.timer("db_batch_seconds", table="reviews", phase="insert"):
+            db.add_all(db_reviews)
+            db.flush()
+        with METRICS.timer("db_batch_seconds", table="reviews", phase="duplikate"):
+            flag_duplicates(db, db_reviews)
+        with METRICS.timer("db_batch_seconds", table="reviews", phase="aggregate"):
+            update_review_aggregates(db, db_reviews)
+        with METRICS.timer("db_batch_seconds", table="reviews", phase="commit"):
+            db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    METRICS.inc("db_rows_total", len(db_reviews), table="reviews")
+    return db_reviews
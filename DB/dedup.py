@@ -0,0 +1,164 @@
+# DB/dedup.py
+import re
+import zlib
+import hashlib
+import numpy as np
+from sqlalchemy import select, delete, update
+from sqlalchemy.orm import Session
+from sqlalchemy.dialects.sqlite import insert
+from . import models
+
+# MinHash/LSH-Index über Review-Texte: 64 Permutationen in 16 Bänder à 4 Zeilen, damit werden Paare ab
+# ca. 50 % Ähnlichkeit zu Kandidaten. Als Duplikat gilt ein Kandidat erst ab der geschätzten Jaccard-Ähnlichkeit
+# SIMILARITY_THRESHOLD der Wort-Shingles.
+NUM_PERM = 64
+BANDS = 16
+ROWS_PER_BAND = NUM_PERM // BANDS
+SHINGLE_SIZE = 3
+SIMILARITY_THRESHOLD = 0.8
+# Kurze Reviews ("Top!", "Riecht gut") sind echte Einzelmeinungen und werden nicht zusammengefasst
+MIN_WORDS = 8
+# SQLite erlaubt nur eine begrenzte Anzahl gebundener Parameter pro IN-Abfrage
+QUERY_CHUNK_SIZE = 500
+
+# Hinweis, den der Shop Reviews mit Anreiz voranstellt; er ist reiner Textbaustein und verfälscht sonst
+# sowohl die Ähnlichkeit als auch die Analyse ("kostenlose Probe").
+_INCENTIVE_NOTE = re.compile(r"^\s*\[Diese Bewertung wurde nach Erhalt eines Anreizes.*?eingereicht\.\]\s*", re.DOTALL)
+_WORD = re.compile(r"\w+")
+
+# Universelles Hashing (a * x + b) mod p mit festem Seed, damit Signaturen über Läufe hinweg vergleichbar bleiben
+_PRIME = np.uint64(4294967311)
+_rng = np.random.default_rng(20240601)
+_PERM_A = _rng.integers(1, 2 ** 31, NUM_PERM, dtype=np.uint64)
+_PERM_B = _rng.integers(0, 2 ** 31, NUM_PERM, dtype=np.uint64)
+
+
+def normalize_review_text(text: str) -> str:
+    """
+    Entfernt den Anreiz-Hinweis am Anfang eines Review-Textes.
+    :param text: Der Review-Text
+    :return: Der Text ohne Textbaustein
+    """
+    return _INCENTIVE_NOTE.sub("", text or "", count=1)
+
+
+def review_signature(text: str):
+    """
+    Berechnet die MinHash-Signatur eines Review-Textes über Wort-Shingles.
+    :param text: Der Review-Text
+    :return: numpy-Array mit NUM_PERM Werten oder None, wenn der Text zu kurz ist
+    """
+    words = _WORD.findall(normalize_review_text(text).lower())
+    if len(words) < MIN_WORDS:
+        return None
+    shingles = {" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+    hashes = np.fromiter((zlib.crc32(shingle.encode("utf-8")) for shingle in shingles), np.uint64, len(shingles))
+    return ((np.outer(hashes, _PERM_A) + _PERM_B) % _PRIME).min(axis=0)
+
+
+def band_keys(signature) -> list:
+    """
+    Teilt eine Signatur in LSH-Bänder und liefert je Band einen Bucket-Schlüssel "band:hash".
+    """
+    return [
+        f"{band}:{hashlib.blake2b(signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND].tobytes(), digest_size=8).hexdigest()}"
+        for band in range(BANDS)
+    ]
+
+
+def _chunks(values: list, size: int = QUERY_CHUNK_SIZE):
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def flag_duplicates(db: Session, reviews: list) -> list:
+    """
+    Ordnet neu eingefügte Reviews einem bestehenden Cluster zu oder nimmt sie als Original in den Index auf.
+    Vergleicht wird gegen den gespeicherten Index und gegen die vorherigen Reviews desselben Batches.
+    Es wird kein Commit ausgeführt, damit der Index in derselben Transaktion wie der Ingest landet.
+    :param db: Die Datenbank-Session
+    :param reviews: Reviews mit gesetzter id und review (z.B. geflushte Review-Objekte), nach id aufsteigend
+    :return: Liste der angelegten Duplikat-Zeilen (review_id, cluster_id, aehnlichkeit)
+    """
+    entries = []
+    for review in reviews:
+        signature = review_signature(review.review)
+        if signature is not None:
+            entries.append((review.id, signature, band_keys(signature)))
+    if not entries:
+        return []
+
+    # Kandidaten aus dem gespeicherten Index: Reviews, die mindestens ein Band mit einem neuen Review teilen
+    buckets = {}
+    all_keys = list({key for _, _, keys in entries for key in keys})
+    for chunk in _chunks(all_keys):
+        for bucket, review_id in db.execute(
+            select(models.ReviewLshBucket.bucket, models.ReviewLshBucket.review_id)
+            .where(models.ReviewLshBucket.bucket.in_(chunk))
+        ):
+            buckets.setdefault(bucket, []).append(review_id)
+
+    signatures = {}
+    candidate_ids = list({review_id for review_ids in buckets.values() for review_id in review_ids})
+    for chunk in _chunks(candidate_ids):
+        for review_id, signatur in db.execute(
+            select(models.ReviewSignature.review_id, models.ReviewSignature.signatur)
+            .where(models.ReviewSignature.review_id.in_(chunk))
+        ):
+            signatures[review_id] = np.frombuffer(signatur, dtype=np.uint64)
+
+    duplicates, new_signatures, new_buckets = [], [], []
+    for review_id, signature, keys in entries:
+        best_id, best_similarity = None, 0.0
+        for candidate_id in {candidate for key in keys for candidate in buckets.get(key, ())}:
+            similarity = float(np.mean(signatures[candidate_id] == signature))
+            if similarity > best_similarity:
+                best_id, best_similarity = candidate_id, similarity
+
+        if best_similarity >= SIMILARITY_THRESHOLD:
+            duplicates.append({"review_id": review_id, "cluster_id": best_id, "aehnlichkeit": round(best_similarity, 3)})
+            continue
+
+        # Neues Original: auch für die folgenden Reviews dieses Batches als Kandidat verfügbar machen
+        signatures[review_id] = signature
+        new_signatures.append({"review_id": review_id, "signatur": signature.tobytes()})
+        for key in keys:
+            buckets.setdefault(key, []).append(review_id)
+            new_buckets.append({"bucket": key, "review_id": review_id})
+
+    if new_signatures:
+        db.execute(insert(models.ReviewSignature.__table__).on_conflict_do_nothing(), new_signatures)
+        db.execute(insert(models.ReviewLshBucket.__table__).on_conflict_do_nothing(), new_buckets)
+    if duplicates:
+        db.execute(insert(models.ReviewDuplicate.__table__).on_conflict_do_nothing(), duplicates)
+    return duplicates
+
+
+def rebuild_duplicate_index(db: Session, chunk_size: int = 5000) -> int:
+    """
+    Baut den Duplikat-Index aus allen vorhandenen Reviews neu auf (z.B. für Datenbanken von vor der Einführung).
+    Die Review-Analyse wird dabei als veraltet markiert und beim nächsten Lauf neu aufgebaut,
+    weil sich die Menge der analysierten Reviews ändert.
+    :param db: Die Datenbank-Session
+    :param chunk_size: Anzahl Reviews pro Block
+    :return: Anzahl der als Duplikat markierten Reviews
+    """
+    db.execute(delete(models.ReviewDuplicate))
+    db.execute(delete(models.ReviewLshBucket))
+    db.execute(delete(models.ReviewSignature))
+    db.execute(update(models.AnalysisWatermark).values(model_version=None))
+    db.commit()
+
+    total, last_id = 0, 0
+    while True:
+        chunk = db.execute(
+            select(models.Review.id, models.Review.review)
+            .where(models.Review.id > last_id)
+            .order_by(models.Review.id)
+            .limit(chunk_size)
+        ).all()
+        if not chunk:
+            return total
+        total += len(flag_duplicates(db, chunk))
+        db.commit()
+        last_id = chunk[-1].id
@@ -0,0 +1,66 @@
+# DB/history.py
+from datetime import date
+from typing import Optional
+import msgspec
+from sqlalchemy import select, func
+from sqlalchemy.orm import Session
+from . import models
+
+# Stand der Produkte aus früheren Crawling-Sessions, Grundlage für die Reihenfolge beim nächsten Crawlen
+# (scrapers/crawl_scheduler.py). Je Produkt-URL werden nur die letzten beiden Sessions gelesen; die
+# Auswahl übernimmt SQLite per Fensterfunktion, statt alle Zeilen nach Python zu laden.
+
+
+class ProductHistory(msgspec.Struct):
+    """
+    Letzter bekannter Stand eines Produkts und ob er sich gegenüber der Session davor geändert hat.
+    """
+    product_url: str
+    artikelnummer: Optional[str]
+    session_date: date
+    preis: Optional[float]
+    promo_preis: Optional[float]
+    gesamtrating: Optional[float]
+    gesamtanzahl_reviews: Optional[int]
+    vorherige_anzahl_reviews: Optional[int] = None
+    geaendert: bool = False
+
+    def days_since_crawl(self, today: date = None) -> int:
+        return ((today or date.today()) - self.session_date).days
+
+
+def load_product_history(db: Session) -> dict:
+    """
+    Liest den letzten Stand jedes Produkts und vergleicht Preis, Promo-Preis, Rating und Review-Anzahl
+    mit der Session davor.
+    :param db: Die Datenbank-Session
+    :return: Dictionary Produkt-URL -> ProductHistory
+    """
+    product = models.Product
+    rang = func.row_number().over(
+        partition_by=product.product_url,
+        order_by=(product.session_date.desc(), product.session_time.desc(), product.id.desc())
+    ).label("rang")
+    latest = (
+        select(product.product_url, product.artikelnummer, product.session_date, product.preis,
+               product.promo_preis, product.gesamtrating, product.gesamtanzahl_reviews, rang)
+        .where(product.product_url.is_not(None))
+        .subquery()
+    )
+    rows = db.execute(select(latest).where(latest.c.rang <= 2).order_by(latest.c.product_url, latest.c.rang))
+
+    history = {}
+    for row in rows:
+        if row.rang == 1:
+            history[row.product_url] = ProductHistory(
+                row.product_url, row.artikelnummer, row.session_date, row.preis, row.promo_preis,
+                row.gesamtrating, row.gesamtanzahl_reviews
+            )
+            continue
+        current = history[row.product_url]
+        current.vorherige_anzahl_reviews = row.gesamtanzahl_reviews
+        current.geaendert = (
+            (current.preis, current.promo_preis, current.gesamtrating)
+            != (row.preis, row.promo_preis, row.gesamtrating)
+        )
+    return history
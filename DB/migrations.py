@@ -0,0 +1,142 @@
+# DB/migrations.py
+from datetime import date
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from sqlalchemy.schema import CreateTable
+from . import models
+from .aggregates import rebuild_aggregates
+from .utils import parse_review_date
+from .records import PRODUCT_HASH_FIELDS, REVIEW_HASH_FIELDS, content_hash
+
+# Anzahl Reviews pro Block beim Nachtragen berechneter Spalten
+BACKFILL_CHUNK_SIZE = 5000
+
+# Schema-Anpassungen für Datenbanken, die mit einer älteren Version angelegt wurden.
+# create_all legt nur fehlende Tabellen an, bestehende Spalten und Constraints ändert es nicht.
+
+
+def _not_null_columns(connection, table: str) -> set:
+    return {row[1] for row in connection.execute(text(f"PRAGMA table_info({table})")) if row[3]}
+
+
+def _columns(connection, table: str) -> set:
+    return {row[1] for row in connection.execute(text(f"PRAGMA table_info({table})"))}
+
+
+def _backfill_review_dates(connection):
+    """
+    Berechnet review_date für alle Reviews, bei denen es noch fehlt, aus der Originalangabe und dem Session-Datum.
+    """
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            text("SELECT id, date, session_date FROM reviews "
+                 "WHERE id > :last_id AND review_date IS NULL ORDER BY id LIMIT :limit"),
+            {"last_id": last_id, "limit": BACKFILL_CHUNK_SIZE}
+        ).all()
+        if not rows:
+            return
+        updates = []
+        for review_id, value, session_date in rows:
+            review_date = parse_review_date(value, date.fromisoformat(session_date))
+            if review_date is not None:
+                updates.append({"id": review_id, "review_date": review_date.isoformat()})
+        if updates:
+            connection.execute(text("UPDATE reviews SET review_date = :review_date WHERE id = :id"), updates)
+        last_id = rows[-1].id
+
+
+def _backfill_content_hashes(connection, table: str, fields):
+    """
+    Berechnet content_hash für alle Zeilen einer Tabelle, bei denen er noch fehlt (in Blöcken nach ID).
+    """
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            text(f"SELECT id, {', '.join(fields)} FROM {table} "
+                 f"WHERE id > :last_id AND content_hash IS NULL ORDER BY id LIMIT :limit"),
+            {"last_id": last_id, "limit": BACKFILL_CHUNK_SIZE}
+        ).all()
+        if not rows:
+            return
+        connection.execute(text(f"UPDATE {table} SET content_hash = :content_hash WHERE id = :id"), [
+            {"id": row.id, "content_hash": content_hash(row, fields)} for row in rows
+        ])
+        last_id = rows[-1].id
+
+
+def _rebuild_table(connection, table):
+    """
+    Baut eine Tabelle nach dem aktuellen Modell neu auf (SQLite kann Constraints nicht per ALTER ändern).
+    Die IDs bleiben erhalten, Trigger und Indizes der alten Tabelle werden entfernt und müssen danach
+    neu angelegt werden (siehe ``migrate_database``).
+    """
+    name = table.name
+    # Nur Spalten kopieren, die es in der alten Tabelle schon gibt; neue Spalten bleiben NULL
+    existing = _columns(connection, name)
+    columns = ", ".join(column.name for column in table.columns if column.name in existing)
+    create_sql = str(CreateTable(table).compile(connection)).replace(f"CREATE TABLE {name} ", f"CREATE TABLE {name}_neu ", 1)
+    connection.execute(text(create_sql))
+    connection.execute(text(f"INSERT INTO {name}_neu ({columns}) SELECT {columns} FROM {name}"))
+    connection.execute(text(f"DROP TABLE {name}"))
+    connection.execute(text(f"ALTER TABLE {name}_neu RENAME TO {name}"))
+    for index in table.indexes:
+        index.create(connection, checkfirst=True)
+
+
+def migrate_database(engine):
+    """
+    Bringt eine bestehende Datenbank auf den Stand der Modelle. Muss nach ``create_all`` und vor
+    ``init_search_index`` aufgerufen werden, weil ein Neuaufbau die Trigger des Volltext-Index entfernt.
+    :param engine: Die SQLAlchemy-Engine
+    """
+    with engine.begin() as connection:
+        # Optionale Review-Profilfelder waren NOT NULL und enthielten dadurch den Platzhalter 'Unbekannt'
+        nullable = {column.name for column in models.Review.__table__.columns if column.nullable}
+        missing_date = "review_date" not in _columns(connection, models.Review.__tablename__)
+        missing_hash = {table.name for table in (models.Product.__table__, models.Review.__table__)
+                        if "content_hash" not in _columns(connection, table.name)}
+        if _not_null_columns(connection, models.Review.__tablename__) & nullable:
+            _rebuild_table(connection, models.Review.__table__)
+            connection.execute(text(
+                "UPDATE reviews SET "
+                "author_location = NULLIF(author_location, 'Unbekannt'), "
+                "gender = NULLIF(gender, 'Unbekannt'), "
+                "age = NULLIF(age, 'Unbekannt')"
+            ))
+
+        # Typisiertes Review-Datum (Spalte und Indizes) nachrüsten und einmalig aus der Originalangabe berechnen
+        if "review_date" not in _columns(connection, models.Review.__tablename__):
+            connection.execute(text("ALTER TABLE reviews ADD COLUMN review_date DATE"))
+        # Frühere Indizes ohne Session; Zeitfenster werden je Session abgefragt (DB/timeline.py)
+        for index_name in ("ix_reviews_produkt_datum", "ix_reviews_session"):
+            connection.execute(text(f"DROP INDEX IF EXISTS {index_name}"))
+        for index in models.Review.__table__.indexes:
+            index.create(connection, checkfirst=True)
+        if missing_date:
+            _backfill_review_dates(connection)
+
+        # Inhalts-Hashes für den Vergleich von Sessions (DB/diff.py) und Index auf die Session nachrüsten
+        for table, fields in ((models.Product.__table__, PRODUCT_HASH_FIELDS),
+                              (models.Review.__table__, REVIEW_HASH_FIELDS)):
+            if "content_hash" not in _columns(connection, table.name):
+                connection.execute(text(f"ALTER TABLE {table.name} ADD COLUMN content_hash INTEGER"))
+            if table.name in missing_hash:
+                _backfill_content_hashes(connection, table.name, fields)
+            for index in table.indexes:
+                index.create(connection, checkfirst=True)
+
+        # Marken-Kennzahlen gelten je Session; ältere agg_brands summierten über alle Sessions und die
+        # Tabellen je Produkt verwiesen auf die Session-lokale produkt_id. Solche Aggregate werden neu
+        # aufgebaut, ebenso fehlende Aggregate einer DB, die vor den Aggregat-Tabellen befüllt wurde.
+        outdated = "session_date" not in _columns(connection, models.BrandRollup.__tablename__)
+        if outdated:
+            models.BrandRollup.__table__.drop(connection)
+            models.BrandRollup.__table__.create(connection)
+        missing = connection.execute(text(
+            "SELECT EXISTS (SELECT 1 FROM products) AND NOT EXISTS (SELECT 1 FROM agg_price_history)"
+        )).scalar()
+        if outdated or missing:
+            # Die Session arbeitet in der Transaktion der Migration, ihr Commit schließt diese nicht ab
+            with Session(bind=connection) as db:
+                rebuild_aggregates(db)
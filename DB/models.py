@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, Boolean, Text, ForeignKey, Date, Time
+from sqlalchemy import Column, Integer, String, Float, Boolean, Text, ForeignKey, Date, Time, DateTime, LargeBinary, Index
 from sqlalchemy.orm import relationship, Mapped, mapped_column
 from .database import Base
 
@@ -28,9 +28,14 @@ class Product(Base):
     produkt_id: Mapped[int] = mapped_column(Integer, nullable=False)  
     session_date: Mapped[Date] = mapped_column(Date, nullable=False)  
     session_time: Mapped[Time] = mapped_column(Time, nullable=False)  
+    # Hash über die inhaltlichen Felder (DB/records.PRODUCT_HASH_FIELDS) für den Vergleich zweier Sessions
+    content_hash: Mapped[int] = mapped_column(Integer, nullable=True)
 
     reviews: Mapped[list["Review"]] = relationship("Review", back_populates="product")
 
+    # Alle Produkte einer Session ohne Tabellen-Scan (DB/diff.py), produkt_id für den Join der Reviews
+    __table_args__ = (Index("ix_products_session", "session_date", "session_time", "produkt_id"),)
+
 
 # Tabelle zu Reviews
 class Review(Base):
@@ -40,16 +45,157 @@ class Review(Base):
     reviewer: Mapped[str] = mapped_column(String, nullable=False)
     review: Mapped[str] = mapped_column(Text, nullable=False)
     rating: Mapped[int] = mapped_column(Integer, nullable=False)
+    # Originale Datumsangabe der Review-Seite (z.B. "vor 2 Monaten"), bleibt zur Nachvollziehbarkeit erhalten
     date: Mapped[str] = mapped_column(String, nullable=False)
-    author_location: Mapped[str] = mapped_column(String)
-    review_count: Mapped[int] = mapped_column(Integer)
-    review_votes: Mapped[int] = mapped_column(Integer)
-    gender: Mapped[str] = mapped_column(String)
-    age: Mapped[str] = mapped_column(String)
+    # Beim Ingest daraus berechnetes Datum (relative Angaben nur monatsgenau), NULL wenn nicht erkannt
+    review_date: Mapped[Date] = mapped_column(Date, nullable=True, index=True)
+    # Profilangaben sind freiwillig, fehlende Werte werden beim Bereinigen zu NULL
+    author_location: Mapped[str] = mapped_column(String, nullable=True)
+    review_count: Mapped[int] = mapped_column(Integer, nullable=True)
+    review_votes: Mapped[int] = mapped_column(Integer, nullable=True)
+    gender: Mapped[str] = mapped_column(String, nullable=True)
+    age: Mapped[str] = mapped_column(String, nullable=True)
     review_id: Mapped[int] = mapped_column(Integer, nullable=False)
     # FK zur Produkt-Tabelle  
     produkt_id: Mapped[int] = mapped_column(Integer, ForeignKey('products.id'), nullable=False)  
     session_date: Mapped[Date] = mapped_column(Date, nullable=False)  
     session_time: Mapped[Time] = mapped_column(Time, nullable=False)  
+    # Hash über Reviewer, Rating und Text (DB/records.REVIEW_HASH_FIELDS), erkennt neue Reviews je Session
+    content_hash: Mapped[int] = mapped_column(Integer, nullable=True)
 
     product: Mapped["Product"] = relationship("Product", back_populates="reviews")
+
+    # Zeitfenster einer Session bzw. eines Produkts als Range-Scan über den Index (siehe DB/timeline.py);
+    # ix_reviews_session_datum dient auch dem Lesen einer ganzen Session (DB/diff.py)
+    __table_args__ = (
+        Index("ix_reviews_session_datum", "session_date", "session_time", "review_date"),
+        Index("ix_reviews_session_produkt_datum", "session_date", "session_time", "produkt_id", "review_date"),
+    )
+
+
+# ------------------------------------------------------------
+# Aggregat-Tabellen für das Excel-Dashboard
+# Werden in DB/aggregates.py in derselben Transaktion wie der jeweilige
+# Ingest-Batch fortgeschrieben, damit das Dashboard nicht alle Reviews scannen muss.
+# ------------------------------------------------------------
+
+# Rating-Histogramm pro Produkt (Anzahl Reviews je Sterne-Wert)
+class ProductRatingHistogram(Base):
+    __tablename__ = 'agg_product_ratings'
+
+    produkt_id: Mapped[int] = mapped_column(Integer, ForeignKey('products.id'), primary_key=True)
+    rating: Mapped[int] = mapped_column(Integer, primary_key=True)
+    anzahl: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+
+# Anzahl Reviews pro Produkt und Monat (Monat im Format YYYY-MM)
+class ReviewMonthCount(Base):
+    __tablename__ = 'agg_review_months'
+
+    produkt_id: Mapped[int] = mapped_column(Integer, ForeignKey('products.id'), primary_key=True)
+    monat: Mapped[str] = mapped_column(String, primary_key=True)
+    anzahl: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+
+# Preis- und Promo-Verlauf je Artikel und Crawling-Session
+class PriceHistory(Base):
+    __tablename__ = 'agg_price_history'
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    produkt_id: Mapped[int] = mapped_column(Integer, ForeignKey('products.id'), nullable=False)
+    artikelnummer: Mapped[str] = mapped_column(String, nullable=True, index=True)
+    preis: Mapped[float] = mapped_column(Float, nullable=True)
+    promo_preis: Mapped[float] = mapped_column(Float, nullable=True)
+    on_promo: Mapped[bool] = mapped_column(Boolean, default=False)
+    session_date: Mapped[Date] = mapped_column(Date, nullable=False)
+    session_time: Mapped[Time] = mapped_column(Time, nullable=False)
+
+
+# Kennzahlen je Marke und Crawling-Session (Summen, Durchschnitte werden beim Export berechnet)
+class BrandRollup(Base):
+    __tablename__ = 'agg_brands'
+
+    marke: Mapped[str] = mapped_column(String, primary_key=True)
+    session_date: Mapped[Date] = mapped_column(Date, primary_key=True)
+    session_time: Mapped[Time] = mapped_column(Time, primary_key=True)
+    anzahl_produkte: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    anzahl_promo: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    preis_summe: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+    preis_anzahl: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    anzahl_reviews: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    rating_summe: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+
+# Cache der spaCy-Analyse eines Review-Textes (Lemma, POS-Tag und Head-Index je Token).
+# Schlüssel ist der Hash des Textes zusammen mit der Modellversion, damit ein Modell-Update
+# den Cache automatisch ungültig macht.
+class ParsedReview(Base):
+    __tablename__ = 'parse_cache'
+
+    text_hash: Mapped[str] = mapped_column(String, primary_key=True)
+    model_version: Mapped[str] = mapped_column(String, primary_key=True)
+    tokens: Mapped[str] = mapped_column(Text, nullable=False)
+
+
+# ------------------------------------------------------------
+# Inkrementelle Review-Analyse (scrapers/review_analyzer.py)
+# ------------------------------------------------------------
+
+# Rohe Kombinationszählung je Review (kategorie: 'adj_noun' oder 'verb_adj')
+class ReviewCombination(Base):
+    __tablename__ = 'review_combinations'
+
+    review_id: Mapped[int] = mapped_column(Integer, ForeignKey('reviews.id'), primary_key=True)
+    kategorie: Mapped[str] = mapped_column(String, primary_key=True)
+    kombination: Mapped[str] = mapped_column(String, primary_key=True)
+    anzahl: Mapped[int] = mapped_column(Integer, nullable=False)
+
+
+# Aufsummierte Kombinationen je Produkt und Rating, Grundlage für die Abfrage mit Rating-Filter
+class ProductCombinationTotal(Base):
+    __tablename__ = 'product_combinations'
+
+    produkt_id: Mapped[int] = mapped_column(Integer, ForeignKey('products.id'), primary_key=True)
+    rating: Mapped[int] = mapped_column(Integer, primary_key=True)
+    kategorie: Mapped[str] = mapped_column(String, primary_key=True)
+    kombination: Mapped[str] = mapped_column(String, primary_key=True)
+    anzahl: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+
+# Bis zu welcher Review-ID eine Analyse bereits gelaufen ist
+class AnalysisWatermark(Base):
+    __tablename__ = 'analysis_watermarks'
+
+    name: Mapped[str] = mapped_column(String, primary_key=True)
+    last_review_id: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    model_version: Mapped[str] = mapped_column(String, nullable=True)
+    updated_at: Mapped[DateTime] = mapped_column(DateTime, nullable=True)
+
+
+# ------------------------------------------------------------
+# Erkennung nahezu identischer Reviews (DB/dedup.py)
+# ------------------------------------------------------------
+
+# MinHash-Signatur je Original-Review (Duplikate werden nicht indexiert)
+class ReviewSignature(Base):
+    __tablename__ = 'review_minhash'
+
+    review_id: Mapped[int] = mapped_column(Integer, ForeignKey('reviews.id'), primary_key=True)
+    signatur: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+
+
+# LSH-Buckets ("band:hash") -> Reviews, Kandidatensuche per Primärschlüssel-Präfix
+class ReviewLshBucket(Base):
+    __tablename__ = 'review_lsh_buckets'
+
+    bucket: Mapped[str] = mapped_column(String, primary_key=True)
+    review_id: Mapped[int] = mapped_column(Integer, ForeignKey('reviews.id'), primary_key=True)
+
+
+# Als Duplikat erkannte Reviews; cluster_id ist die ID des zuerst gespeicherten Originals
+class ReviewDuplicate(Base):
+    __tablename__ = 'review_duplicates'
+
+    review_id: Mapped[int] = mapped_column(Integer, ForeignKey('reviews.id'), primary_key=True)
+    cluster_id: Mapped[int] = mapped_column(Integer, ForeignKey('reviews.id'), nullable=False, index=True)
+    aehnlichkeit: Mapped[float] = mapped_column(Float, nullable=False)
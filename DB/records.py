@@ -0,0 +1,133 @@
+# DB/records.py
+import hashlib
+from typing import List, Optional, Union
+import msgspec
+
+# Kompakte Datensätze für Produkte und Reviews auf dem Weg Extraktor -> Bereinigung -> JSON -> crud.
+# msgspec-Structs haben feste Slots statt eines Dictionaries pro Datensatz und werden ohne Umweg über
+# dict kodiert. Die JSON-Schlüssel (rename) entsprechen genau dem bisherigen Format der Session-Dateien.
+# Die Felder sind vor der Bereinigung noch Texte (z.B. "29,99" oder "Unbekannt"), danach int/float/None.
+
+PRODUCT_KEYS = {
+    "produkt_url": "Produkt_URL",
+    "artikelnummer": "Artikelnummer",
+    "produktname": "Produktname",
+    "preis": "Preis",
+    "promo_preis": "Promo_Preis",
+    "on_promo": "on_promo",
+    "waehrung": "Währung",
+    "marke": "Marke",
+    "artikelbeschreibung": "Artikelbeschreibung",
+    "inhaltsstoffe": "Inhaltsstoffe",
+    "gesamtrating": "GesamtRating",
+    "gesamtanzahl_reviews": "Gesamtanzahl_Reviews",
+    "produkt_id": "Produkt_ID",
+}
+
+REVIEW_KEYS = {
+    "reviewer": "Reviewer",
+    "review": "Review",
+    "rating": "Rating",
+    "date": "Date",
+    "author_location": "Author_Location",
+    "review_count": "Review_Count",
+    "review_votes": "Review_Votes",
+    "gender": "Gender",
+    "age": "Age",
+    "review_id": "Review_ID",
+    "produkt_id": "Produkt_ID",
+}
+
+
+class ProductRecord(msgspec.Struct, rename=PRODUCT_KEYS, gc=False):
+    produkt_url: Optional[str] = None
+    artikelnummer: Optional[str] = None
+    produktname: Optional[str] = None
+    preis: Union[float, str, None] = None
+    promo_preis: Union[float, str, None] = None
+    on_promo: bool = False
+    waehrung: Optional[str] = None
+    marke: Optional[str] = None
+    artikelbeschreibung: Optional[str] = None
+    inhaltsstoffe: Optional[str] = None
+    gesamtrating: Union[float, str, None] = None
+    gesamtanzahl_reviews: Union[int, str, None] = None
+    produkt_id: Optional[int] = None
+
+
+class ReviewRecord(msgspec.Struct, rename=REVIEW_KEYS, gc=False):
+    reviewer: Optional[str] = None
+    review: Optional[str] = None
+    rating: Union[int, str, None] = None
+    date: Optional[str] = None
+    author_location: Optional[str] = None
+    review_count: Union[int, str, None] = None
+    review_votes: Union[int, str, None] = None
+    gender: Optional[str] = None
+    age: Optional[str] = None
+    review_id: Optional[int] = None
+    produkt_id: Optional[int] = None
+
+
+# Felder, die in den Inhalts-Hash eingehen (DB/diff.py). Nicht enthalten sind URL und IDs, die sich
+# zwischen Sessions ohne inhaltliche Änderung unterscheiden, und bei Reviews die relative Datumsangabe
+# ("vor 2 Monaten"), die mit jeder Session älter wird.
+PRODUCT_HASH_FIELDS = ("produktname", "preis", "promo_preis", "on_promo", "waehrung", "marke", "gesamtrating",
+                       "gesamtanzahl_reviews", "artikelbeschreibung", "inhaltsstoffe")
+REVIEW_HASH_FIELDS = ("reviewer", "rating", "review")
+
+
+def record_keys(record_type) -> dict:
+    """
+    Liefert Attributname -> JSON-Schlüssel eines Record-Typs in Feldreihenfolge.
+    """
+    return dict(zip(record_type.__struct_fields__, record_type.__struct_encode_fields__))
+
+
+# Encoder/Decoder werden einmal erstellt und wiederverwendet
+_encoder = msgspec.json.Encoder()
+_decoders = {
+    ProductRecord: msgspec.json.Decoder(List[ProductRecord]),
+    ReviewRecord: msgspec.json.Decoder(List[ReviewRecord]),
+}
+
+
+def encode_records(records: list) -> bytes:
+    """
+    Kodiert Datensätze als JSON-Array (UTF-8). Die Zeilentrenner U+2028/U+2029 werden wie bisher entfernt.
+    :param records: Liste von ProductRecord bzw. ReviewRecord
+    :return: Die JSON-Daten als Bytes
+    """
+    return _encoder.encode(records).replace("\u2028".encode(), b"").replace("\u2029".encode(), b"")
+
+
+def content_hash(record, fields) -> int:
+    """
+    Inhalts-Hash eines Datensatzes über die angegebenen Felder als vorzeichenbehaftete 64-Bit-Zahl
+    (passt in eine SQLite-INTEGER-Spalte). Funktioniert mit Records, DB-Modellen und Ergebniszeilen.
+    :param fields: PRODUCT_HASH_FIELDS bzw. REVIEW_HASH_FIELDS
+    """
+    values = [getattr(record, field) for field in fields]
+    # Zahlen und Wahrheitswerte einheitlich als float, damit z.B. 4 (Record) und 4.0 (REAL-Spalte) bzw.
+    # True und 1 (Boolean-Spalte in einer Abfrage per text()) denselben Hash ergeben
+    data = _encoder.encode([float(value) if type(value) in (int, bool) else value for value in values])
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "little", signed=True)
+
+
+def decode_records(data: bytes, record_type) -> list:
+    """
+    Dekodiert ein JSON-Array von Datensätzen und prüft dabei die Feldtypen.
+    :param data: Die JSON-Daten
+    :param record_type: ProductRecord oder ReviewRecord
+    :return: Liste von Datensätzen
+    """
+    return _decoders[record_type].decode(data)
+
+
+def to_record(data, record_type):
+    """
+    Wandelt ein Dictionary mit JSON-Schlüsseln in einen Datensatz um; Datensätze bleiben unverändert.
+    """
+    if isinstance(data, record_type):
+        return data
+    return msgspec.convert(data, record_type)
@@ -0,0 +1,114 @@
+# DB/search.py
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+# Volltext-Index über Review.review (SQLite FTS5, external content auf der Tabelle reviews).
+# Die Trigger halten den Index bei jedem INSERT/UPDATE/DELETE auf reviews automatisch synchron,
+# d.h. auch der normale Ingest über crud.create_reviews aktualisiert ihn ohne zusätzlichen Code.
+FTS_TABLE = "reviews_fts"
+
+_CREATE_STATEMENTS = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        review,
+        content='reviews',
+        content_rowid='id',
+        tokenize='unicode61'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS reviews_fts_ai AFTER INSERT ON reviews BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, review) VALUES (new.id, new.review);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS reviews_fts_ad AFTER DELETE ON reviews BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, review) VALUES ('delete', old.id, old.review);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS reviews_fts_au AFTER UPDATE OF review ON reviews BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, review) VALUES ('delete', old.id, old.review);
+        INSERT INTO {FTS_TABLE}(rowid, review) VALUES (new.id, new.review);
+    END
+    """,
+]
+
+
+def init_search_index(engine):
+    """
+    Legt den Volltext-Index und die Synchronisations-Trigger an, falls sie noch nicht existieren.
+    Existieren bereits Reviews (z.B. eine ältere DB), wird der Index einmalig aus der Tabelle aufgebaut.
+    :param engine: Die SQLAlchemy-Engine
+    """
+    with engine.begin() as connection:
+        exists = connection.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": FTS_TABLE}
+        ).first()
+        for statement in _CREATE_STATEMENTS:
+            connection.execute(text(statement))
+        if not exists:
+            connection.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+
+
+def rebuild_search_index(engine):
+    """
+    Baut den Volltext-Index komplett aus der Tabelle reviews neu auf.
+    :param engine: Die SQLAlchemy-Engine
+    """
+    with engine.begin() as connection:
+        connection.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+
+
+def build_match_query(terms: list, match_any: bool = False) -> str:
+    """
+    Baut aus Suchbegriffen einen FTS5-MATCH-Ausdruck. Jeder Begriff wird als Phrase gesucht,
+    d.h. "hält lange" findet nur Reviews, in denen beide Wörter direkt hintereinander stehen.
+    :param terms: Liste von Suchbegriffen/Phrasen
+    :param match_any: True = mindestens ein Begriff muss vorkommen, False = alle Begriffe
+    :return: Der MATCH-Ausdruck
+    """
+    phrases = ['"' + term.replace('"', '""') + '"' for term in terms if term.strip()]
+    return (" OR " if match_any else " AND ").join(phrases)
+
+
+def search_reviews(db: Session, terms: list, limit: int = 20, match_any: bool = False, rating_filter: list = None) -> list:
+    """
+    Durchsucht die Review-Texte und liefert die Treffer nach Relevanz (BM25) sortiert.
+    :param db: Die Datenbank-Session
+    :param terms: Liste von Suchbegriffen/Phrasen
+    :param limit: Maximale Anzahl Treffer
+    :param match_any: True = mindestens ein Begriff muss vorkommen, False = alle Begriffe
+    :param rating_filter: Optionale Liste von Bewertungen, auf die eingeschränkt wird
+    :return: Liste von Dictionaries mit Review, Produkt und Textausschnitt
+    """
+    match = build_match_query(terms, match_any)
+    if not match:
+        return []
+
+    params = {"match": match, "limit": limit}
+    rating_clause = ""
+    if rating_filter:
+        placeholders = ", ".join(f":rating_{i}" for i in range(len(rating_filter)))
+        rating_clause = f"AND r.rating IN ({placeholders})"
+        params.update({f"rating_{i}": rating for i, rating in enumerate(rating_filter)})
+
+    query = text(f"""
+        SELECT r.id AS id,
+               r.rating AS rating,
+               r.date AS date,
+               p.marke AS marke,
+               p.produktname AS produktname,
+               p.product_url AS product_url,
+               snippet({FTS_TABLE}, 0, '[', ']', '…', 12) AS snippet,
+               bm25({FTS_TABLE}) AS score
+        FROM {FTS_TABLE}
+        JOIN reviews r ON r.id = {FTS_TABLE}.rowid
+        -- produkt_id wird je Session vergeben, das Produkt liegt in derselben Session
+        JOIN products p ON p.produkt_id = r.produkt_id
+                       AND p.session_date = r.session_date AND p.session_time = r.session_time
+        WHERE {FTS_TABLE} MATCH :match {rating_clause}
+        ORDER BY bm25({FTS_TABLE})
+        LIMIT :limit
+    """)
+    return [dict(row) for row in db.execute(query, params).mappings()]
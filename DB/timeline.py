@@ -0,0 +1,115 @@
+# DB/timeline.py
+from datetime import date, time, timedelta
+from typing import Optional, Tuple
+from sqlalchemy import select, func, false, and_
+from sqlalchemy.orm import Session
+from . import models
+
+# Zeitbezogene Abfragen über Review.review_date. Alle Bedingungen sind halboffene Bereiche
+# (start <= review_date < end) direkt auf der Spalte, damit SQLite die Indizes ix_reviews_session_datum
+# bzw. ix_reviews_session_produkt_datum per Range-Scan nutzen kann statt alle Reviews zu lesen.
+# Jede Crawling-Session speichert die aktuellen Reviews erneut; gezählt wird deshalb immer innerhalb
+# einer Session (Standard: die jüngste), sonst wüchsen Anzahlen und Verläufe mit der Zahl der Sessions.
+
+_MONAT = func.strftime("%Y-%m", models.Review.review_date)
+
+SessionKey = Tuple[date, time]
+
+
+def last_days(days: int, today: date = None):
+    """
+    Liefert das Zeitfenster der letzten ``days`` Tage einschließlich heute.
+    :return: (start, end) mit end exklusiv
+    """
+    today = today or date.today()
+    return today - timedelta(days=days - 1), today + timedelta(days=1)
+
+
+def latest_session(db: Session) -> Optional[SessionKey]:
+    """
+    :return: (session_date, session_time) der jüngsten Session oder None bei leerer Datenbank
+    """
+    product = models.Product
+    row = db.execute(
+        select(product.session_date, product.session_time)
+        .order_by(product.session_date.desc(), product.session_time.desc()).limit(1)
+    ).first()
+    return tuple(row) if row else None
+
+
+def _window(db: Session, query, start: date = None, end: date = None, produkt_id: int = None,
+            session: SessionKey = None):
+    review = models.Review
+    if produkt_id is not None:
+        # products.id bestimmt auch die Session; die Reviews tragen die Session-lokale produkt_id
+        product = db.get(models.Product, produkt_id)
+        if product is None:
+            return query.where(false())
+        query = query.where(review.session_date == product.session_date, review.session_time == product.session_time,
+                            review.produkt_id == product.produkt_id)
+    else:
+        session = session or latest_session(db)
+        if session is None:
+            return query.where(false())
+        query = query.where(review.session_date == session[0], review.session_time == session[1])
+    if start is not None:
+        query = query.where(review.review_date >= start)
+    if end is not None:
+        query = query.where(review.review_date < end)
+    if start is None and end is None:
+        query = query.where(review.review_date.is_not(None))
+    return query
+
+
+def reviews_in_window(db: Session, start: date = None, end: date = None, produkt_id: int = None,
+                      session: SessionKey = None):
+    """
+    Liefert die Reviews eines Zeitfensters, neueste zuerst.
+    :param db: Die Datenbank-Session
+    :param start: Erster Tag (inklusive), None = ohne Untergrenze
+    :param end: Ende (exklusiv), None = ohne Obergrenze
+    :param produkt_id: Optional, nur Reviews dieses Produkts (products.id, legt auch die Session fest)
+    :param session: Optional, (session_date, session_time) der Crawling-Session, Standard ist die jüngste
+    :return: Liste von Review-Objekten
+    """
+    query = _window(db, select(models.Review), start, end, produkt_id, session)
+    return db.execute(query.order_by(models.Review.review_date.desc(), models.Review.id)).scalars().all()
+
+
+def count_reviews_in_window(db: Session, start: date = None, end: date = None, produkt_id: int = None,
+                            session: SessionKey = None) -> int:
+    """
+    Zählt die Reviews eines Zeitfensters, z.B. ``count_reviews_in_window(db, *last_days(30))``.
+    Parameter wie bei ``reviews_in_window``.
+    :return: Anzahl der Reviews
+    """
+    query = _window(db, select(func.count(models.Review.id)), start, end, produkt_id, session)
+    return db.execute(query).scalar_one()
+
+
+def reviews_per_month(db: Session, start: date = None, end: date = None, produkt_id: int = None,
+                      by_product: bool = False, session: SessionKey = None) -> list:
+    """
+    Aggregiert Reviews pro Monat (Anzahl und Durchschnittsrating).
+    :param db: Die Datenbank-Session
+    :param start: Erster Tag (inklusive), None = ohne Untergrenze
+    :param end: Ende (exklusiv), None = ohne Obergrenze
+    :param produkt_id: Optional, nur Reviews dieses Produkts (products.id, legt auch die Session fest)
+    :param by_product: Zusätzlich nach Produkt gruppieren
+    :param session: Optional, (session_date, session_time) der Crawling-Session, Standard ist die jüngste
+    :return: Liste von Dictionaries mit monat ('YYYY-MM'), anzahl, durchschnittsrating (und produkt_id = products.id)
+    """
+    review = models.Review
+    product = models.Product
+    group_columns = [product.id] if by_product else []
+    query = select(*[column.label("produkt_id") for column in group_columns], _MONAT.label("monat"),
+                   func.count(review.id).label("anzahl"), func.avg(review.rating).label("durchschnittsrating"))
+    query = query.select_from(review)
+    if by_product:
+        # Session-lokale produkt_id über dieselbe Session auf products.id abbilden (Index ix_products_session)
+        query = query.join(product, and_(product.produkt_id == review.produkt_id,
+                                         product.session_date == review.session_date,
+                                         product.session_time == review.session_time))
+    query = _window(db, query, start, end, produkt_id, session)
+    query = query.group_by(*group_columns, _MONAT).order_by(*group_columns, _MONAT)
+    return [dict(row._mapping) for row in db.execute(query)]
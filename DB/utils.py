@@ -1,63 +1,280 @@
 # DB/utils.py
-def clean_product_data(product_data: dict) -> dict:
+import re
+from collections import namedtuple
+from datetime import date, datetime, timedelta
+import msgspec
+import numpy as np
+import pandas as pd
+from .records import record_keys
+
+# Zahlwörter, die in den relativen Datumsangaben von Bazaarvoice vorkommen ("vor einem Jahr")
+_ZAHLWOERTER = {"einem": 1, "einer": 1, "einen": 1, "zwei": 2, "drei": 3}
+_RELATIVES_DATUM = re.compile(r"^vor\s+(\d+|einem|einer|einen|zwei|drei)\s+(\w+)$", re.IGNORECASE)
+
+# ------------------------------------------------------------
+# Schema-basierte Bereinigung der Crawler-Daten
+# ------------------------------------------------------------
+
+# Platzhalter der Extraktoren für fehlende Werte (Vergleich ohne Groß-/Kleinschreibung)
+SENTINELS = frozenset({"unbekannt", "n/a", ""})
+
+# typ: 'str', 'int', 'float', 'price' (deutsches Preisformat, z.B. "1.299,95 €") oder 'bool'
+# required: Pflichtfeld (NOT NULL in der DB); Datensätze, bei denen es danach fehlt, werden verworfen.
+# Text-Pflichtfelder haben keine Platzhalter, ein Reviewer namens 'Unbekannt' bleibt so erhalten.
+FieldSpec = namedtuple("FieldSpec", ["typ", "sentinels", "required"], defaults=(SENTINELS, False))
+REQUIRED_TEXT = FieldSpec("str", frozenset(), True)
+
+PRODUCT_SCHEMA = {
+    "Produkt_URL": FieldSpec("str"),
+    "Artikelnummer": FieldSpec("str"),
+    "Produktname": FieldSpec("str"),
+    "Preis": FieldSpec("price"),
+    "Promo_Preis": FieldSpec("price"),
+    "on_promo": FieldSpec("bool"),
+    "Währung": FieldSpec("str"),
+    "Marke": FieldSpec("str"),
+    "Artikelbeschreibung": FieldSpec("str"),
+    "Inhaltsstoffe": FieldSpec("str"),
+    "GesamtRating": FieldSpec("float"),
+    "Gesamtanzahl_Reviews": FieldSpec("int"),
+    "Produkt_ID": FieldSpec("int", required=True),
+}
+
+REVIEW_SCHEMA = {
+    "Reviewer": REQUIRED_TEXT,
+    "Review": REQUIRED_TEXT,
+    "Rating": FieldSpec("int", required=True),
+    "Date": REQUIRED_TEXT,
+    "Author_Location": FieldSpec("str"),
+    "Review_Count": FieldSpec("int"),
+    "Review_Votes": FieldSpec("int"),
+    "Gender": FieldSpec("str"),
+    "Age": FieldSpec("str"),
+    "Review_ID": FieldSpec("int", required=True),
+    "Produkt_ID": FieldSpec("int", required=True),
+}
+
+_TRUE_VALUES = {"true", "1", "ja"}
+_FALSE_VALUES = {"false", "0", "nein"}
+
+
+def _convert_float(text):
+    return pd.to_numeric(text.str.replace(",", ".", regex=False), errors="coerce")
+
+
+def _convert_int(text):
+    values = pd.to_numeric(text.str.replace(r"[()\s]", "", regex=True), errors="coerce")
+    return values.where(values % 1 == 0)
+
+
+def _convert_price(text):
+    # Währungszeichen und Leerzeichen entfernen; mit Komma ist der Punkt ein Tausendertrennzeichen
+    digits = text.str.replace(r"[^\d,.\-]", "", regex=True)
+    german = digits.str.contains(",", regex=False)
+    digits = digits.where(~german, digits.str.replace(".", "", regex=False).str.replace(",", ".", regex=False))
+    return pd.to_numeric(digits, errors="coerce")
+
+
+def _convert_bool(text):
+    lowered = text.str.lower()
+    return lowered.map(lambda value: True if value in _TRUE_VALUES else False if value in _FALSE_VALUES else None)
+
+
+# Konverter arbeiten auf den eindeutigen Werten einer Spalte (als getrimmter Text);
+# None/NaN im Ergebnis bedeutet "nicht umwandelbar"
+_CONVERTERS = {
+    "int": _convert_int,
+    "float": _convert_float,
+    "price": _convert_price,
+    "bool": _convert_bool,
+}
+
+
+def _to_python(values, typ):
+    # numpy-Skalare in Python-Typen umwandeln, damit die Ergebnisse direkt JSON- und DB-tauglich sind
+    if typ == "int":
+        return [None if value is None or value != value else int(value) for value in values]
+    if typ in ("float", "price"):
+        return [None if value is None or value != value else float(value) for value in values]
+    return list(values)
+
+
+def _clean_column(column, spec):
     """
-    Bereinigt die Produktdaten:
-    - Wandelt 'GesamtRating' in float um.
-    - Wandelt 'Gesamtanzahl_Reviews' in int um.
-    - Entfernt Währungszeichen und ersetzt Komma durch Punkt im 'Preis' und 'Promo_Preis', falls nicht 'N/A'.
-    - Setzt Felder auf None, wenn 'unbekannt' in der JSON steht.
-    
-    :param product_data: Das ursprüngliche Produktdaten-Dictionary
-    :return: Das bereinigte Produktdaten-Dictionary
+    Bereinigt eine Spalte. Bereits numerische Spalten werden direkt übernommen, alle anderen werden nur
+    über ihre eindeutigen Werte umgewandelt (Platzhalter und Kategorien wiederholen sich sehr oft).
+    :return: (Liste der bereinigten Werte, boolesches Array der ungültigen Zeilen)
     """
-    def clean_price(price) -> float:
-        if isinstance(price, str) and price not in ("N/A", "unbekannt", None):
-            clean_price = price.replace("€", "").replace(",", ".").strip()
-            return float(clean_price)
-        elif isinstance(price, (int, float)):
-            return float(price)
+    if spec.typ == "bool" and pd.api.types.is_bool_dtype(column):
+        return column.tolist(), np.zeros(len(column), dtype=bool)
+    if spec.typ in ("int", "float", "price") and pd.api.types.is_numeric_dtype(column) \
+            and not pd.api.types.is_bool_dtype(column):
+        values = column.to_numpy(dtype=float)
+        rejected = (values % 1 != 0) & ~np.isnan(values) if spec.typ == "int" else np.zeros(len(values), dtype=bool)
+        values[rejected] = np.nan
+        return _to_python(values, spec.typ), rejected
+
+    codes, uniques = pd.factorize(column, use_na_sentinel=True)
+    text = pd.Series(uniques, dtype=object).astype(str).str.strip()
+    missing = text.str.lower().isin(spec.sentinels).to_numpy()
+    if spec.typ == "str":
+        converted = pd.Series(uniques, dtype=object).to_numpy()
+        invalid = np.zeros(len(uniques), dtype=bool)
+    else:
+        converted = _CONVERTERS[spec.typ](text).astype(object).to_numpy()
+        invalid = pd.isna(converted) & ~missing
+    converted[missing | invalid] = None
+
+    # Code -1 (None/NaN in der Eingabe) zeigt auf den angehängten None-Eintrag
+    converted = np.append(converted, None)
+    invalid = np.append(invalid, False)
+    return _to_python(converted[codes], spec.typ), invalid[codes]
+
+
+def clean_records(records, schema: dict):
+    """
+    Bereinigt viele Datensätze auf einmal spaltenweise anhand eines Feld-Schemas:
+    - Platzhalter (z.B. 'Unbekannt', 'N/A') und fehlende Werte werden zu None.
+    - Zahlen und Preise werden in int bzw. float umgewandelt.
+    - Werte, die sich nicht umwandeln lassen, werden zu None und als ungültig gemeldet.
+    - Datensätze, bei denen danach ein Pflichtfeld fehlt, werden verworfen und das Feld als ungültig gemeldet,
+      statt beim Einfügen den ganzen Batch scheitern zu lassen.
+    Felder, die nicht im Schema stehen, bleiben unverändert. Bereits bereinigte Daten bleiben gleich.
+
+    :param records: Liste von Datensätzen (ProductRecord/ReviewRecord), Liste von Dictionaries oder ein pandas.DataFrame
+    :param schema: Feld -> FieldSpec, z.B. PRODUCT_SCHEMA oder REVIEW_SCHEMA
+    :return: (Liste der bereinigten Datensätze bzw. Dictionaries, Liste ungültiger Felder als (Index, Feld, Wert));
+             der Index bezieht sich auf die Eingabe
+    """
+    record_type = None
+    if isinstance(records, pd.DataFrame):
+        frame = records.reset_index(drop=True)
+    else:
+        records = list(records)
+        if records and isinstance(records[0], msgspec.Struct):
+            # Datensätze spaltenweise über ihre JSON-Schlüssel einlesen, das Schema bleibt dasselbe
+            record_type = type(records[0])
+            frame = pd.DataFrame.from_records([msgspec.structs.astuple(record) for record in records],
+                                              columns=list(record_keys(record_type).values()))
         else:
-            return None
+            frame = pd.DataFrame.from_records(records)
+    if frame.empty:
+        return [], []
+
+    columns, invalid = {}, []
+    dropped = np.zeros(len(frame), dtype=bool)
+    for field in frame.columns:
+        column = frame[field]
+        if field not in schema:
+            columns[field] = column.astype(object).where(column.notna(), None).tolist()
+            continue
+        columns[field], rejected = _clean_column(column, schema[field])
+        if schema[field].required:
+            absent = np.fromiter((value is None for value in columns[field]), dtype=bool, count=len(frame))
+            rejected = rejected | absent
+            dropped |= absent
+        invalid.extend((index, field, column[index]) for index in np.flatnonzero(rejected))
+
+    if dropped.any():
+        kept = np.flatnonzero(~dropped)
+        columns = {field: [values[index] for index in kept] for field, values in columns.items()}
+
+    if record_type is not None:
+        return [record_type(*row) for row in zip(*columns.values())], invalid
+    names = list(columns)
+    cleaned = [dict(zip(names, row)) for row in zip(*columns.values())]
+    return cleaned, invalid
+
 
-    def clean_field(value: str) -> str:
-        return value if value not in ("unbekannt", None) else None
+def clean_products(products):
+    """
+    Bereinigt eine Liste von Produktdaten (siehe ``clean_records`` und ``PRODUCT_SCHEMA``).
+    :return: (bereinigte Produktdaten, ungültige Felder)
+    """
+    return clean_records(products, PRODUCT_SCHEMA)
 
-    product_data["GesamtRating"] = float(product_data["GesamtRating"]) if product_data["GesamtRating"] not in ("unbekannt", None) else None
-    product_data["Gesamtanzahl_Reviews"] = int(product_data["Gesamtanzahl_Reviews"]) if product_data["Gesamtanzahl_Reviews"] not in ("unbekannt", None) else None
-    product_data["Preis"] = clean_price(product_data["Preis"])
-    product_data["Promo_Preis"] = clean_price(product_data["Promo_Preis"])
 
-    product_data["Produkt_URL"] = clean_field(product_data["Produkt_URL"])
-    product_data["Artikelnummer"] = clean_field(product_data["Artikelnummer"])
-    product_data["Produktname"] = clean_field(product_data["Produktname"])
-    product_data["Währung"] = clean_field(product_data["Währung"])
-    product_data["Marke"] = clean_field(product_data["Marke"])
-    product_data["Artikelbeschreibung"] = clean_field(product_data["Artikelbeschreibung"])
-    product_data["Inhaltsstoffe"] = clean_field(product_data["Inhaltsstoffe"])
+def clean_reviews(reviews):
+    """
+    Bereinigt eine Liste von Bewertungsdaten (siehe ``clean_records`` und ``REVIEW_SCHEMA``).
+    :return: (bereinigte Bewertungsdaten, ungültige Felder)
+    """
+    return clean_records(reviews, REVIEW_SCHEMA)
 
+
+def clean_product_data(product_data: dict) -> dict:
+    """
+    Bereinigt ein einzelnes Produktdaten-Dictionary (in place) anhand von PRODUCT_SCHEMA.
+    Für mehrere Produkte ``clean_products`` verwenden.
+
+    :param product_data: Das ursprüngliche Produktdaten-Dictionary
+    :return: Das bereinigte Produktdaten-Dictionary
+    :raises ValueError: Wenn ein Pflichtfeld fehlt
+    """
+    cleaned, invalid = clean_products([product_data])
+    if not cleaned:
+        raise ValueError(f"Pflichtfelder fehlen oder sind ungültig: {[field for _, field, _ in invalid]}")
+    product_data.update(cleaned[0])
     return product_data
 
+
 def clean_review_data(review_data: dict) -> dict:
     """
-    Bereinigt die Bewertungsdaten:
-    - Setzt Felder auf None, wenn 'unbekannt' in der JSON steht.
-    - Wandelt 'Rating', 'Review_Count' und 'Review_Votes' in int um.
-    
+    Bereinigt ein einzelnes Bewertungsdaten-Dictionary (in place) anhand von REVIEW_SCHEMA.
+    Für mehrere Bewertungen ``clean_reviews`` verwenden.
+
     :param review_data: Das ursprüngliche Bewertungsdaten-Dictionary
     :return: Das bereinigte Bewertungsdaten-Dictionary
+    :raises ValueError: Wenn ein Pflichtfeld fehlt
     """
-    def clean_field(value: str) -> str:
-        return value if value not in ("unbekannt", None) else None
+    cleaned, invalid = clean_reviews([review_data])
+    if not cleaned:
+        raise ValueError(f"Pflichtfelder fehlen oder sind ungültig: {[field for _, field, _ in invalid]}")
+    review_data.update(cleaned[0])
+    return review_data
 
-    review_data["Rating"] = int(review_data["Rating"]) if review_data["Rating"] not in ("unbekannt", None) else None
-    review_data["Review_Count"] = int(review_data["Review_Count"]) if review_data["Review_Count"] not in ("unbekannt", None) else None
-    review_data["Review_Votes"] = int(review_data["Review_Votes"]) if review_data["Review_Votes"] not in ("unbekannt", None) else None
 
-    review_data["Reviewer"] = clean_field(review_data["Reviewer"])
-    review_data["Review"] = clean_field(review_data["Review"])
-    review_data["Date"] = clean_field(review_data["Date"])
-    review_data["Author_Location"] = clean_field(review_data["Author_Location"])
-    review_data["Gender"] = clean_field(review_data["Gender"])
-    review_data["Age"] = clean_field(review_data["Age"])
+def parse_review_date(value, reference_date: date):
+    """
+    Wandelt die Datumsangabe eines Reviews in ein Datum um.
+    Unterstützt die relativen Angaben der Review-Seite ("vor 2 Jahren", "vor einem Monat", ...)
+    sowie absolute Angaben im Format TT.MM.JJJJ. Relative Angaben werden vom Datum der
+    Crawling-Session aus zurückgerechnet und sind daher nur auf den Monat genau.
 
-    return review_data
+    :param value: Die Datumsangabe als Text
+    :param reference_date: Datum der Crawling-Session
+    :return: Das Datum oder None, wenn die Angabe nicht erkannt wird
+    """
+    if not isinstance(value, str):
+        return None
+    text = value.strip()
+    try:
+        return datetime.strptime(text, "%d.%m.%Y").date()
+    except ValueError:
+        pass
+
+    lowered = text.lower()
+    if lowered in ("heute", "gerade eben"):
+        return reference_date
+    if lowered == "gestern":
+        return reference_date - timedelta(days=1)
+
+    match = _RELATIVES_DATUM.match(lowered)
+    if not match:
+        return None
+    amount = match.group(1)
+    amount = int(amount) if amount.isdigit() else _ZAHLWOERTER[amount]
+    unit = match.group(2)
+
+    if unit.startswith(("minute", "stunde")):
+        return reference_date
+    if unit.startswith("tag"):
+        return reference_date - timedelta(days=amount)
+    if unit.startswith("woche"):
+        return reference_date - timedelta(weeks=amount)
+    if unit.startswith("monat"):
+        months = reference_date.year * 12 + reference_date.month - 1 - amount
+        return date(months // 12, months % 12 + 1, 1)
+    if unit.startswith("jahr"):
+        return date(reference_date.year - amount, reference_date.month, 1)
+    return None
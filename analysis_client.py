@@ -0,0 +1,58 @@
+import sys
+import json
+import argparse
+from urllib import request, error
+
+# Schlanker Client für analysis_server.py: importiert bewusst nur die Standardbibliothek,
+# damit ein Auftrag in Sekundenbruchteilen abgeschickt ist. Modell und Cache hält der Dienst.
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+
+def call(host, port, method, path, payload=None, timeout=None):
+    data = json.dumps(payload).encode('utf-8') if payload is not None else None
+    req = request.Request(f"http://{host}:{port}{path}", data=data, method=method,
+                          headers={"Content-Type": "application/json"})
+    with request.urlopen(req, timeout=timeout) as response:
+        return json.loads(response.read().decode('utf-8'))
+
+
+def parse_args():
+    # parse_bucket liegt in einem Modul ohne schwere Abhängigkeiten
+    from scrapers.analysis_buckets import parse_bucket
+
+    parser = argparse.ArgumentParser(description="Schickt Analyse-Aufträge an den laufenden Analyse-Dienst.")
+    parser.add_argument("command", nargs="?", default="analyze", choices=["analyze", "status", "shutdown"],
+                        help="Auftrag an den Dienst (Standard: analyze)")
+    parser.add_argument("--bucket", type=parse_bucket, action="append", default=[],
+                        help="Auswertung NAME:BEWERTUNGEN[:neg], mehrfach angebbar (Standard: positiv und negativ)")
+    parser.add_argument("--top-k", type=int, help="Zusätzlich die k häufigsten Kombinationen je Marke und gesamt schreiben")
+    parser.add_argument("--host", default=DEFAULT_HOST, help=f"Adresse des Dienstes (Standard: {DEFAULT_HOST})")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"Port des Dienstes (Standard: {DEFAULT_PORT})")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    try:
+        if args.command == "status":
+            print(json.dumps(call(args.host, args.port, "GET", "/status", timeout=5), ensure_ascii=False, indent=2))
+        elif args.command == "shutdown":
+            print(call(args.host, args.port, "POST", "/shutdown", {}, timeout=5)["status"])
+        else:
+            payload = {"buckets": [bucket._asdict() for bucket in args.bucket], "top_k": args.top_k}
+            result = call(args.host, args.port, "POST", "/analyze", payload)
+            for output_file in result["dateien"]:
+                print(f"Geschrieben: {output_file}")
+            print(f"Analyse abgeschlossen in {result['dauer_s']} s.")
+    except error.HTTPError as e:
+        print(f"Fehler vom Analyse-Dienst: {json.loads(e.read().decode('utf-8')).get('error')}", file=sys.stderr)
+        sys.exit(1)
+    except error.URLError:
+        print(f"Analyse-Dienst unter {args.host}:{args.port} nicht erreichbar. "
+              f"Bitte zuerst 'python analysis_server.py' starten.", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+import os
+import json
+import time
+import logging
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from scrapers.analysis_buckets import AnalysisBucket, DEFAULT_BUCKETS
+from scrapers.review_analyzer import ReviewAnalyzer
+from scrapers.logging_setup import setup_logging
+
+# Langlebiger Analyse-Dienst: hält das spaCy-Modell und den Parse-Cache warm, damit Aufträge
+# aus analysis_client.py ohne Import- und Modell-Ladezeit starten. Lauscht nur auf localhost.
+# Jede Anfrage läuft in einem eigenen Thread, damit /status auch während einer Analyse antwortet;
+# die Analysen selbst laufen über server.lock nacheinander.
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+# Dynamischer Pfad zur SQLite-Datenbank und zum Ausgabeverzeichnis
+DB_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), 'DB', 'mueller_crawler.db'))
+OUTPUT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), 'Analyse', 'Data'))
+
+
+class AnalysisRequestHandler(BaseHTTPRequestHandler):
+    """
+    HTTP-Handler des Analyse-Dienstes.
+
+    GET  /status   -> Zustand des Dienstes (bereit/beschaeftigt), antwortet auch während einer Analyse
+    POST /analyze  -> {"buckets": [{"analysis_filename": ..., "rating_filter": [...], "is_negative": ...}],
+                       "top_k": optional}
+                      ohne "buckets" werden die Standard-Auswertungen erstellt
+    POST /shutdown -> beendet den Dienst
+    """
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length", 0))
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def do_GET(self):
+        if self.path != "/status":
+            self._send_json(404, {"error": f"Unbekannter Pfad {self.path}"})
+            return
+        server = self.server
+        self._send_json(200, {
+            "status": "beschaeftigt" if server.lock.locked() else "bereit",
+            "model_version": server.analyzer.model_version,
+            "auftraege": server.jobs_done,
+            "laufzeit_s": round(time.time() - server.started_at, 1),
+        })
+
+    def do_POST(self):
+        if self.path == "/shutdown":
+            self._send_json(200, {"status": "wird beendet"})
+            threading.Thread(target=self.server.shutdown, daemon=True).start()
+            return
+        if self.path != "/analyze":
+            self._send_json(404, {"error": f"Unbekannter Pfad {self.path}"})
+            return
+
+        try:
+            payload = self._read_json()
+            buckets = [
+                AnalysisBucket(bucket["analysis_filename"], list(bucket["rating_filter"]),
+                               bool(bucket.get("is_negative", False)))
+                for bucket in payload.get("buckets") or []
+            ] or list(DEFAULT_BUCKETS)
+            top_k = int(payload["top_k"]) if payload.get("top_k") else None
+        except (ValueError, KeyError, TypeError) as e:
+            self._send_json(400, {"error": f"Ungültiger Auftrag: {e}"})
+            return
+
+        started = time.perf_counter()
+        try:
+            # Aufträge werden nacheinander abgearbeitet, Modell und Datenbank-Session sind nicht threadsicher
+            with self.server.lock:
+                output_files = self.server.analyzer.run_buckets(buckets, top_k=top_k)
+                self.server.jobs_done += 1
+        except Exception as e:
+            logging.error("Fehler bei der Analyse: %s", e)
+            self._send_json(500, {"error": str(e)})
+            return
+        self._send_json(200, {"dateien": output_files, "dauer_s": round(time.perf_counter() - started, 3)})
+
+    def log_message(self, format, *args):
+        logging.info("%s - %s", self.address_string(), format % args)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Startet den lokalen Analyse-Dienst mit vorgeladenem spaCy-Modell.")
+    parser.add_argument("--host", default=DEFAULT_HOST, help=f"Adresse (Standard: {DEFAULT_HOST})")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"Port (Standard: {DEFAULT_PORT})")
+    parser.add_argument("--batch-size", type=int, default=256, help="Reviews pro nlp.pipe-Batch (Standard: 256)")
+    parser.add_argument("--n-process", type=int, default=1, help="Prozesse für nlp.pipe, -1 = alle CPU-Kerne")
+    parser.add_argument("--cache-memory-size", type=int, default=200000,
+                        help="Parse-Cache-Einträge im Arbeitsspeicher (Standard: 200000)")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    setup_logging()
+    logging.info("Lade Analyzer und spaCy-Modell...")
+    analyzer = ReviewAnalyzer(
+        db_path=DB_PATH,
+        output_dir=OUTPUT_DIR,
+        rating_filter=DEFAULT_BUCKETS[0].rating_filter,
+        analysis_filename=DEFAULT_BUCKETS[0].analysis_filename,
+        batch_size=args.batch_size,
+        n_process=args.n_process,
+        cache_memory_size=args.cache_memory_size
+    )
+
+    server = ThreadingHTTPServer((args.host, args.port), AnalysisRequestHandler)
+    server.analyzer = analyzer
+    server.lock = threading.Lock()
+    server.jobs_done = 0
+    server.started_at = time.time()
+    logging.info("Analyse-Dienst bereit auf http://%s:%s", args.host, args.port)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        logging.info("Analyse-Dienst beendet.")
+
+
+if __name__ == "__main__":
+    main()
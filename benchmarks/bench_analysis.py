@@ -0,0 +1,28 @@
+import pytest
+from scrapers.analysis_buckets import DEFAULT_BUCKETS
+
+# Analyse-Durchsatz auf dem BACKUP-Datenbestand (alle Reviews, positive und negative Auswertung)
+
+
+@pytest.mark.benchmark(group="analyse")
+def bench_review_analyzer(benchmark, backup_db_copy, tmp_path):
+    from scrapers.review_analyzer import ReviewAnalyzer
+    # Offline: das Modell wird nicht nachgeladen, ohne installiertes Modell entfällt der Benchmark
+    pytest.importorskip(ReviewAnalyzer.MODEL_NAME)
+
+    # Jede Runde beginnt ohne Parse-Cache und ohne gespeicherte Kombinationen; das Laden des Modells
+    # wird nicht mitgemessen
+    def setup():
+        analyzer = ReviewAnalyzer(backup_db_copy(), str(tmp_path), DEFAULT_BUCKETS[0].rating_filter,
+                                  DEFAULT_BUCKETS[0].analysis_filename, use_cache=False)
+        return (analyzer, DEFAULT_BUCKETS), {}
+
+    benchmark.pedantic(lambda analyzer, buckets: analyzer.run_buckets(buckets), setup=setup, rounds=2)
+
+
+@pytest.mark.benchmark(group="analyse")
+def bench_aspect_scorer(benchmark, backup_db, tmp_path):
+    from scrapers.aspect_scorer import AspectScorer
+    scorer = AspectScorer(backup_db, str(tmp_path))
+    files = benchmark.pedantic(scorer.run_buckets, args=(DEFAULT_BUCKETS,), rounds=3)
+    assert files
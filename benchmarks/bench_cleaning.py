@@ -0,0 +1,16 @@
+import pytest
+from DB.utils import clean_products, clean_reviews
+
+# Bereinigung der Rohdatensätze (DB/utils) auf dem BACKUP-Datenbestand
+
+
+@pytest.mark.benchmark(group="bereinigung")
+def bench_clean_products(benchmark, raw_products):
+    cleaned, _ = benchmark(clean_products, raw_products)
+    benchmark.extra_info["datensaetze"] = len(cleaned)
+
+
+@pytest.mark.benchmark(group="bereinigung")
+def bench_clean_reviews(benchmark, raw_reviews):
+    cleaned, _ = benchmark(clean_reviews, raw_reviews)
+    benchmark.extra_info["datensaetze"] = len(cleaned)
@@ -0,0 +1,49 @@
+from datetime import date
+import msgspec
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from DB.diff import diff_sessions
+from query_all import export_all
+from support import create_database, ingest
+
+# Schreiben (crud, inkl. Aggregate, Duplikaterkennung und Suchindex), CSV-Export (query_all) und
+# Vergleich zweier Sessions (DB/diff.py)
+
+
+@pytest.mark.benchmark(group="datenbank")
+def bench_ingest(benchmark, clean_data, tmp_path):
+    products, reviews = clean_data
+    counter = iter(range(1_000_000))
+
+    # Jede Runde schreibt in eine neue, leere Datenbank; das Anlegen des Schemas wird nicht mitgemessen
+    def setup():
+        engine = create_database(str(tmp_path / f"ingest_{next(counter)}.db"))
+        return (engine, products, reviews), {}
+
+    benchmark.pedantic(ingest, setup=setup, rounds=3)
+    benchmark.extra_info["produkte"] = len(products)
+    benchmark.extra_info["reviews"] = len(reviews)
+
+
+@pytest.mark.benchmark(group="datenbank")
+def bench_export(benchmark, backup_db, tmp_path):
+    engine = create_engine(f"sqlite:///{backup_db}")
+    products = benchmark.pedantic(export_all, args=(engine, str(tmp_path)), rounds=3)
+    benchmark.extra_info["produkte"] = len(products)
+
+
+@pytest.mark.benchmark(group="datenbank")
+def bench_diff_sessions(benchmark, backup_db_copy, clean_data):
+    # Zweite Session eine Woche später: jedes 20. Produkt 10 % günstiger, dieselben Reviews
+    products, reviews = clean_data
+    changed = [msgspec.structs.replace(product, preis=round(product.preis * 0.9, 2))
+               if index % 20 == 0 and product.preis else product for index, product in enumerate(products)]
+    engine = create_engine(f"sqlite:///{backup_db_copy()}")
+    ingest(engine, changed, reviews, session_date=date(2024, 8, 14))
+
+    with sessionmaker(bind=engine)() as db:
+        change_set = benchmark(diff_sessions, db)
+    assert len(change_set.geaendert) == sum(1 for old, new in zip(products, changed) if old is not new)
+    assert not change_set.neu and not change_set.neue_reviews
+    benchmark.extra_info["produkte"] = len(products)
@@ -0,0 +1,37 @@
+import pytest
+from scrapers.link_extractor import LinkExtractor
+from scrapers.product_extractor import ProductExtractor
+from scrapers.review_extractor import ReviewExtractor
+
+# Parse-Durchsatz der Extraktoren auf den aufgezeichneten Seiten (ohne Browser, nur HTML -> Datensätze)
+
+
+@pytest.mark.benchmark(group="parse")
+def bench_listing_page(benchmark, html_fixture):
+    html = html_fixture("listing")
+    links = benchmark(LinkExtractor(None, "").parse_product_links, html)
+    benchmark.extra_info["links_pro_seite"] = len(links)
+    assert links
+
+
+@pytest.mark.benchmark(group="parse")
+def bench_product_page(benchmark, html_fixture):
+    html = html_fixture("product")
+    product = benchmark(ProductExtractor(None).parse_product_page, html, "https://www.mueller.de/p/fixture/")
+    assert product.artikelnummer != "Unbekannt"
+
+
+@pytest.mark.benchmark(group="parse")
+def bench_product_page_json_ld(benchmark, html_fixture):
+    # Dieselbe Produktseite mit eingebettetem JSON-LD: nur die Inhaltsstoffe kommen noch aus dem HTML
+    html = html_fixture("product_jsonld")
+    product = benchmark(ProductExtractor(None).parse_product_page, html, "https://www.mueller.de/p/fixture/")
+    assert product.gesamtrating is not None
+
+
+@pytest.mark.benchmark(group="parse")
+def bench_review_page(benchmark, html_fixture):
+    html = html_fixture("reviews")
+    reviews = benchmark(ReviewExtractor(None).extrahiere_reviews_von_seite, html)
+    benchmark.extra_info["reviews_pro_seite"] = len(reviews)
+    assert reviews
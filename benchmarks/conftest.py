@@ -0,0 +1,110 @@
+import os
+import sys
+import shutil
+import logging
+import pytest
+import pandas as pd
+
+# Offline-Benchmarks: keine Netzwerkzugriffe, kein Browser. Grundlage sind die HTML-Fixtures in fixtures/
+# (Listen-, Produkt- und Bazaarvoice-Reviewseite) und der Datenbestand unter BACKUP/Anlyse/Data.
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+BACKUP_DATA_DIR = os.path.join(REPO_ROOT, "BACKUP", "Anlyse", "Data")
+
+sys.path.insert(0, REPO_ROOT)
+
+from DB.records import ProductRecord, ReviewRecord  # noqa: E402
+from DB.utils import clean_products, clean_reviews  # noqa: E402
+from support import create_database, ingest  # noqa: E402
+
+
+@pytest.fixture(scope="session", autouse=True)
+def log_level():
+    """Wie in main.py: Root-Logger auf INFO, damit die Protokollierung der Extraktoren mitgemessen wird."""
+    logging.getLogger().setLevel(logging.INFO)
+
+
+@pytest.fixture(scope="session")
+def html_fixture():
+    """Liefert den Quelltext einer aufgezeichneten Seite, z.B. ``html_fixture("reviews")``."""
+    cache = {}
+
+    def load(name):
+        if name not in cache:
+            with open(os.path.join(FIXTURE_DIR, f"{name}.html"), "r", encoding="utf-8") as f:
+                cache[name] = f.read()
+        return cache[name]
+    return load
+
+
+def _german_number(value):
+    return f"{float(value):.2f}".replace(".", ",")
+
+
+@pytest.fixture(scope="session")
+def raw_products():
+    """Produkte aus BACKUP/Anlyse/Data/products.csv in der Rohform der Extraktoren (Texte wie auf der Seite)."""
+    df = pd.read_csv(os.path.join(BACKUP_DATA_DIR, "products.csv"), sep=";", keep_default_na=False)
+    return [ProductRecord(
+        produkt_url=row.product_url,
+        artikelnummer=str(row.artikelnummer),
+        produktname=row.produktname,
+        preis=_german_number(row.preis) if row.preis != "" else "Unbekannt",
+        promo_preis=_german_number(row.promo_preis) if row.promo_preis != "" else "N/A",
+        on_promo=bool(row.on_promo),
+        waehrung=row.waehrung,
+        marke=row.marke,
+        artikelbeschreibung=row.artikelbeschreibung or "Unbekannt",
+        inhaltsstoffe=row.inhaltsstoffe or "Unbekannt",
+        gesamtrating=str(row.gesamtrating) if row.gesamtrating != "" else "0",
+        gesamtanzahl_reviews=str(row.gesamtanzahl_reviews),
+        produkt_id=int(row.produkt_id),
+    ) for row in df.itertuples()]
+
+
+@pytest.fixture(scope="session")
+def raw_reviews():
+    """Reviews aus BACKUP/Anlyse/Data/reviews.csv in der Rohform der Extraktoren."""
+    df = pd.read_csv(os.path.join(BACKUP_DATA_DIR, "reviews.csv"), sep=";", keep_default_na=False)
+    return [ReviewRecord(
+        reviewer=row.reviewer,
+        review=row.review,
+        rating=int(row.rating),
+        date=row.date,
+        author_location=row.author_location or "Unbekannt",
+        review_count=int(row.review_count),
+        review_votes=int(row.review_votes),
+        gender=row.gender or "Unbekannt",
+        age=row.age or "Unbekannt",
+        review_id=int(row.review_id),
+        produkt_id=int(row.produkt_id),
+    ) for row in df.itertuples()]
+
+
+@pytest.fixture(scope="session")
+def clean_data(raw_products, raw_reviews):
+    """Bereinigte Produkte und Reviews, wie sie in den Session-JSON-Dateien stehen."""
+    return clean_products(raw_products)[0], clean_reviews(raw_reviews)[0]
+
+
+@pytest.fixture(scope="session")
+def backup_db(tmp_path_factory, clean_data):
+    """Pfad einer einmal befüllten Datenbank mit dem BACKUP-Datenbestand (nur lesend verwenden)."""
+    path = str(tmp_path_factory.mktemp("db") / "backup.db")
+    engine = create_database(path)
+    ingest(engine, *clean_data)
+    engine.dispose()
+    return path
+
+
+@pytest.fixture
+def backup_db_copy(backup_db, tmp_path):
+    """Liefert eine Funktion, die eine frische Kopie der BACKUP-Datenbank anlegt (für schreibende Benchmarks)."""
+    counter = iter(range(1_000_000))
+
+    def make_copy():
+        path = str(tmp_path / f"kopie_{next(counter)}.db")
+        shutil.copyfile(backup_db, path)
+        return path
+    return make_copy
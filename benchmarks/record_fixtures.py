@@ -0,0 +1,58 @@
+import os
+import sys
+import argparse
+import logging
+
+# Zeichnet die HTML-Fixtures der Benchmarks neu auf (Listenseite, Produktseite, Bazaarvoice-Reviewseite).
+# Benötigt Chrome und Netzzugang; die Benchmarks selbst laufen danach wieder vollständig offline.
+# Aufruf vom Projektverzeichnis aus: python benchmarks/record_fixtures.py
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+DEFAULT_URL = "https://www.mueller.de/parfuemerie/duefte-fuer-ihn/duefte/"
+
+sys.path.insert(0, REPO_ROOT)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="HTML-Fixtures für die Benchmarks aufzeichnen.")
+    parser.add_argument("--url", default=DEFAULT_URL, help="URL der Listenseite")
+    parser.add_argument("--produkt", type=int, default=0, help="Index des Produkts auf der Listenseite (Standard: 0)")
+    return parser.parse_args()
+
+
+def save(name, html):
+    path = os.path.join(FIXTURE_DIR, f"{name}.html")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(html)
+    logging.info(f"Fixture gespeichert: {path} ({len(html)} Zeichen)")
+
+
+def main():
+    from scrapers.web_crawler import WebCrawler
+    from scrapers.link_extractor import LinkExtractor
+    from scrapers.review_extractor import ReviewExtractor
+
+    args = parse_args()
+    crawler = WebCrawler(args.url)
+    try:
+        listing_html = crawler.fetch_page_source()
+        save("listing", listing_html)
+
+        links = LinkExtractor(crawler.driver, args.url).parse_product_links(listing_html)
+        product_url = links[args.produkt]
+        crawler.driver.get(product_url)
+        crawler.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+        save("product", crawler.driver.page_source)
+
+        # Die Reviews lädt Bazaarvoice nachträglich in den BVRRContainer
+        if ReviewExtractor(crawler.driver).check_for_reviews():
+            save("reviews", crawler.driver.page_source)
+        else:
+            logging.warning("Keine Reviews gefunden, reviews.html wurde nicht aktualisiert.")
+    finally:
+        crawler.close()
+
+
+if __name__ == "__main__":
+    main()
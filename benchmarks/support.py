@@ -0,0 +1,30 @@
+from datetime import date, time
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from DB import models, crud
+from DB.migrations import migrate_database
+from DB.search import init_search_index
+
+# Gemeinsame Hilfsfunktionen der Benchmarks (Datenbank anlegen und befüllen wie main.py)
+
+SESSION_DATE = date(2024, 8, 7)
+SESSION_TIME = time(18, 17, 40)
+
+
+def create_database(path):
+    """Legt eine leere Datenbank mit dem aktuellen Schema an und gibt die Engine zurück."""
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    models.Base.metadata.create_all(bind=engine)
+    migrate_database(engine)
+    init_search_index(engine)
+    return engine
+
+
+def ingest(engine, products, reviews, session_date=SESSION_DATE):
+    """Schreibt Produkte und Reviews wie main.insert_data_into_db in je einem Batch."""
+    db = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    try:
+        crud.create_products(db, products, session_date, SESSION_TIME)
+        crud.create_reviews(db, reviews, session_date, SESSION_TIME)
+    finally:
+        db.close()
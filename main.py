@@ -1,225 +1,542 @@
 # main.py
 import os
-import json
+import sys
+import argparse
 import logging
-from datetime import datetime, date, time
-from scrapers.web_crawler import WebCrawler
-from scrapers.link_extractor import LinkExtractor
-from scrapers.product_extractor import ProductExtractor
-from scrapers.review_extractor import ReviewExtractor
-from sqlalchemy.orm import Session
-from DB.database import SessionLocal, engine
-from DB import crud, models
-from DB.utils import clean_product_data, clean_review_data
+from collections import Counter
+from datetime import datetime
+from scrapers.crawl_session import (CrawlSession, MissingArtifactError, DEFAULT_OUTPUT_DIR, SESSION_PREFIX,
+                                    TIMESTAMP_FORMAT, LINKS, PRODUCTS, REVIEWS, DEFERRED, FAILED, INGESTED, CHANGES)
+from metrics import METRICS, profiled
+from scrapers.logging_setup import setup_logging, stop_logging
+
+# Kommandozeile der Crawler-Pipeline: crawl links|products|reviews|all, ingest, diff, export, analyze, sessions.
+# Ohne Befehl laufen wie bisher alle Stufen in einer neuen Session inkl. Einfügen in die DB.
+# Selenium, SQLAlchemy, pandas und spaCy werden erst in der jeweiligen Stufe importiert; beim Import
+# dieses Moduls wird weder ein Ordner angelegt noch das Logging verändert.
 
 # TESTMODE-Schalter, für normalbetrieb auf False lassen !!!
-TESTMODE = False 
+TESTMODE = False
 NUMBER_OF_PRODUCTS = 7
 
-# Timestamp für Log-Dateinamen und Ordner
-timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-session_datetime = datetime.now()
-session_date = session_datetime.date()
-session_time = session_datetime.time()
-session_dir = os.path.join("Output", f"Crawler_Session_{timestamp}")
-os.makedirs(session_dir, exist_ok=True)
-
-# Logging-Konfiguration
-log_filename = os.path.join(session_dir, f'crawler_log_{timestamp}.txt')
-logger = logging.getLogger()
-logger.setLevel(logging.INFO)
-
-# Entferne alle vorhandenen Handler
-if logger.hasHandlers():
-    logger.handlers.clear()
-
-# File handler for logging to a file
-file_handler = logging.FileHandler(log_filename)
-file_handler.setLevel(logging.INFO)
-file_formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-file_handler.setFormatter(file_formatter)
-logger.addHandler(file_handler)
-
-# Stream handler for logging to console
-stream_handler = logging.StreamHandler()
-stream_handler.setLevel(logging.INFO)
-stream_formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-stream_handler.setFormatter(stream_formatter)
-logger.addHandler(stream_handler)
-
-# Funktion zum Protokollieren des Startens und Endens einer Funktion
+# Optionales Zeitbudget des Crawlings in Minuten (z.B. CRAWLER_BUDGET_MINUTES=45); die wichtigsten Produkte
+# werden zuerst gecrawlt, der Rest beim nächsten Lauf
+BUDGET_MINUTES = float(os.environ["CRAWLER_BUDGET_MINUTES"]) if os.environ.get("CRAWLER_BUDGET_MINUTES") else None
+
+# Optionales Profiling des gesamten Laufs: CRAWLER_PROFILE=cprofile oder CRAWLER_PROFILE=pyinstrument
+PROFILE_MODE = os.environ.get("CRAWLER_PROFILE")
+
+# URL der Produktseite; CRAWLER_URL zeigt den Crawler z.B. auf den lokalen Ersatz-Shop (shop_server.py)
+DEFAULT_URL = os.environ.get("CRAWLER_URL", "https://www.mueller.de/parfuemerie/duefte-fuer-ihn/duefte/")
+
+logger = logging.getLogger(__name__)
+
+# Funktion zum Protokollieren des Startens und Endens einer Funktion (inkl. Laufzeit in den Metriken)
 def log_function_call(func):
     def wrapper(*args, **kwargs):
-        logging.info(f"Starting {func.__name__}")
-        result = func(*args, **kwargs)
-        logging.info(f"Finished {func.__name__}")
+        logger.info("Starting %s", func.__name__)
+        with METRICS.timer("function_seconds", function=func.__name__):
+            result = func(*args, **kwargs)
+        logger.info("Finished %s", func.__name__)
         return result
     return wrapper
 
-# URL der Produktseite
-url = "https://www.mueller.de/parfuemerie/duefte-fuer-ihn/duefte/"
+def prepare_database():
+    """
+    Erstellt die Datenbanktabellen (falls sie nicht bereits existieren) und ergänzt ältere Datenbanken.
+    """
+    from DB.database import engine
+    from DB import models
+    from DB.search import init_search_index
+    from DB.migrations import migrate_database
 
-@log_function_call
-def main():
-    # Erstellen Sie die Datenbanktabellen (falls sie nicht bereits existieren)
-    logging.info("Erstelle Datenbanktabellen...")
+    logger.info("Erstelle Datenbanktabellen...")
     models.Base.metadata.create_all(bind=engine)
-    logging.info("Datenbanktabellen erstellt.")
+    migrate_database(engine)
+    init_search_index(engine)
+    logger.info("Datenbanktabellen erstellt.")
+
+def create_scheduler(budget_minutes=BUDGET_MINUTES, review_share=None, changes=None):
+    """
+    Reihenfolge der Produkte und Reviews nach Priorität aus dem Stand der bisherigen Sessions.
+    :param review_share: Optional, Anteil des Budgets für die Reviews; 0, wenn nur Produkte gecrawlt werden
+    :param changes: Optional, Pfad eines Change-Sets (``diff``), dessen Produkte bevorzugt werden
+    """
+    from DB.database import SessionLocal
+    from DB.history import load_product_history
+    from DB.diff import decode_change_set
+    from scrapers.crawl_scheduler import CrawlScheduler, DEFAULT_REVIEW_SHARE
+
+    prepare_database()
+    with SessionLocal() as db:
+        history = load_product_history(db)
+    share = DEFAULT_REVIEW_SHARE if review_share is None else review_share
+    scheduler = CrawlScheduler(history, budget_minutes, share)
+    if changes:
+        with open(changes, 'rb') as f:
+            scheduler.apply_changes(decode_change_set(f.read()))
+        logger.info("%s Produkte aus '%s' werden bevorzugt.", len(scheduler.changed_urls), changes)
+    return scheduler
+
+@log_function_call
+def crawl_links(session):
+    """
+    Stufe 1: Alle Produktlinks der Listenseiten sammeln und als ``links_<timestamp>.json`` speichern.
+    """
+    from scrapers.driver_manager import DriverManager
+    from scrapers.link_extractor import LinkExtractor
+
+    url = session.url or DEFAULT_URL
+    with DriverManager(url) as drivers:
+        all_product_links = LinkExtractor(drivers.driver, url).extract_product_links()
+
+    links_filename = session.write_json(LINKS, all_product_links)
+    logger.info("%s Produktlinks wurden in '%s' gespeichert.", len(all_product_links), links_filename)
+    return all_product_links
+
+@log_function_call
+def crawl_products(session, scheduler, limit=None):
+    """
+    Stufe 2: Produktseiten der gesammelten Links nach Priorität crawlen, bereinigen und als
+    ``produkte_<timestamp>.json`` speichern.
+    :param limit: Optional, höchstens so viele Produktseiten besuchen
+    """
+    all_product_links = session.read_json(LINKS)
+    if all_product_links is None:
+        raise MissingArtifactError(f"Keine Produktlinks in {session.directory}, bitte zuerst 'crawl links' ausführen.")
+
+    from scrapers.driver_manager import DriverManager
+    from scrapers.product_extractor import ProductExtractor
+    from DB.utils import clean_products
+    from DB.records import encode_records
 
-    # Instanz der WebCrawler-Klasse erstellen und Seite abrufen
-    crawler = WebCrawler(url)
-    crawler.fetch_page_source()
-    
-    # Instanz der LinkExtractor-Klasse erstellen und alle Produktlinks extrahieren
-    link_extractor = LinkExtractor(crawler.driver, url)
-    all_product_links = link_extractor.extract_product_links()
+    # Browser über den DriverManager starten: Neustart nach einer festen Anzahl Seiten oder bei zu hohem
+    # Speicherverbrauch, hängende oder abgestürzte Sitzungen werden neu gestartet und die URL wiederholt
+    drivers = DriverManager(session.url or DEFAULT_URL)
+    drivers.start()
 
     # Instanz der ProductExtractor-Klasse erstellen
-    product_extractor = ProductExtractor(crawler.driver)
+    product_extractor = ProductExtractor(drivers.driver, drivers.retry_policy)
+    drivers.attach(product_extractor)
 
     # Produktdetails extrahieren
     product_data = []
-    review_product_data = []
 
-    # Anzahl der zu besuchenden Produktseiten basierend auf TESTMODE
-    num_products_to_visit = NUMBER_OF_PRODUCTS if TESTMODE else len(all_product_links)
+    # Anzahl der zu besuchenden Produktseiten
+    product_links = scheduler.order_links(all_product_links)[:limit]
 
-    # Verarbeiten der Produktlinks
+    # Verarbeiten der Produktlinks (Fehler einzelner Links protokolliert der DriverManager)
     product_id = 1
-    for link in all_product_links[:num_products_to_visit]:
-        try:
-            logging.info(f"Verarbeite Produkt-ID: {product_id}")
-            product_details = product_extractor.extract_product_details(link)
-            product_details['Produkt_ID'] = product_id
-
-            # Struktur für JSON-Datei vorbereiten
-            product_data.append(clean_product_data(product_details))
+    try:
+        for link, product_details in drivers.run(scheduler.within_budget(product_links, "produkte"),
+                                                 product_extractor.extract_product_details,
+                                                 keep_going=lambda: scheduler.has_time("produkte")):
+            logger.debug("Verarbeite Produkt-ID: %s", product_id)
+            product_details.produkt_id = product_id
 
-            # Überprüfen, ob das Produkt ein Rating größer als 0 hat
-            if float(product_details.get('GesamtRating', 0)) > 0:
-                review_product_data.append(product_details)
+            # Struktur für JSON-Datei vorbereiten (bereinigt wird danach einmal für alle Produkte)
+            product_data.append(product_details)
 
             product_id += 1
+    finally:
+        drivers.close()
+    save_failed(session, "produkte", drivers.dead_letters.to_list())
+    save_deferred(session, "produkte", scheduler.deferred["produkte"])
 
-        except Exception as e:
-            logging.error(f"Fehler beim Verarbeiten des Links {link}: {e}")
-
-    crawler.close()
+    # Produktdaten einmalig bereinigen; die JSON-Datei enthält danach die endgültigen Werte
+    crawled = len(product_data)
+    with METRICS.timer("clean_seconds", kind="produkte"):
+        product_data, invalid_fields = clean_products(product_data)
+    log_invalid_fields("Produkt", invalid_fields, crawled - len(product_data))
 
     # Produktdaten in JSON-Datei speichern
-    product_json_filename = os.path.join(session_dir, f'produkte_{timestamp}.json')
-    save_clean_json(product_json_filename, product_data)
-    logging.info(f"Produktdaten wurden in '{product_json_filename}' gespeichert.")
+    product_json_filename = session.write_bytes(PRODUCTS, encode_records(product_data))
+    logger.info("Produktdaten wurden in '%s' gespeichert.", product_json_filename)
+    return product_data
+
+@log_function_call
+def crawl_reviews(session, scheduler):
+    """
+    Stufe 3: Reviews der gecrawlten Produkte nach Priorität extrahieren, bereinigen und als
+    ``reviews_<timestamp>.json`` speichern.
+    """
+    if not session.has(PRODUCTS):
+        raise MissingArtifactError(f"Keine Produktdaten in {session.directory}, bitte zuerst 'crawl products' ausführen.")
 
-    # ----------------------------
-    # Schritt 2: Reviews extrahieren
-    # ----------------------------
+    from scrapers.driver_manager import DriverManager
+    from scrapers.review_extractor import ReviewExtractor
+    from DB.utils import clean_reviews
+    from DB.records import ProductRecord, encode_records, decode_records
+    product_data = decode_records(session.read_bytes(PRODUCTS), ProductRecord)
 
-    # Logging-Konfiguration für Review-Crawler
-    crawler = WebCrawler(url)
-    crawler.fetch_page_source()
+    # Nur Produkte mit einem Rating größer als 0 haben Reviews
+    review_product_data = [product for product in product_data if (product.gesamtrating or 0) > 0]
+
+    # Neuer Browser für die Review-Extraktion
+    drivers = DriverManager(session.url or DEFAULT_URL)
+    drivers.start()
 
     # Instanz des ReviewExtractor erstellen
-    review_extractor = ReviewExtractor(crawler.driver)
+    review_extractor = ReviewExtractor(drivers.driver, drivers.retry_policy)
+    drivers.attach(review_extractor)
 
     # Reviews extrahieren
     reviews_data = []
 
     review_id = 1
 
-    for product in review_product_data:
-        try:
-            product_id = product['Produkt_ID']
-            product_url = product['Produkt_URL']
-            logging.info(f"Extrahiere Reviews für Produkt-ID: {product_id}")
+    def extract_reviews(product):
+        return review_extractor.extract_reviews(product.produkt_url, product.artikelnummer, product.produktname)
 
-            # Extrahiere Reviews für das Produkt
-            product_reviews = review_extractor.extract_reviews(product_url, product['Artikelnummer'], product['Produktname'])
+    review_products = scheduler.within_budget(scheduler.order_review_products(review_product_data), "reviews",
+                                              url_of=lambda product: product.produkt_url)
+    try:
+        for product, product_reviews in drivers.run(review_products, extract_reviews,
+                                                    url_of=lambda product: product.produkt_url,
+                                                    keep_going=lambda: scheduler.has_time("reviews")):
+            logger.debug("Reviews für Produkt-ID %s extrahiert.", product.produkt_id)
 
             # Füge die Produkt_ID und eine eindeutige Review_ID zu jedem Review hinzu
             for review in product_reviews:
-                review['Review_ID'] = review_id
-                review['Produkt_ID'] = product_id
-                reviews_data.append(clean_review_data(review))
+                review.review_id = review_id
+                review.produkt_id = product.produkt_id
+                reviews_data.append(review)
                 review_id += 1
+    finally:
+        drivers.close()
+    save_failed(session, "reviews", drivers.dead_letters.to_list())
+    save_deferred(session, "reviews", scheduler.deferred["reviews"])
 
-        except Exception as e:
-            logging.error(f"Fehler beim Extrahieren der Reviews für Produkt {product['Produkt_URL']}: {e}")
-
-    crawler.close()
+    # Review-Daten einmalig bereinigen
+    crawled = len(reviews_data)
+    with METRICS.timer("clean_seconds", kind="reviews"):
+        reviews_data, invalid_fields = clean_reviews(reviews_data)
+    log_invalid_fields("Review", invalid_fields, crawled - len(reviews_data))
 
     # Review-Daten in JSON-Datei speichern
-    review_json_filename = os.path.join(session_dir, f'reviews_{timestamp}.json')
-    save_clean_json(review_json_filename, reviews_data)
-    logging.info(f"Review-Daten wurden in '{review_json_filename}' gespeichert.")
-
-    # ----------------------------
-    # Schritt 3: Daten in die Datenbank einfügen
-    # ----------------------------
-    insert_data_into_db(session_date, session_time)
-
-def save_clean_json(file_path, data):
-    """
-    Speichert die JSON-Daten in einer Datei und entfernt ungewöhnliche Zeilenabschlusszeichen.
-    :param file_path: Pfad zur JSON-Datei
-    :param data: Daten, die gespeichert werden sollen
-    """
-    json_str = json.dumps(data, ensure_ascii=False, indent=4)
-    # Entferne ungewöhnliche Zeilenabschlusszeichen
-    json_str = json_str.replace('\u2028', '').replace('\u2029', '')
-    with open(file_path, 'w', encoding='utf-8') as f:
-        f.write(json_str)
-
-def insert_data_into_db(session_date, session_time):
-    def load_json(file_path):
-        with open(file_path, 'r') as file:
-            return json.load(file)
-
-    def get_json_files(directory):
-        """
-        Gibt die JSON-Dateien in einem Verzeichnis zurück, außer .txt-Dateien
-        :param directory: Das Verzeichnis, das durchsucht werden soll
-        :return: Eine Liste der JSON-Dateien
-        """
-        return [os.path.join(directory, file) for file in os.listdir(directory) if file.endswith('.json')]
-
-    def get_all_json_files(root_directory):
-        """
-        Gibt alle JSON-Dateien in allen Unterverzeichnissen eines Root-Verzeichnisses zurück
-        :param root_directory: Das Root-Verzeichnis
-        :return: Eine Liste der JSON-Dateien
-        """
-        all_json_files = []
-        for subdir in os.listdir(root_directory):
-            full_subdir_path = os.path.join(root_directory, subdir)
-            if os.path.isdir(full_subdir_path):
-                all_json_files.extend(get_json_files(full_subdir_path))
-        return all_json_files
-
-    # Alle JSON-Dateien im Output-Verzeichnis und dessen Unterverzeichnissen laden
-    json_files = get_all_json_files('./Output')
+    review_json_filename = session.write_bytes(REVIEWS, encode_records(reviews_data))
+    logger.info("Review-Daten wurden in '%s' gespeichert.", review_json_filename)
+    return reviews_data
 
+@log_function_call
+def crawl_all(session, limit=None, budget_minutes=BUDGET_MINUTES, changes=None):
+    """
+    Alle Crawling-Stufen nacheinander; Produkte und Reviews teilen sich das Zeitbudget.
+    """
+    scheduler = create_scheduler(budget_minutes, changes=changes)
+    crawl_links(session)
+    crawl_products(session, scheduler, limit)
+    crawl_reviews(session, scheduler)
+
+def log_invalid_fields(label, invalid_fields, dropped=0):
+    """
+    Protokolliert Felder, die sich beim Bereinigen nicht umwandeln ließen (sie werden als NULL gespeichert),
+    und die Anzahl der Datensätze, die wegen eines fehlenden Pflichtfelds verworfen wurden.
+    :param label: Art der Datensätze für die Meldung, z.B. "Produkt"
+    :param invalid_fields: Liste von (Index, Feld, Wert) aus clean_products/clean_reviews
+    :param dropped: Anzahl verworfener Datensätze
+    """
+    if dropped:
+        logger.warning("%s %s-Datensätze ohne Pflichtfeld wurden verworfen.", dropped, label)
+    if not invalid_fields:
+        return
+    per_field = Counter(field for _, field, _ in invalid_fields)
+    logger.warning("%s ungültige %s-Felder: %s", len(invalid_fields), label, dict(per_field))
+    for index, field, value in invalid_fields:
+        logger.debug("%s %s: ungültiger Wert für %s: %r", label, index, field, value)
+
+def save_deferred(session, stage, urls):
+    """
+    Speichert die wegen des Zeitbudgets zurückgestellten URLs einer Stufe im Session-Ordner.
+    """
+    deferred_filename = session.update_json(DEFERRED, stage, urls)
+    if urls:
+        logger.info("Zurückgestellte URLs wurden in '%s' gespeichert.", deferred_filename)
+
+def save_failed(session, stage, entries):
+    """
+    Speichert die auch im zweiten Durchgang fehlgeschlagenen URLs einer Stufe mit Fehlerklasse im Session-Ordner.
+    :param entries: Einträge aus DeadLetters.to_list()
+    """
+    failed_filename = session.update_json(FAILED, stage, entries)
+    if entries:
+        logger.warning("%s URLs sind fehlgeschlagen, siehe '%s'.", len(entries), failed_filename)
+
+def write_session_metrics(session, basename):
+    """
+    Speichert die gesammelten Laufzeit-Metriken der Session als JSON- und Prometheus-Textdatei.
+    """
+    json_path, prom_path = METRICS.write(session.directory, basename)
+    logger.info("Metriken wurden in '%s' und '%s' gespeichert.", json_path, prom_path)
+
+@log_function_call
+def insert_data_into_db(session, force=False):
+    """
+    Fügt Produkte und Reviews einer Session mit deren Datum und Uhrzeit in die Datenbank ein.
+    Bereits eingefügte Dateien stehen in ``eingefuegt_<timestamp>.json`` und werden übersprungen; so kann
+    ``ingest`` schon nach den Produkten laufen und die Reviews später nachholen.
+    :param force: Auch bereits eingefügte Dateien erneut einfügen
+    :return: Anzahl der eingefügten Datensätze je Datei-Art
+    """
+    from DB.database import SessionLocal
+    from DB import crud
+    from DB.records import ProductRecord, ReviewRecord, decode_records
+
+    ingested = {} if force else session.read_json(INGESTED, {})
+    pending = [(prefix, record_type, create) for prefix, record_type, create in (
+        (PRODUCTS, ProductRecord, crud.create_products),
+        (REVIEWS, ReviewRecord, crud.create_reviews),
+    ) if session.has(prefix) and prefix not in ingested]
+    if not pending:
+        logger.info("Nichts einzufügen in %s.", session.directory)
+        return {}
+
+    prepare_database()
+    inserted = {}
+    # Jede Datei wird als ein Batch in einer Transaktion geschrieben (inkl. Aggregat-Tabellen); Produkte
+    # zuerst, die Reviews verweisen auf sie. Die JSON-Dateien wurden beim Crawlen bereits bereinigt.
+    with SessionLocal() as db:
+        for prefix, record_type, create in pending:
+            records = decode_records(session.read_bytes(prefix), record_type)
+            try:
+                create(db, records, session.session_date, session.session_time)
+            except Exception as e:
+                logger.error("Fehler bei der Datenbank-Operation (%s): %s", session.path(prefix), e)
+                raise
+            inserted[prefix] = len(records)
+            ingested[prefix] = {"anzahl": len(records), "zeit": datetime.now().isoformat(timespec="seconds")}
+            session.write_json(INGESTED, ingested)
+    logger.info("In die Datenbank eingefügt aus %s: %s", session.directory, inserted)
+    return inserted
+
+def run_logged(session, name, stage):
+    """
+    Führt eine Stufe mit Log-Datei, optionalem Profiling und Metriken im Session-Ordner aus.
+    Bei der kompletten Pipeline (``name`` None) heißen die Dateien wie bisher, sonst mit Namen der Stufe,
+    damit gleichzeitig laufende Stufen einer Session nicht in dieselbe Datei schreiben.
+    """
+    suffix = session.timestamp if name is None else f"{name}_{session.timestamp}"
+    # Log-Datei als JSON Lines (ein Datensatz pro Zeile); Level einzelner Module über CRAWLER_LOG_LEVELS
+    setup_logging(os.path.join(session.directory, f'crawler_log_{suffix}.jsonl'))
+    logger.info("Session: %s", session.directory)
+    profile_suffix = "html" if PROFILE_MODE == "pyinstrument" else "pstats"
     try:
-        # DB-Session erstellen
-        logging.info("Erstelle Datenbank-Sitzung...")
-        db: Session = SessionLocal()
-        logging.info("Datenbank-Sitzung erfolgreich erstellt.")
-
-        # JSON-Dateien durchgehen und Daten zur Datenbank hinzufügen
-        for json_file in json_files:
-            data = load_json(json_file)
-            if 'produkte' in json_file:
-                for product in data:
-                    crud.create_product(db, clean_product_data(product), session_date, session_time)
-            elif 'reviews' in json_file:
-                for review in data:
-                    crud.create_review(db, clean_review_data(review), session_date, session_time)
-
-    except Exception as e:
-        logging.error(f"Fehler bei der Datenbank-Operation: {e}")
+        with profiled(PROFILE_MODE, os.path.join(session.directory, f'profil_{suffix}.{profile_suffix}')):
+            return stage()
     finally:
-        db.close()
-        logging.info("Datenbank-Sitzung geschlossen.")
+        write_session_metrics(session, f'metrics_{suffix}')
+        stop_logging()
+
+def select_sessions(args, create=False):
+    """
+    Sessions eines Befehls: ``--session`` (mehrfach), ``--all`` oder die jüngste Session im Ausgabeverzeichnis
+    bzw. eine neue, wenn ``create`` gesetzt ist.
+    """
+    if getattr(args, "all", False):
+        return CrawlSession.all(args.output_dir)
+    if args.session:
+        return [CrawlSession.open(directory) for directory in args.session]
+    if create:
+        return [CrawlSession.create(args.url or DEFAULT_URL, args.output_dir)]
+    return [CrawlSession.latest(args.output_dir)]
+
+def run_crawl(args):
+    # Links und der komplette Durchlauf beginnen ohne --session eine neue Session
+    session, = select_sessions(args, create=args.stage in ("links", "all"))
+    limit = args.limit or (NUMBER_OF_PRODUCTS if TESTMODE else None)
+    if args.stage == "links":
+        stage = lambda: crawl_links(session)
+    elif args.stage == "products":
+        # Einzeln gestartet bekommt jede Stufe das ganze Zeitbudget
+        stage = lambda: crawl_products(session, create_scheduler(args.budget_minutes, 0, args.changes), limit)
+    elif args.stage == "reviews":
+        stage = lambda: crawl_reviews(session, create_scheduler(args.budget_minutes, changes=args.changes))
+    else:
+        stage = lambda: crawl_all(session, limit, args.budget_minutes, args.changes)
+    run_logged(session, None if args.stage == "all" else args.stage, stage)
+    print(session.directory)
+
+def run_pipeline(args):
+    # Wie früher "python main.py": alle Stufen in einer neuen Session, danach in die DB einfügen
+    session = CrawlSession.create(DEFAULT_URL, args.output_dir)
+    limit = NUMBER_OF_PRODUCTS if TESTMODE else None
+
+    def stage():
+        crawl_all(session, limit)
+        insert_data_into_db(session)
+    run_logged(session, None, stage)
+
+def run_ingest(args):
+    sessions = select_sessions(args)
+    for session in sessions:
+        run_logged(session, "ingest", lambda: insert_data_into_db(session, args.force))
+
+def run_export(args):
+    # pandas wird nur für den Export geladen
+    from query_all import export_all, get_engine, OUTPUT_DIR
+    setup_logging()
+    try:
+        output_dir = args.csv_dir or OUTPUT_DIR
+        export_all(get_engine(), output_dir)
+        logger.info("CSV-Dateien wurden in '%s' gespeichert.", output_dir)
+    finally:
+        stop_logging()
+
+def not_crawled(session):
+    """
+    URLs, die in einer Session wegen des Zeitbudgets zurückgestellt wurden oder fehlgeschlagen sind.
+    Ohne Session-Ordner sind beide Mengen leer.
+    :return: (Produkt-URLs, Produkt-URLs, deren Reviews nicht gecrawlt wurden)
+    """
+    deferred = session.read_json(DEFERRED, {})
+    failed = session.read_json(FAILED, {})
+
+    def urls(stage):
+        return set(deferred.get(stage, ())) | {entry["url"] for entry in failed.get(stage, ())}
+
+    return urls("produkte"), urls("reviews")
+
+def session_at(output_dir, when):
+    """
+    Session-Ordner zu einem Zeitpunkt der Datenbank (der Ordner muss nicht existieren).
+    """
+    timestamp = when.strftime(TIMESTAMP_FORMAT)
+    return CrawlSession(os.path.join(output_dir, f"{SESSION_PREFIX}{timestamp}"), timestamp)
+
+def session_snapshot(session):
+    """
+    Stand einer Session aus ihren Dateien für ``diff``, ohne Datenbank.
+    """
+    from DB.diff import snapshot_from_records
+    from DB.records import ProductRecord, ReviewRecord, decode_records
+
+    if not session.has(PRODUCTS):
+        raise MissingArtifactError(f"Keine Produktdaten in {session.directory}.")
+    products = decode_records(session.read_bytes(PRODUCTS), ProductRecord)
+    reviews = decode_records(session.read_bytes(REVIEWS), ReviewRecord) if session.has(REVIEWS) else []
+    return snapshot_from_records(session.timestamp, products, reviews, *not_crawled(session))
+
+def run_diff(args):
+    from DB.diff import compare_snapshots, diff_sessions, list_sessions, encode_change_set, session_label
+    from DB.database import SessionLocal
+
+    setup_logging()
+    try:
+        if args.list:
+            prepare_database()
+            with SessionLocal() as db:
+                for session_date, session_time in list_sessions(db):
+                    print(session_label(session_date, session_time))
+            return
+        # Zwei Session-Ordner werden über ihre Dateien verglichen, sonst zwei Sessions der Datenbank
+        if args.von and os.path.isdir(args.von) or args.bis and os.path.isdir(args.bis):
+            if not (args.von and args.bis):
+                raise MissingArtifactError("Beim Vergleich von Session-Ordnern sind --von und --bis nötig.")
+            newer = CrawlSession.open(args.bis)
+            with METRICS.timer("function_seconds", function="diff"):
+                change_set = compare_snapshots(session_snapshot(CrawlSession.open(args.von)), session_snapshot(newer))
+        else:
+            prepare_database()
+            try:
+                with SessionLocal() as db, METRICS.timer("function_seconds", function="diff"):
+                    change_set = diff_sessions(db, datetime.fromisoformat(args.von) if args.von else None,
+                                               datetime.fromisoformat(args.bis) if args.bis else None,
+                                               lambda when: not_crawled(session_at(args.output_dir, when)))
+            except ValueError as e:
+                # Zu wenige Sessions oder ungültiger Zeitpunkt
+                raise MissingArtifactError(str(e)) from e
+            newer = session_at(args.output_dir, datetime.fromisoformat(change_set.bis))
+
+        # Standard: aenderungen_<timestamp>.json im Ordner der neueren Session, ohne Ordner im Ausgabeverzeichnis
+        data = encode_change_set(change_set)
+        if args.output:
+            with open(args.output, 'wb') as f:
+                f.write(data)
+            output = args.output
+        elif os.path.isdir(newer.directory):
+            output = newer.write_bytes(CHANGES, data)
+        else:
+            os.makedirs(args.output_dir, exist_ok=True)
+            output = os.path.join(args.output_dir, os.path.basename(newer.path(CHANGES)))
+            with open(output, 'wb') as f:
+                f.write(data)
+        logger.info("Änderungen %s: %s", change_set.summary(), output)
+        print(output)
+    finally:
+        stop_logging()
+
+def run_analyze(args):
+    import run_analysis
+    run_analysis.main(args.analysis_args)
+
+def run_sessions(args):
+    # Nur Standardbibliothek: Übersicht, welche Dateien die Sessions schon enthalten
+    for session in CrawlSession.all(args.output_dir):
+        stages = [prefix for prefix in (LINKS, PRODUCTS, REVIEWS, INGESTED, CHANGES, DEFERRED, FAILED)
+                  if session.has(prefix)]
+        print(f"{session.directory}\t{' '.join(stages) or '-'}")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Crawler für mueller.de. Ohne Befehl laufen alle Stufen in einer neuen Session "
+                    "inkl. Einfügen in die Datenbank."
+    )
+    parser.add_argument("--output-dir", default=DEFAULT_OUTPUT_DIR,
+                        help=f"Verzeichnis der Session-Ordner (Standard: {DEFAULT_OUTPUT_DIR})")
+    commands = parser.add_subparsers(dest="command")
+
+    crawl = commands.add_parser("crawl", help="Eine Crawling-Stufe oder alle Stufen ausführen")
+    crawl.add_argument("stage", choices=["links", "products", "reviews", "all"],
+                       help="links und all beginnen eine neue Session, products und reviews setzen die jüngste fort")
+    crawl.add_argument("--session", action="append", help="Session-Ordner statt der jüngsten bzw. einer neuen")
+    crawl.add_argument("--url", help="Start-URL einer neuen Session (Standard: CRAWLER_URL bzw. mueller.de)")
+    crawl.add_argument("--limit", type=int, help="Höchstens so viele Produktseiten besuchen")
+    crawl.add_argument("--budget-minutes", type=float, default=BUDGET_MINUTES,
+                       help="Zeitbudget in Minuten (Standard: CRAWLER_BUDGET_MINUTES, sonst unbegrenzt)")
+    crawl.add_argument("--changes", help="Change-Set aus 'diff', dessen neue und geänderte Produkte zuerst gecrawlt werden")
+
+    ingest = commands.add_parser("ingest", help="Produkte und Reviews einer Session in die Datenbank einfügen")
+    ingest.add_argument("--session", action="append", help="Session-Ordner, mehrfach angebbar (Standard: die jüngste)")
+    ingest.add_argument("--all", action="store_true", help="Alle Sessions im Ausgabeverzeichnis")
+    ingest.add_argument("--force", action="store_true", help="Bereits eingefügte Dateien erneut einfügen")
+
+    diff = commands.add_parser("diff", help="Änderungen zwischen zwei Sessions (Standard: die letzten beiden der DB)")
+    diff.add_argument("--von", help="Ältere Session: Zeitpunkt aus 'diff --list' oder ein Session-Ordner")
+    diff.add_argument("--bis", help="Neuere Session: Zeitpunkt aus 'diff --list' oder ein Session-Ordner")
+    diff.add_argument("--output", help="Datei des Change-Sets (Standard: aenderungen_<timestamp>.json der neueren Session)")
+    diff.add_argument("--list", action="store_true", help="Sessions in der Datenbank auflisten")
+
+    export = commands.add_parser("export", help="Datenbank als CSV-Dateien exportieren (query_all.py)")
+    export.add_argument("--csv-dir", help="Zielverzeichnis (Standard: Analyse/Data)")
+
+    # Alle weiteren Argumente (auch --help) gehen an run_analysis.py, z.B. "analyze --batch --mode fast"
+    commands.add_parser("analyze", add_help=False, help="Review-Analyse (run_analysis.py), Argumente werden durchgereicht")
+
+    commands.add_parser("sessions", help="Sessions und ihre vorhandenen Dateien auflisten")
+    args, analysis_args = parser.parse_known_args(argv)
+    if analysis_args and args.command != "analyze":
+        parser.error(f"unbekannte Argumente: {' '.join(analysis_args)}")
+    args.analysis_args = analysis_args
+    if args.command == "crawl" and args.session and len(args.session) > 1:
+        parser.error("crawl verarbeitet genau eine Session")
+    return args
+
+def main(argv=None):
+    args = parse_args(argv)
+    commands = {
+        None: run_pipeline,
+        "crawl": run_crawl,
+        "ingest": run_ingest,
+        "diff": run_diff,
+        "export": run_export,
+        "analyze": run_analyze,
+        "sessions": run_sessions,
+    }
+    try:
+        commands[args.command](args)
+    except MissingArtifactError as e:
+        print(e, file=sys.stderr)
+        sys.exit(1)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,225 @@
+import os
+import json
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from functools import wraps
+
+logger = logging.getLogger(__name__)
+
+# Leichtgewichtige Laufzeit-Metriken für Crawler, Bereinigung und Datenbank (nur Standardbibliothek).
+# Zähler und Histogramme werden prozessweit in METRICS gesammelt und am Ende einer Session als JSON
+# und im Prometheus-Textformat gespeichert. So lässt sich vor und nach jeder Optimierung vergleichen,
+# wie viel Zeit auf Seitenaufrufe, Wartezeiten, Pausen, Parsing und DB-Batches entfällt.
+# Das Modul liegt bewusst weder in scrapers noch in DB, damit beide es nutzen, ohne voneinander abzuhängen.
+
+# Obergrenzen der Histogramm-Buckets in Sekunden
+DEFAULT_BUCKETS = (0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class Histogram:
+    """
+    Verteilung von Messwerten mit festen Buckets sowie Anzahl, Summe, Minimum und Maximum.
+    """
+
+    __slots__ = ("buckets", "counts", "count", "sum", "min", "max")
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+                break
+
+    def to_dict(self):
+        return {
+            "anzahl": self.count,
+            "summe_s": round(self.sum, 6),
+            "mittel_s": round(self.sum / self.count, 6) if self.count else None,
+            "min_s": self.min,
+            "max_s": self.max,
+            "buckets": {str(bound): count for bound, count in zip(self.buckets, self.counts)},
+        }
+
+
+class MetricsRegistry:
+    """
+    Sammelt Zähler und Zeit-Histogramme, jeweils nach Name und Labels getrennt. Threadsicher.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+        self.started_at = time.time()
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted(labels.items()))
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+            self.started_at = time.time()
+
+    def inc(self, name, value=1, **labels):
+        """Erhöht einen Zähler, z.B. ``METRICS.inc("db_rows_total", 500, table="reviews")``."""
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, seconds, **labels):
+        """Trägt eine Dauer in Sekunden in das Histogramm ``name`` ein."""
+        key = self._key(name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(self.buckets)
+            histogram.observe(seconds)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """
+        Misst die Dauer eines Blocks, z.B. ``with METRICS.timer("crawler_fetch_seconds", page="produkt"):``.
+        Endet der Block mit einer Ausnahme, wird zusätzlich ``<name>_fehler_total`` gezählt.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            self.inc(f"{name.removesuffix('_seconds')}_fehler_total", **labels)
+            raise
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def timed(self, name, **labels):
+        """Dekorator-Variante von ``timer``."""
+        def decorator(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.timer(name, **labels):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def sleep(self, seconds, reason):
+        """Bewusste Pause (time.sleep), die als ``crawler_sleep_seconds`` mit Grund erfasst wird."""
+        time.sleep(seconds)
+        self.observe("crawler_sleep_seconds", seconds, reason=reason)
+
+    def snapshot(self):
+        """
+        Liefert alle Metriken als JSON-fähiges Dictionary.
+        """
+        with self._lock:
+            counters = [{"name": name, "labels": dict(labels), "wert": value}
+                        for (name, labels), value in sorted(self._counters.items())]
+            histograms = [{"name": name, "labels": dict(labels), **histogram.to_dict()}
+                          for (name, labels), histogram in sorted(self._histograms.items())]
+        return {
+            "gestartet": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started_at)),
+            "laufzeit_s": round(time.time() - self.started_at, 3),
+            "zaehler": counters,
+            "histogramme": histograms,
+        }
+
+    def to_prometheus(self):
+        """
+        Liefert alle Metriken im Prometheus-Textformat (z.B. für den node_exporter-Textfile-Collector).
+        """
+        def label_text(labels, extra=()):
+            pairs = list(labels) + list(extra)
+            if not pairs:
+                return ""
+            escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+                       for _, value in pairs)
+            return "{" + ",".join(f'{key}="{value}"' for (key, _), value in zip(pairs, escaped)) + "}"
+
+        lines = []
+        with self._lock:
+            typed = set()
+            for (name, labels), value in sorted(self._counters.items()):
+                if name not in typed:
+                    lines.append(f"# TYPE {name} counter")
+                    typed.add(name)
+                lines.append(f"{name}{label_text(labels)} {value}")
+            for (name, labels), histogram in sorted(self._histograms.items()):
+                if name not in typed:
+                    lines.append(f"# TYPE {name} histogram")
+                    typed.add(name)
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{label_text(labels, [('le', bound)])} {cumulative}")
+                lines.append(f"{name}_bucket{label_text(labels, [('le', '+Inf')])} {histogram.count}")
+                lines.append(f"{name}_sum{label_text(labels)} {histogram.sum:.6f}")
+                lines.append(f"{name}_count{label_text(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, directory, basename):
+        """
+        Schreibt ``<basename>.json`` und ``<basename>.prom`` in das angegebene Verzeichnis.
+
+        Rückgabe:
+        tuple: Pfade der JSON- und der Prometheus-Datei.
+        """
+        os.makedirs(directory, exist_ok=True)
+        json_path = os.path.join(directory, f"{basename}.json")
+        prom_path = os.path.join(directory, f"{basename}.prom")
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(), f, ensure_ascii=False, indent=2)
+        with open(prom_path, "w", encoding="utf-8") as f:
+            f.write(self.to_prometheus())
+        return json_path, prom_path
+
+
+# Prozessweite Instanz, die von Scrapern, Bereinigung und crud gemeinsam genutzt wird
+METRICS = MetricsRegistry()
+
+
+@contextmanager
+def profiled(mode, output_path):
+    """
+    Optionales Profiling eines Blocks. ``mode`` ist None (kein Profiling), "cprofile" (Standardbibliothek,
+    Ergebnis als .pstats) oder "pyinstrument" (muss installiert sein, Ergebnis als HTML).
+    """
+    if not mode:
+        yield
+        return
+    if mode == "cprofile":
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            profiler.dump_stats(output_path)
+            logger.info("cProfile-Ergebnis gespeichert: %s", output_path)
+    elif mode == "pyinstrument":
+        from pyinstrument import Profiler
+        profiler = Profiler()
+        profiler.start()
+        try:
+            yield
+        finally:
+            profiler.stop()
+            with open(output_path, "w", encoding="utf-8") as f:
+                f.write(profiler.output_html())
+            logger.info("pyinstrument-Ergebnis gespeichert: %s", output_path)
+    else:
+        raise ValueError(f"Unbekannter Profiling-Modus: {mode}")
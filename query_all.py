@@ -1,40 +1,71 @@
 import os
-import sys
 import pandas as pd
-from collections import Counter
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
 
 # Dynamischer Pfad zur SQLite-Datenbank
 db_path = os.path.join(os.path.dirname(__file__), 'DB/mueller_crawler.db')
 SQLALCHEMY_DATABASE_URL = f"sqlite:///{db_path}"
 
-# Erstelle eine Engine und eine Session
-engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-# Füge den Pfad zum DB-Verzeichnis zu sys.path hinzu
-sys.path.append(os.path.join(os.path.dirname(__file__), 'DB'))
+def get_engine():
+    """
+    Erstellt die Engine der Datenbank erst beim Export, nicht schon beim Import des Moduls.
+    """
+    from sqlalchemy import create_engine
+    return create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
 
 
 # Definiere den Namen der Tabellen, die du laden möchtest
 table_products = 'products'
 table_reviews = 'reviews'
 
-# SQL-Abfrage mit RAW-SQL
-sql_query = f"SELECT * FROM {table_products}"
+# Zielverzeichnis der CSV-Dateien
+OUTPUT_DIR = 'Analyse/Data'
 
-# Lade die Tabelle in ein Pandas DataFrame
-df_products = pd.read_sql_query(sql_query, engine)
-df_csv_export = df_products.to_csv('Analyse/Data/products.csv', sep=';')
+# Aggregat-Tabellen für das Dashboard (nur vorberechnete Zeilen, kein Scan der Reviews)
+aggregate_queries = {
+    'agg_product_ratings': "SELECT * FROM agg_product_ratings ORDER BY produkt_id, rating",
+    'agg_review_months': "SELECT * FROM agg_review_months ORDER BY produkt_id, monat",
+    'agg_price_history': "SELECT * FROM agg_price_history ORDER BY artikelnummer, session_date, session_time",
+    'agg_brands': (
+        "SELECT marke, session_date, session_time, anzahl_produkte, anzahl_promo, anzahl_reviews, "
+        "CASE WHEN preis_anzahl > 0 THEN preis_summe / preis_anzahl END AS durchschnittspreis, "
+        "CASE WHEN anzahl_reviews > 0 THEN CAST(rating_summe AS FLOAT) / anzahl_reviews END AS durchschnittsrating "
+        "FROM agg_brands ORDER BY marke, session_date, session_time"
+    ),
+}
 
-# SQL-Abfrage mit RAW-SQL
-sql_query = f"SELECT * FROM {table_reviews}"
 
-# Lade die Tabelle in ein Pandas DataFrame
-df_reviews = pd.read_sql_query(sql_query, engine)
-df_csv_export = df_reviews.to_csv('Analyse/Data/reviews.csv', sep=';')
+def export_all(engine, output_dir=OUTPUT_DIR):
+    """
+    Exportiert Produkte, Reviews und Aggregat-Tabellen als CSV-Dateien.
+    :param engine: SQLAlchemy-Engine der Datenbank
+    :param output_dir: Zielverzeichnis der CSV-Dateien
+    :return: Das DataFrame der Produkte
+    """
+    # SQL-Abfrage mit RAW-SQL
+    sql_query = f"SELECT * FROM {table_products}"
 
+    # Lade die Tabelle in ein Pandas DataFrame
+    df_products = pd.read_sql_query(sql_query, engine)
+    df_products.to_csv(os.path.join(output_dir, 'products.csv'), sep=';')
 
-# DataFrame anzeigen
-print(df_products)
+    # SQL-Abfrage mit RAW-SQL; duplikat_von verweist bei erkannten Duplikaten auf das Original (sonst leer)
+    sql_query = (
+        f"SELECT r.*, d.cluster_id AS duplikat_von FROM {table_reviews} r "
+        f"LEFT JOIN review_duplicates d ON d.review_id = r.id"
+    )
+
+    # Lade die Tabelle in ein Pandas DataFrame
+    df_reviews = pd.read_sql_query(sql_query, engine)
+    df_reviews.to_csv(os.path.join(output_dir, 'reviews.csv'), sep=';')
+
+    for name, query in aggregate_queries.items():
+        pd.read_sql_query(query, engine).to_csv(os.path.join(output_dir, f'{name}.csv'), sep=';', index=False)
+    return df_products
+
+
+if __name__ == "__main__":
+    df_products = export_all(get_engine())
+
+    # DataFrame anzeigen
+    print(df_products)
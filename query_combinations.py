@@ -0,0 +1,55 @@
+import os
+import argparse
+import pandas as pd
+from scrapers.combination_matrix import CombinationMatrix
+
+# Verzeichnis der Produkt x Kombination-Matrizen, die run_analysis.py je Auswertung schreibt
+MATRIX_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), 'Analyse', 'Data', 'matrix'))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Abfragen über die gespeicherte Produkt x Kombination-Matrix.")
+    parser.add_argument("--auswertung", default="positive_product_features",
+                        help="Name der Auswertung (Standard: positive_product_features)")
+    parser.add_argument("--limit", type=int, default=10, help="Maximale Anzahl Zeilen (Standard: 10)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    top = subparsers.add_parser("top", help="Häufigste Kombinationen eines Produkts")
+    top.add_argument("marke")
+    top.add_argument("produktname")
+
+    similar = subparsers.add_parser("similar", help="Produkte mit ähnlichstem Kombinationsprofil")
+    similar.add_argument("marke")
+    similar.add_argument("produktname")
+
+    term = subparsers.add_parser("term", help="Produkte, in deren Reviews eine Kombination vorkommt")
+    term.add_argument("kombination", help='z.B. "lange halten"')
+
+    brands = subparsers.add_parser("brands", help="Marken, die eine Kombination überdurchschnittlich oft nennen")
+    brands.add_argument("kombination")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    matrix = CombinationMatrix.load(os.path.join(MATRIX_DIR, args.auswertung))
+
+    try:
+        if args.command == "top":
+            result = matrix.top_terms(args.marke, args.produktname, args.limit)
+        elif args.command == "similar":
+            result = matrix.similar_products(args.marke, args.produktname, args.limit)
+        elif args.command == "term":
+            result = matrix.products_for_term(args.kombination, args.limit)
+        else:
+            result = matrix.brand_lift(args.kombination).head(args.limit)
+    except KeyError as e:
+        print(e.args[0])
+        return
+
+    with pd.option_context("display.max_rows", None, "display.width", None, "display.max_colwidth", 60):
+        print(result.to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
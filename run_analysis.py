@@ -1,12 +1,35 @@
 import os
 import sys
+import argparse
 import colorama
 from colorama import Fore, Style
-from scrapers.review_analyzer import ReviewAnalyzer
-from DB.models import Review 
+from scrapers.analysis_buckets import DEFAULT_BUCKETS, parse_bucket
 
 colorama.init(autoreset=True)
 
+# Dynamischer Pfad zur SQLite-Datenbank und zum Ausgabeverzeichnis
+DB_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), 'DB', 'mueller_crawler.db'))
+OUTPUT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), 'Analyse', 'Data'))
+
+# Der Analyzer (inkl. SpaCy-Modell) wird nur einmal pro Programmlauf erstellt
+_analyzer = None
+
+
+def get_analyzer(batch_size=256, n_process=1):
+    global _analyzer
+    if _analyzer is None:
+        # Erst hier importieren: spaCy, pandas und SQLAlchemy werden nur geladen, wenn wirklich analysiert wird
+        from scrapers.review_analyzer import ReviewAnalyzer
+        _analyzer = ReviewAnalyzer(
+            db_path=DB_PATH,
+            output_dir=OUTPUT_DIR,
+            rating_filter=DEFAULT_BUCKETS[0].rating_filter,
+            analysis_filename=DEFAULT_BUCKETS[0].analysis_filename,
+            batch_size=batch_size,
+            n_process=n_process
+        )
+    return _analyzer
+
 
 def print_banner():
     print(Fore.CYAN + Style.BRIGHT + "=" * 50)
@@ -29,36 +52,66 @@ def validate_choice(choice):
         return False
 
 
-def analyze(choice):
-    # Dynamischer Pfad zur SQLite-Datenbank
-    db_path = os.path.abspath(os.path.join(os.path.dirname(__file__), 'DB', 'mueller_crawler.db'))
-    output_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), 'Analyse', 'Data'))
-
+def analyze(choice, args=None):
+    """
+    Führt die im Menü gewählte Auswertung aus, mit den Optionen der Kommandozeile (Modus, Lexikon, Top-k, Batches).
+    """
+    args = args or parse_args([])
     if choice == "1":
         print(Fore.GREEN + "Sie haben sich für die Analyse der positiven Eigenschaften entschieden.")
-        analyzer = ReviewAnalyzer(
-            db_path=db_path,
-            output_dir=output_dir,
-            rating_filter=[4, 5],
-            analysis_filename='positive_product_features',
-            is_negative=False  # Standardlogik für positive Bewertungen
-        )
+        bucket = DEFAULT_BUCKETS[0]  # Standardlogik für positive Bewertungen
     elif choice == "2":
         print(Fore.GREEN + "Sie haben sich für die Analyse der negativen Eigenschaften entschieden.")
-        analyzer = ReviewAnalyzer(
-            db_path=db_path,
-            output_dir=output_dir,
-            rating_filter=[1, 2],
-            analysis_filename='negative_product_features',
-            is_negative=True  # Weniger restriktive Logik für negative Bewertungen
-        )
+        bucket = DEFAULT_BUCKETS[1]  # Weniger restriktive Logik für negative Bewertungen
 
     print(Fore.YELLOW + "Analyse läuft...")
-    analyzer.run_analysis()
+    run_buckets([bucket], args)
     print(Fore.GREEN + "Analyse abgeschlossen!")
 
 
-def main():
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Review Analyzer. Ohne --batch/--bucket startet das interaktive Menü (mit den übrigen Optionen), "
+                    "mit --batch laufen alle Auswertungen ohne Rückfragen (z.B. per Cron)."
+    )
+    parser.add_argument("--batch", action="store_true",
+                        help="Positive (4-5) und negative (1-2) Auswertung in einem Durchlauf erstellen")
+    parser.add_argument("--bucket", type=parse_bucket, action="append", default=[],
+                        help="Zusätzliche Auswertung NAME:BEWERTUNGEN[:neg], mehrfach angebbar")
+    parser.add_argument("--top-k", type=int, help="Zusätzlich die k häufigsten Kombinationen je Marke und gesamt schreiben")
+    parser.add_argument("--batch-size", type=int, default=256, help="Reviews pro nlp.pipe-Batch (Standard: 256)")
+    parser.add_argument("--n-process", type=int, default=1, help="Prozesse für nlp.pipe, -1 = alle CPU-Kerne")
+    parser.add_argument("--mode", choices=["spacy", "fast"], default="spacy",
+                        help="spacy = Dependency-Parsing (Standard), fast = lexikonbasierte Aspekt-Auswertung ohne spaCy")
+    parser.add_argument("--lexicon", help="Eigene Lexikon-Datei (JSON) für --mode fast")
+    return parser.parse_args(argv)
+
+
+def run_buckets(buckets, args):
+    """
+    Erstellt die Auswertungen im gewählten Modus und gibt die Pfade der geschriebenen Dateien zurück.
+    """
+    if args.mode == "fast":
+        # Kein spaCy nötig: Aspekte, Polarität und Summen werden über Sparse-Matrizen berechnet
+        from scrapers.aspect_scorer import AspectScorer, DEFAULT_LEXICON_PATH
+        scorer = AspectScorer(DB_PATH, OUTPUT_DIR, lexicon_path=args.lexicon or DEFAULT_LEXICON_PATH)
+        return scorer.run_buckets(buckets)
+    analyzer = get_analyzer(batch_size=args.batch_size, n_process=args.n_process)
+    return analyzer.run_buckets(buckets, top_k=args.top_k)
+
+
+def run_batch(args):
+    buckets = (list(DEFAULT_BUCKETS) if args.batch else []) + args.bucket
+    for output_file in run_buckets(buckets, args):
+        print(f"Geschrieben: {output_file}")
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.batch or args.bucket:
+        run_batch(args)
+        return
+
     print_banner()
     while True:
         print_menu()
@@ -67,7 +120,7 @@ def main():
             if choice == "3":
                 print(Fore.CYAN + "Programm wird beendet. Auf Wiedersehen!")
                 sys.exit(0)
-            analyze(choice)
+            analyze(choice, args)
 
 
 if __name__ == "__main__":
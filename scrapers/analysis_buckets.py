@@ -0,0 +1,48 @@
+import argparse
+from collections import namedtuple
+
+# Leichtgewichtiges Modul ohne spaCy/pandas-Abhängigkeiten, damit CLI und Client schnell starten.
+
+class AnalysisBucket(namedtuple("AnalysisBucket", ["analysis_filename", "rating_filter", "is_negative"])):
+    """
+    Eine Auswertung über einen Rating-Bereich: Dateiname der CSV, Bewertungen und Filterlogik.
+    """
+
+    __slots__ = ()
+
+    @property
+    def min_count(self):
+        """
+        Häufigkeit, die eine Kombination überschreiten muss, um ins Ergebnis zu kommen (ReviewAnalyzer und
+        AspectScorer). Negative Bewertungen sind seltener, dort zählt auch eine einzelne Nennung.
+
+        Rückgabe:
+        int: 0 für negative Bewertungen, sonst 2.
+        """
+        return 0 if self.is_negative else 2
+
+# Standard-Auswertungen des Tools (entsprechen den Menüpunkten in run_analysis.py)
+DEFAULT_BUCKETS = [
+    AnalysisBucket("positive_product_features", [4, 5], False),
+    AnalysisBucket("negative_product_features", [1, 2], True),
+]
+
+
+def parse_bucket(value):
+    """
+    Liest einen Bucket im Format NAME:BEWERTUNGEN[:neg], z.B. "neutrale_features:3" oder "kritisch:1,2,3:neg".
+
+    Parameter:
+    value (str): Die Bucket-Angabe von der Kommandozeile.
+
+    Rückgabe:
+    AnalysisBucket: Der gelesene Bucket.
+    """
+    parts = value.split(":")
+    if len(parts) not in (2, 3) or (len(parts) == 3 and parts[2] != "neg"):
+        raise argparse.ArgumentTypeError(f"Ungültiger Bucket '{value}', erwartet NAME:BEWERTUNGEN[:neg]")
+    try:
+        ratings = [int(rating) for rating in parts[1].split(",")]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Ungültige Bewertungen in '{value}'")
+    return AnalysisBucket(parts[0], ratings, len(parts) == 3)
@@ -0,0 +1,211 @@
+import os
+import re
+import json
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from datetime import datetime
+from sqlalchemy import create_engine
+from DB.models import ReviewDuplicate
+from DB.dedup import normalize_review_text
+from scrapers.review_loader import stream_reviews
+
+# Standard-Lexikon mit Aspekten (Duft, Haltbarkeit, Preis, Flakon), Polaritäts- und Negationswörtern
+DEFAULT_LEXICON_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'aspect_lexicon.json')
+
+_SENTENCE_SPLIT = re.compile(r"[.!?;\n]+")
+_WORD = re.compile(r"[a-zäöüß]+(?:-[a-zäöüß]+)*")
+
+
+class AspectScorer:
+    """
+    Schneller Analysemodus ohne Dependency-Parsing: bewertet anhand eines konfigurierbaren Lexikons,
+    welche Aspekte in den Reviews positiv bzw. negativ erwähnt werden.
+
+    Alle Reviews werden einmal in eine dünnbesetzte Satz-Term-Matrix übersetzt (nur Lexikon-Terme).
+    Aspekte, Polarität und die Summen pro Produkt ergeben sich danach aus Sparse-Matrixprodukten.
+    Ein Satz zählt für einen Aspekt als positiv (negativ), wenn er einen Aspekt-Term enthält und die
+    Summe seiner Polaritätswörter positiv (negativ) ist; eine Negation im Satz kehrt die Polarität um.
+
+    Attribute
+    ----------
+    db_path : str
+        Pfad zur SQLite-Datenbankdatei.
+    output_dir : str
+        Verzeichnis, in dem die Analyseergebnisse gespeichert werden.
+    aspects : list of str
+        Namen der Aspekte in Spaltenreihenfolge.
+    vocabulary : dict
+        Lexikon-Term -> Spaltenindex der Satz-Term-Matrix.
+    """
+
+    def __init__(self, db_path, output_dir, lexicon_path=DEFAULT_LEXICON_PATH):
+        """
+        Initialisiert den AspectScorer und kompiliert das Lexikon in Gewichtsmatrizen.
+
+        Parameter
+        ----------
+        db_path : str
+            Pfad zur SQLite-Datenbankdatei.
+        output_dir : str
+            Verzeichnis, in dem die Analyseergebnisse gespeichert werden.
+        lexicon_path : str, optional
+            Pfad zu einer Lexikon-Datei im JSON-Format (Standard ist ``aspect_lexicon.json``).
+        """
+        self.db_path = db_path
+        self.output_dir = output_dir
+        self.engine = create_engine(f"sqlite:///{self.db_path}", connect_args={"check_same_thread": False})
+        ReviewDuplicate.__table__.create(bind=self.engine, checkfirst=True)
+
+        with open(lexicon_path, 'r', encoding='utf-8') as f:
+            lexicon = json.load(f)
+
+        self.aspects = list(lexicon["aspekte"])
+        self.vocabulary = {}
+        for terms in list(lexicon["aspekte"].values()) + [lexicon["positiv"], lexicon["negativ"], lexicon["negation"]]:
+            for term in terms:
+                self.vocabulary.setdefault(term.lower(), len(self.vocabulary))
+        self.max_ngram = max(len(term.split()) for term in self.vocabulary)
+
+        # Term -> Aspekt (V x A), Polarität je Term (V) und Negationsindikator je Term (V)
+        rows, cols = [], []
+        for aspect_index, aspect in enumerate(self.aspects):
+            for term in lexicon["aspekte"][aspect]:
+                rows.append(self.vocabulary[term.lower()])
+                cols.append(aspect_index)
+        self.aspect_matrix = sparse.csr_matrix(
+            (np.ones(len(rows)), (rows, cols)), shape=(len(self.vocabulary), len(self.aspects))
+        )
+        self.polarity = np.zeros(len(self.vocabulary))
+        for term in lexicon["positiv"]:
+            self.polarity[self.vocabulary[term.lower()]] += 1
+        for term in lexicon["negativ"]:
+            self.polarity[self.vocabulary[term.lower()]] -= 1
+        self.negation = np.zeros(len(self.vocabulary))
+        for term in lexicon["negation"]:
+            self.negation[self.vocabulary[term.lower()]] = 1
+
+    def compile_matrix(self, reviews):
+        """
+        Übersetzt Reviews in die dünnbesetzte Satz-Term-Matrix.
+
+        Parameter
+        ----------
+        reviews : iterable
+            Zeilen mit den Attributen review, rating, marke und produktname (siehe ``stream_reviews``).
+
+        Rückgabe
+        ----------
+        matrix : scipy.sparse.csr_matrix
+            Satz x Term, Anzahl der Vorkommen.
+        sentences : pandas.DataFrame
+            Eine Zeile pro Satz mit rating und produkt (Code in ``products``).
+        products : pandas.DataFrame
+            Spalten marke und produktname in Code-Reihenfolge.
+        """
+        term_rows, term_cols = [], []
+        sentence_ratings, sentence_products = [], []
+        product_codes = {}
+
+        for review in reviews:
+            if not review.review or review.marke is None or review.produktname is None:
+                continue
+            product = product_codes.setdefault((review.marke, review.produktname), len(product_codes))
+            for sentence in _SENTENCE_SPLIT.split(normalize_review_text(review.review).lower()):
+                words = _WORD.findall(sentence)
+                if not words:
+                    continue
+                sentence_index = len(sentence_ratings)
+                sentence_ratings.append(review.rating)
+                sentence_products.append(product)
+                for n in range(1, self.max_ngram + 1):
+                    for start in range(len(words) - n + 1):
+                        column = self.vocabulary.get(words[start] if n == 1 else " ".join(words[start:start + n]))
+                        if column is not None:
+                            term_rows.append(sentence_index)
+                            term_cols.append(column)
+
+        matrix = sparse.csr_matrix(
+            (np.ones(len(term_rows), dtype=np.float32), (term_rows, term_cols)),
+            shape=(len(sentence_ratings), len(self.vocabulary))
+        )
+        sentences = pd.DataFrame({
+            "rating": np.asarray(sentence_ratings, dtype=np.int64),
+            "produkt": np.asarray(sentence_products, dtype=np.int64),
+        })
+        products = pd.DataFrame(list(product_codes), columns=["marke", "produktname"])
+        return matrix, sentences, products
+
+    def score(self, matrix, sentences, products, rating_filter, min_count=0):
+        """
+        Bewertet alle Aspekte für alle Produkte mit Sparse-Matrixprodukten.
+
+        Parameter
+        ----------
+        matrix, sentences, products
+            Ergebnis von ``compile_matrix``.
+        rating_filter : list of int
+            Nur Sätze aus Reviews mit diesen Bewertungen werden gezählt.
+        min_count : int, optional
+            Häufigkeit, die eine Kombination überschreiten muss (Standard ist 0).
+
+        Rückgabe
+        ----------
+        pandas.DataFrame
+            Spalten marke, produktname, kombination ("positiv Duft", "negativ Preis", ...), anzahl.
+        """
+        mentions = (matrix @ self.aspect_matrix) > 0
+        polarity = matrix @ self.polarity
+        polarity[(matrix @ self.negation) > 0] *= -1
+
+        selected = sentences["rating"].isin(rating_filter).to_numpy()
+        positive = sparse.diags((selected & (polarity > 0)).astype(np.float32)) @ mentions
+        negative = sparse.diags((selected & (polarity < 0)).astype(np.float32)) @ mentions
+
+        # Produkt x Satz-Inzidenzmatrix summiert die Sätze je Produkt
+        incidence = sparse.csr_matrix(
+            (np.ones(len(sentences), dtype=np.float32), (sentences["produkt"].to_numpy(), np.arange(len(sentences)))),
+            shape=(len(products), len(sentences))
+        )
+
+        frames = []
+        for label, per_sentence in (("positiv", positive), ("negativ", negative)):
+            counts = (incidence @ per_sentence).tocoo()
+            frames.append(pd.DataFrame({
+                "marke": products["marke"].to_numpy()[counts.row],
+                "produktname": products["produktname"].to_numpy()[counts.row],
+                "kombination": [f"{label} {self.aspects[col]}" for col in counts.col],
+                "anzahl": counts.data.astype(np.int64),
+            }))
+        result = pd.concat(frames, ignore_index=True)
+        result = result[result["anzahl"] > min_count]
+        return result.sort_values(["marke", "produktname", "anzahl", "kombination"],
+                                  ascending=[True, True, False, True], kind="stable").reset_index(drop=True)
+
+    def run_buckets(self, buckets):
+        """
+        Lädt alle Reviews einmal, kompiliert die Matrix und schreibt pro Bucket eine CSV-Datei
+        im Layout der spaCy-Analyse (marke, produktname, kombination, anzahl).
+
+        Parameter
+        ----------
+        buckets : list of AnalysisBucket
+            Die zu erstellenden Auswertungen.
+
+        Rückgabe
+        ----------
+        list of str
+            Pfade der geschriebenen CSV-Dateien.
+        """
+        with self.engine.connect() as connection:
+            matrix, sentences, products = self.compile_matrix(stream_reviews(connection))
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
+        output_files = []
+        for bucket in buckets:
+            result = self.score(matrix, sentences, products, bucket.rating_filter, bucket.min_count)
+            output_file = os.path.join(self.output_dir, f'{bucket.analysis_filename}_aspekte_{timestamp}.csv')
+            result.to_csv(output_file, index=False)
+            output_files.append(output_file)
+        return output_files
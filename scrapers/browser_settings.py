@@ -3,8 +3,8 @@ import os
 import logging
 from selenium.webdriver.chrome.options import Options
 
-# Konfiguration des Loggings
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
 
 # Funktion, um das temporäre Verzeichnis plattformunabhängig zu ermitteln
 def get_temp_dir():
@@ -25,9 +25,9 @@ def clear_cache(cache_dir: str = CACHE_DIR):
     """
     if os.path.exists(cache_dir):
         shutil.rmtree(cache_dir)
-        logging.info(f"Cache-Verzeichnis {cache_dir} wurde gelöscht.")
+        logger.info("Cache-Verzeichnis %s wurde gelöscht.", cache_dir)
     else:
-        logging.info(f"Cache-Verzeichnis {cache_dir} existiert nicht. Keine Aktion erforderlich.")
+        logger.info("Cache-Verzeichnis %s existiert nicht. Keine Aktion erforderlich.", cache_dir)
 
 def get_chrome_options() -> Options:
     """
@@ -48,5 +48,5 @@ def get_chrome_options() -> Options:
     # Verzeichnis für Benutzerprofildaten
     chrome_options.add_argument(f'--user-data-dir={CACHE_DIR}')
 
-    logging.info("Chrome-Optionen wurden konfiguriert.")
+    logger.info("Chrome-Optionen wurden konfiguriert.")
     return chrome_options
@@ -0,0 +1,188 @@
+import os
+import json
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+# Dünnbesetzte Produkt x Kombination-Matrix (CSR) mit Produkt- und Term-Vokabular.
+# Auf der Platte liegen die drei CSR-Arrays als .npy-Dateien, damit sie per Memory-Mapping geladen
+# werden können; Abfragen arbeiten direkt auf der Matrix statt auf den Analyse-CSV-Dateien.
+
+MATRIX_ARRAYS = ("data", "indices", "indptr")
+PRODUCTS_FILE = "produkte.csv"
+TERMS_FILE = "terme.json"
+
+
+class CombinationMatrix:
+    """
+    Produkt x Kombination-Matrix mit Abfragen über mehrere Produkte hinweg.
+
+    Attribute
+    ----------
+    matrix : scipy.sparse.csr_matrix
+        Zeile = Produkt (Marke, Produktname), Spalte = Kombination, Wert = Anzahl.
+    products : pandas.DataFrame
+        Spalten marke und produktname in Zeilenreihenfolge.
+    terms : list of str
+        Kombinationen in Spaltenreihenfolge.
+    """
+
+    def __init__(self, matrix, products, terms):
+        self.matrix = matrix
+        self.products = products.reset_index(drop=True)
+        self.terms = list(terms)
+        self._term_index = {term: index for index, term in enumerate(self.terms)}
+        self._product_index = {key: index for index, key in
+                               enumerate(zip(self.products["marke"], self.products["produktname"]))}
+        self._columns = None
+        self._normalized = None
+
+    @classmethod
+    def from_combinations(cls, combinations):
+        """
+        Baut die Matrix aus Kombinationen im CSV-Layout der Analyse.
+
+        Parameter
+        ----------
+        combinations : pandas.DataFrame
+            Spalten marke, produktname, kombination, anzahl (z.B. aus ``aggregate_combinations``).
+            Mehrfache Zeilen derselben Zelle werden aufsummiert.
+        """
+        if combinations.empty:
+            # z.B. ein Bucket ohne Reviews: leere Matrix mit leeren Vokabularen
+            return cls(sparse.csr_matrix((0, 0), dtype=np.int64), pd.DataFrame(columns=["marke", "produktname"]), [])
+        product_codes, product_keys = pd.factorize(
+            pd.MultiIndex.from_arrays([combinations["marke"].astype(str), combinations["produktname"].astype(str)])
+        )
+        term_codes, terms = pd.factorize(combinations["kombination"].astype(str))
+        matrix = sparse.csr_matrix(
+            (combinations["anzahl"].to_numpy(dtype=np.int64), (product_codes, term_codes)),
+            shape=(len(product_keys), len(terms))
+        )
+        matrix.sum_duplicates()
+        products = pd.DataFrame(list(product_keys), columns=["marke", "produktname"])
+        return cls(matrix, products, list(terms))
+
+    def save(self, directory):
+        """
+        Speichert Matrix und Vokabulare im angegebenen Verzeichnis (vorhandene Dateien werden ersetzt).
+        """
+        os.makedirs(directory, exist_ok=True)
+        for name in MATRIX_ARRAYS:
+            np.save(os.path.join(directory, f"{name}.npy"), getattr(self.matrix, name))
+        self.products.to_csv(os.path.join(directory, PRODUCTS_FILE), sep=';', index=False)
+        with open(os.path.join(directory, TERMS_FILE), 'w', encoding='utf-8') as f:
+            json.dump(self.terms, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, directory, mmap=True):
+        """
+        Lädt eine gespeicherte Matrix. Mit ``mmap=True`` werden die CSR-Arrays nur eingeblendet,
+        nicht in den Speicher kopiert.
+        """
+        arrays = {name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode='r' if mmap else None)
+                  for name in MATRIX_ARRAYS}
+        products = pd.read_csv(os.path.join(directory, PRODUCTS_FILE), sep=';', dtype=str, keep_default_na=False)
+        with open(os.path.join(directory, TERMS_FILE), 'r', encoding='utf-8') as f:
+            terms = json.load(f)
+        matrix = sparse.csr_matrix((arrays["data"], arrays["indices"], arrays["indptr"]),
+                                   shape=(len(products), len(terms)))
+        return cls(matrix, products, terms)
+
+    def _row(self, marke, produktname):
+        try:
+            return self._product_index[(marke, produktname)]
+        except KeyError:
+            raise KeyError(f"Unbekanntes Produkt: {marke} - {produktname}") from None
+
+    def _column(self, term):
+        try:
+            return self._term_index[term]
+        except KeyError:
+            raise KeyError(f"Unbekannte Kombination: {term}") from None
+
+    def top_terms(self, marke, produktname, k=10):
+        """
+        Liefert die k häufigsten Kombinationen eines Produkts.
+
+        Rückgabe
+        ----------
+        pandas.DataFrame
+            Spalten kombination, anzahl.
+        """
+        row = self.matrix.getrow(self._row(marke, produktname))
+        order = np.argsort(-row.data, kind="stable")[:k]
+        return pd.DataFrame({
+            "kombination": [self.terms[index] for index in row.indices[order]],
+            "anzahl": row.data[order],
+        })
+
+    def products_for_term(self, term, k=None):
+        """
+        Liefert die Produkte, in deren Reviews eine Kombination vorkommt, nach Häufigkeit sortiert.
+
+        Rückgabe
+        ----------
+        pandas.DataFrame
+            Spalten marke, produktname, anzahl.
+        """
+        # Spaltenzugriffe über eine einmalig erzeugte CSC-Kopie
+        if self._columns is None:
+            self._columns = self.matrix.tocsc()
+        column = self._columns.getcol(self._column(term))
+        order = np.argsort(-column.data, kind="stable")[:k]
+        result = self.products.iloc[column.indices[order]].reset_index(drop=True)
+        result["anzahl"] = column.data[order]
+        return result
+
+    def similar_products(self, marke, produktname, k=10):
+        """
+        Liefert die k Produkte mit den ähnlichsten Kombinationsprofilen (Kosinus-Ähnlichkeit).
+
+        Rückgabe
+        ----------
+        pandas.DataFrame
+            Spalten marke, produktname, aehnlichkeit.
+        """
+        if self._normalized is None:
+            norms = np.sqrt(np.asarray(self.matrix.multiply(self.matrix).sum(axis=1), dtype=np.float64).ravel())
+            norms[norms == 0] = 1.0
+            self._normalized = sparse.diags(1.0 / norms) @ self.matrix.astype(np.float64)
+        row = self._row(marke, produktname)
+        scores = np.asarray((self._normalized @ self._normalized.getrow(row).T).todense()).ravel()
+        scores[row] = -1.0
+        order = np.argsort(-scores, kind="stable")[:k]
+        order = order[scores[order] > 0]
+        result = self.products.iloc[order].reset_index(drop=True)
+        result["aehnlichkeit"] = scores[order].round(4)
+        return result
+
+    def brand_lift(self, term):
+        """
+        Zeigt, welche Marken eine Kombination überdurchschnittlich oft nennen: Anteil der Kombination an allen
+        Kombinationen der Marke im Verhältnis zum Anteil über alle Marken (lift > 1 = überdurchschnittlich).
+
+        Rückgabe
+        ----------
+        pandas.DataFrame
+            Spalten marke, anzahl, anteil, lift; nach lift absteigend sortiert.
+        """
+        column = self._column(term)
+        brand_codes, brands = pd.factorize(self.products["marke"])
+        brand_rows = sparse.csr_matrix(
+            (np.ones(len(brand_codes)), (brand_codes, np.arange(len(brand_codes)))),
+            shape=(len(brands), len(brand_codes))
+        )
+        per_brand = brand_rows @ self.matrix
+        term_counts = np.asarray(per_brand.getcol(column).todense()).ravel()
+        totals = np.asarray(per_brand.sum(axis=1)).ravel()
+        share = np.divide(term_counts, totals, out=np.zeros_like(term_counts), where=totals > 0)
+        overall = term_counts.sum() / max(totals.sum(), 1)
+        result = pd.DataFrame({
+            "marke": brands,
+            "anzahl": term_counts.astype(np.int64),
+            "anteil": share.round(4),
+            "lift": (share / overall if overall else share).round(3),
+        })
+        result = result[result["anzahl"] > 0]
+        return result.sort_values(["lift", "anzahl"], ascending=False, kind="stable").reset_index(drop=True)
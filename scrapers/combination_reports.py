@@ -0,0 +1,89 @@
+import pandas as pd
+from sqlalchemy import select
+from DB.models import Product, ProductCombinationTotal
+
+# Vektorisierte Auswertungen über die gespeicherten Kombinationssummen (Tabelle product_combinations).
+# Alle Textspalten werden als Kategorien geführt, gezählt und gefiltert wird per groupby auf den Codes.
+
+GROUP_COLUMNS = ["marke", "produktname", "kategorie", "kombination"]
+OUTPUT_COLUMNS = ["marke", "produktname", "kombination", "anzahl"]
+
+
+def load_combination_frame(connection, rating_filter):
+    """
+    Lädt die Kombinationssummen für die angegebenen Bewertungen zusammen mit Marke und Produktname.
+
+    Parameter:
+    connection (sqlalchemy.engine.Connection): Eine offene Verbindung zur Analyse-Datenbank.
+    rating_filter (list of int): Bewertungswerte, deren Summen geladen werden.
+
+    Rückgabe:
+    pandas.DataFrame: Spalten marke, produktname, kategorie, kombination (kategorisch) und anzahl.
+    """
+    # product_combinations.produkt_id ist products.id (siehe review_loader.REVIEW_COLUMNS), der JOIN ist ein
+    # Zugriff über den Primärschlüssel
+    frame = pd.read_sql(
+        select(Product.marke, Product.produktname, ProductCombinationTotal.kategorie,
+               ProductCombinationTotal.kombination, ProductCombinationTotal.anzahl)
+        .join(Product, Product.id == ProductCombinationTotal.produkt_id)
+        .where(ProductCombinationTotal.rating.in_(rating_filter),
+               Product.marke.is_not(None), Product.produktname.is_not(None)),
+        connection
+    )
+    for column in GROUP_COLUMNS:
+        frame[column] = frame[column].astype("category")
+    return frame[GROUP_COLUMNS + ["anzahl"]]
+
+
+def aggregate_combinations(frame, min_count):
+    """
+    Summiert die Kombinationen pro (Marke, Produktname, Kategorie) und wendet den Häufigkeitsfilter an.
+
+    Parameter:
+    frame (pandas.DataFrame): Ergebnis von ``load_combination_frame``.
+    min_count (int): Häufigkeit, die eine Kombination überschreiten muss.
+
+    Rückgabe:
+    pandas.DataFrame: Spalten marke, produktname, kombination, anzahl im CSV-Layout der Analyse.
+    """
+    grouped = frame.groupby(GROUP_COLUMNS, observed=True, sort=False)["anzahl"].sum().reset_index()
+    grouped = grouped[grouped["anzahl"].to_numpy() > min_count]
+    grouped = grouped.sort_values(
+        ["marke", "produktname", "kategorie", "anzahl", "kombination"],
+        ascending=[True, True, True, False, True],
+        kind="stable"
+    )
+    return grouped[OUTPUT_COLUMNS].reset_index(drop=True)
+
+
+def top_k_per_group(combinations, by, k):
+    """
+    Liefert die k häufigsten Kombinationen je Gruppe, z.B. je Produkt oder je Marke.
+
+    Parameter:
+    combinations (pandas.DataFrame): Spalten aus ``by`` sowie kombination und anzahl.
+    by (list of str): Gruppierungsspalten, z.B. ["marke"] oder ["marke", "produktname"].
+    k (int): Anzahl der Kombinationen je Gruppe.
+
+    Rückgabe:
+    pandas.DataFrame: Spalten aus ``by``, kombination, anzahl.
+    """
+    summed = combinations.groupby(by + ["kombination"], observed=True, sort=False)["anzahl"].sum().reset_index()
+    summed = summed.sort_values(by + ["anzahl", "kombination"], ascending=[True] * len(by) + [False, True],
+                                kind="stable")
+    return summed.groupby(by, observed=True, sort=False).head(k).reset_index(drop=True)
+
+
+def global_top_k(combinations, k):
+    """
+    Liefert die k häufigsten Kombinationen über alle Produkte.
+
+    Parameter:
+    combinations (pandas.DataFrame): Spalten kombination und anzahl.
+    k (int): Anzahl der Kombinationen.
+
+    Rückgabe:
+    pandas.DataFrame: Spalten kombination, anzahl.
+    """
+    summed = combinations.groupby("kombination", observed=True, sort=False)["anzahl"].sum()
+    return summed.nlargest(k).rename_axis("kombination").reset_index()
@@ -0,0 +1,128 @@
+import math
+import time
+import logging
+from datetime import date
+
+logger = logging.getLogger(__name__)
+
+# Gewichte der Priorität. Ein Produkt, das noch nie gecrawlt wurde, kommt vor allen bekannten; danach
+# zählen geänderte Preise/Ratings, viele Reviews und die Zeit seit dem letzten Crawlen.
+NEW_PRODUCT_WEIGHT = 100.0
+CHANGED_WEIGHT = 30.0
+REVIEWS_WEIGHT = 10.0
+STALENESS_WEIGHT = 2.0
+MAX_STALENESS_DAYS = 30
+# Bei Reviews zählt vor allem, wie viele seit dem letzten Crawlen hinzugekommen sind
+NEW_REVIEWS_WEIGHT = 20.0
+
+# Anteil des Zeitbudgets, der für die Review-Extraktion freigehalten wird
+DEFAULT_REVIEW_SHARE = 0.4
+# Gewichtung der letzten Dauer im gleitenden Mittel der Job-Dauer
+DURATION_SMOOTHING = 0.3
+
+
+class CrawlScheduler:
+    """
+    Legt die Reihenfolge der Produkt- und Review-Jobs nach Priorität fest und hält ein Zeitbudget ein.
+    Die wichtigsten Jobs laufen zuerst; passt der nächste Job voraussichtlich nicht mehr ins Budget,
+    wird der Rest zurückgestellt. Zurückgestellte Produkte sind beim nächsten Lauf älter und rücken
+    dadurch automatisch nach vorn.
+    """
+
+    def __init__(self, history: dict, budget_minutes: float = None, review_share: float = DEFAULT_REVIEW_SHARE,
+                 today: date = None):
+        """
+        :param history: Produkt-URL -> ProductHistory aus früheren Sessions (DB.history.load_product_history)
+        :param budget_minutes: Optional, Zeitbudget für Produkte und Reviews zusammen; None = unbegrenzt
+        :param review_share: Anteil des Budgets, der für die Reviews reserviert bleibt
+        :param today: Stichtag für das Alter der letzten Crawls (Standard: heute)
+        """
+        self.history = history
+        self.today = today or date.today()
+        self.started = time.monotonic()
+        self.deadline = None if budget_minutes is None else self.started + budget_minutes * 60
+        self.product_deadline = None if budget_minutes is None else (
+            self.started + budget_minutes * 60 * (1 - review_share))
+        self.deferred = {"produkte": [], "reviews": []}
+        self.changed_urls = set()
+
+    def apply_changes(self, change_set):
+        """
+        Behandelt die Produkte eines Change-Sets (DB.diff.ChangeSet) wie geänderte Produkte: neue, geänderte
+        und solche mit neuen Reviews rücken beim Crawlen nach vorn.
+        """
+        self.changed_urls |= change_set.changed_urls()
+
+    def product_priority(self, url: str) -> float:
+        """
+        Priorität einer Produktseite anhand des letzten bekannten Stands.
+        """
+        known = self.history.get(url)
+        if known is None:
+            return NEW_PRODUCT_WEIGHT
+        score = REVIEWS_WEIGHT * math.log1p(known.gesamtanzahl_reviews or 0)
+        if known.geaendert or url in self.changed_urls:
+            score += CHANGED_WEIGHT
+        score += STALENESS_WEIGHT * min(known.days_since_crawl(self.today), MAX_STALENESS_DAYS)
+        return score
+
+    def review_priority(self, product) -> float:
+        """
+        Priorität der Review-Extraktion eines frisch gecrawlten Produkts (ProductRecord, bereinigt).
+        Geschätzt wird die Anzahl neuer Reviews gegenüber dem letzten Crawl.
+        """
+        total = product.gesamtanzahl_reviews or 0
+        known = self.history.get(product.produkt_url)
+        previous = (known.gesamtanzahl_reviews or 0) if known is not None else 0
+        score = NEW_REVIEWS_WEIGHT * math.log1p(max(total - previous, 0)) + math.log1p(total)
+        if known is not None:
+            score += STALENESS_WEIGHT * min(known.days_since_crawl(self.today), MAX_STALENESS_DAYS)
+        return score
+
+    def order_links(self, links: list) -> list:
+        """
+        Sortiert Produktlinks nach absteigender Priorität (bei Gleichstand in der Reihenfolge der Liste).
+        """
+        return sorted(links, key=self.product_priority, reverse=True)
+
+    def order_review_products(self, products: list) -> list:
+        """
+        Sortiert Produkte für die Review-Extraktion nach absteigender Priorität.
+        """
+        return sorted(products, key=self.review_priority, reverse=True)
+
+    def has_time(self, stage: str) -> bool:
+        """
+        :return: True, solange das Zeitbudget der Stufe ("produkte" oder "reviews") nicht aufgebraucht ist
+        """
+        deadline = self.product_deadline if stage == "produkte" else self.deadline
+        return deadline is None or time.monotonic() < deadline
+
+    def within_budget(self, items, stage: str, url_of=None):
+        """
+        Liefert die Einträge nacheinander, solange der nächste voraussichtlich noch ins Budget passt.
+        Die Dauer eines Jobs wird als Zeit zwischen zwei Abrufen gemessen (gleitendes Mittel).
+        Nicht mehr gelieferte Einträge landen in ``deferred[stage]``.
+
+        :param items: Bereits sortierte Einträge
+        :param stage: "produkte" oder "reviews"
+        :param url_of: Optional, liefert die URL eines Eintrags für die Liste der zurückgestellten
+        """
+        url_of = url_of or (lambda item: item)
+        deadline = self.product_deadline if stage == "produkte" else self.deadline
+        items = list(items)
+        average = None
+        last = time.monotonic()
+        for index, item in enumerate(items):
+            now = time.monotonic()
+            if index:
+                duration = now - last
+                average = duration if average is None else (
+                    DURATION_SMOOTHING * duration + (1 - DURATION_SMOOTHING) * average)
+            last = now
+            if deadline is not None and now + (average or 0) > deadline:
+                self.deferred[stage] = [url_of(rest) for rest in items[index:]]
+                logger.warning("Zeitbudget für %s erreicht: %s von %s Einträgen zurückgestellt.",
+                               stage, len(items) - index, len(items))
+                return
+            yield item
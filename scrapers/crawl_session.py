@@ -0,0 +1,152 @@
+import os
+import re
+import json
+from datetime import datetime
+
+# Ordner einer Crawling-Session und die Dateien, über die die Stufen der Pipeline (Links, Produkte,
+# Reviews, Einfügen in die DB) Daten austauschen. Jede Stufe liest nur die Dateien der vorherigen und
+# schreibt ihre eigenen; so laufen die Stufen auch einzeln, auf verschiedenen Rechnern oder gleichzeitig
+# für verschiedene Sessions. Dateien werden erst unter einem temporären Namen geschrieben und dann
+# umbenannt, damit eine parallel laufende Stufe nie eine halb geschriebene Datei liest.
+# Nur Standardbibliothek, damit leichte Befehle der Kommandozeile schnell starten.
+
+DEFAULT_OUTPUT_DIR = "Output"
+SESSION_PREFIX = "Crawler_Session_"
+TIMESTAMP_FORMAT = "%Y%m%d_%H%M%S"
+
+# Dateien einer Session (Präfix; der Dateiname ist <präfix>_<timestamp>.json)
+LINKS = "links"
+PRODUCTS = "produkte"
+REVIEWS = "reviews"
+DEFERRED = "zurueckgestellt"
+FAILED = "fehlgeschlagen"
+INGESTED = "eingefuegt"
+CHANGES = "aenderungen"
+SESSION_FILE = "session.json"
+
+_SESSION_DIR = re.compile(rf"^{SESSION_PREFIX}(\d{{8}}_\d{{6}})$")
+
+
+class MissingArtifactError(FileNotFoundError):
+    """
+    Eine Session oder die Datei einer vorherigen Stufe fehlt.
+    """
+
+
+class CrawlSession:
+    """
+    Ein Session-Ordner unter ``Output/Crawler_Session_<timestamp>``. Datum und Uhrzeit der Session
+    (für die Datenbank) und die Start-URL stehen in ``session.json``.
+    """
+
+    def __init__(self, directory, timestamp, url=None):
+        self.directory = directory
+        self.timestamp = timestamp
+        self.url = url
+        started = datetime.strptime(timestamp, TIMESTAMP_FORMAT)
+        self.session_date = started.date()
+        self.session_time = started.time()
+
+    def __repr__(self):
+        return f"CrawlSession({self.directory!r})"
+
+    @classmethod
+    def create(cls, url=None, output_dir=DEFAULT_OUTPUT_DIR):
+        """
+        Legt einen neuen Session-Ordner an.
+        :param url: Optional, Start-URL der Listenseite
+        :param output_dir: Verzeichnis der Session-Ordner
+        """
+        timestamp = datetime.now().strftime(TIMESTAMP_FORMAT)
+        directory = os.path.join(output_dir, f"{SESSION_PREFIX}{timestamp}")
+        os.makedirs(directory, exist_ok=True)
+        session = cls(directory, timestamp, url)
+        session.write_json(SESSION_FILE, {"timestamp": timestamp, "url": url}, stamped=False)
+        return session
+
+    @classmethod
+    def open(cls, directory):
+        """
+        Öffnet einen vorhandenen Session-Ordner. Ältere Ordner ohne ``session.json`` werden über den
+        Ordnernamen erkannt.
+        """
+        directory = os.path.normpath(directory)
+        meta_path = os.path.join(directory, SESSION_FILE)
+        if os.path.exists(meta_path):
+            with open(meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+            return cls(directory, meta["timestamp"], meta.get("url"))
+        match = _SESSION_DIR.match(os.path.basename(directory))
+        if match is None:
+            raise MissingArtifactError(f"Kein Session-Ordner: {directory}")
+        return cls(directory, match.group(1))
+
+    @classmethod
+    def all(cls, output_dir=DEFAULT_OUTPUT_DIR) -> list:
+        """
+        :return: Alle Sessions im Ausgabeverzeichnis, älteste zuerst
+        """
+        if not os.path.isdir(output_dir):
+            return []
+        names = sorted(name for name in os.listdir(output_dir) if _SESSION_DIR.match(name))
+        return [cls.open(os.path.join(output_dir, name)) for name in names]
+
+    @classmethod
+    def latest(cls, output_dir=DEFAULT_OUTPUT_DIR):
+        """
+        :return: Die jüngste Session im Ausgabeverzeichnis
+        """
+        sessions = cls.all(output_dir)
+        if not sessions:
+            raise MissingArtifactError(f"Keine Session in {output_dir}")
+        return sessions[-1]
+
+    def path(self, prefix, suffix="json") -> str:
+        """
+        :return: Pfad der Datei ``<prefix>_<timestamp>.<suffix>`` im Session-Ordner
+        """
+        return os.path.join(self.directory, f"{prefix}_{self.timestamp}.{suffix}")
+
+    def has(self, prefix) -> bool:
+        return os.path.exists(self.path(prefix))
+
+    def write_bytes(self, prefix, data: bytes, stamped=True) -> str:
+        """
+        Schreibt eine Datei atomar (temporäre Datei, danach umbenennen).
+        :param stamped: False = ``prefix`` ist bereits der vollständige Dateiname
+        :return: Pfad der Datei
+        """
+        path = self.path(prefix) if stamped else os.path.join(self.directory, prefix)
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(data)
+        os.replace(temp_path, path)
+        return path
+
+    def read_bytes(self, prefix) -> bytes:
+        with open(self.path(prefix), "rb") as f:
+            return f.read()
+
+    def write_json(self, prefix, data, stamped=True) -> str:
+        return self.write_bytes(prefix, json.dumps(data, ensure_ascii=False, indent=2).encode("utf-8"), stamped)
+
+    def read_json(self, prefix, default=None):
+        if not self.has(prefix):
+            return default
+        return json.loads(self.read_bytes(prefix))
+
+    def update_json(self, prefix, stage, entries) -> str:
+        """
+        Ersetzt den Eintrag einer Stufe in einer Datei wie ``zurueckgestellt`` oder ``fehlgeschlagen``,
+        die Einträge anderer Stufen bleiben erhalten. Leere Einträge werden entfernt.
+        :return: Pfad der Datei oder None, wenn sie danach leer wäre
+        """
+        data = self.read_json(prefix, {})
+        data.pop(stage, None)
+        if entries:
+            data[stage] = entries
+        if not data:
+            if self.has(prefix):
+                os.remove(self.path(prefix))
+            return None
+        return self.write_json(prefix, data)
@@ -0,0 +1,379 @@
+import os
+import time
+import signal
+import logging
+import threading
+import heapq
+from itertools import count
+from scrapers.web_crawler import WebCrawler
+from metrics import METRICS
+from scrapers.retry_policy import RetryPolicy, DeadLetters, classify, DRIVER
+
+logger = logging.getLogger(__name__)
+
+# Neustart des Browsers nach so vielen Aufrufen bzw. ab diesem Speicherverbrauch (Chromedriver und alle
+# Chrome-Prozesse zusammen); 0 oder None schaltet die jeweilige Grenze ab
+DEFAULT_MAX_PAGES = 200
+DEFAULT_MAX_RSS_MB = 1500
+# Ein einzelner WebDriver-Befehl, der länger dauert, gilt als hängend; der Browser wird dann beendet
+DEFAULT_HANG_TIMEOUT = 90
+DEFAULT_PAGE_LOAD_TIMEOUT = 60
+
+# Unter Windows gibt es kein SIGKILL, os.kill beendet den Prozess dort mit jedem Signal
+KILL_SIGNAL = getattr(signal, "SIGKILL", signal.SIGTERM)
+
+
+def process_tree(pid):
+    """
+    Ermittelt einen Prozess und alle seine Nachfahren.
+    Nutzt psutil, falls installiert, sonst /proc (Linux); andernfalls nur den Prozess selbst.
+    :return: Liste von Prozess-IDs
+    """
+    try:
+        import psutil
+        process = psutil.Process(pid)
+        return [pid] + [child.pid for child in process.children(recursive=True)]
+    except ImportError:
+        pass
+    except Exception:
+        return []
+
+    if not os.path.isdir("/proc"):
+        return [pid]
+    children = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # Feld 4 ist die Eltern-ID; der Prozessname in Klammern kann Leerzeichen enthalten
+                parent = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(parent, []).append(int(entry))
+    tree, todo = [], [pid]
+    while todo:
+        current = todo.pop()
+        tree.append(current)
+        todo.extend(children.get(current, []))
+    return tree
+
+
+def rss_bytes(pids):
+    """
+    Summiert den belegten Arbeitsspeicher (RSS) der Prozesse.
+    :return: Bytes oder None, wenn er auf diesem System nicht ermittelt werden kann
+    """
+    try:
+        import psutil
+    except ImportError:
+        psutil = None
+
+    total = 0
+    for pid in pids:
+        try:
+            if psutil is not None:
+                total += psutil.Process(pid).memory_info().rss
+            elif os.path.isdir("/proc"):
+                with open(f"/proc/{pid}/statm") as f:
+                    total += int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+            else:
+                return None
+        except Exception:
+            # Prozess hat sich inzwischen beendet
+            continue
+    return total
+
+
+class DriverManager:
+    """
+    Verwaltet den WebDriver über lange Läufe. Der Browser wird nach ``max_pages`` Aufrufen oder beim
+    Überschreiten von ``max_rss_mb`` neu gestartet, damit der Speicherverbrauch begrenzt bleibt.
+    Ein Watchdog-Thread beendet den Browser, wenn ein einzelner WebDriver-Befehl länger als
+    ``hang_timeout`` Sekunden hängt. Nach einem Absturz oder Hänger wird der Driver neu erstellt
+    und die gerade bearbeitete URL erneut eingereiht.
+    Fehler werden über die RetryPolicy klassifiziert und wiederholt; endgültig fehlgeschlagene Einträge
+    landen in ``dead_letters`` und werden am Ende von ``run`` ein zweites Mal versucht.
+
+    Verwendung:
+        with DriverManager(url) as drivers:
+            extractor = ProductExtractor(drivers.driver)
+            drivers.attach(extractor)
+            for link, product in drivers.run(links, extractor.extract_product_details):
+                ...
+    """
+
+    def __init__(self, url, max_pages=DEFAULT_MAX_PAGES, max_rss_mb=DEFAULT_MAX_RSS_MB,
+                 hang_timeout=DEFAULT_HANG_TIMEOUT, page_load_timeout=DEFAULT_PAGE_LOAD_TIMEOUT,
+                 retry_policy=None, crawler_factory=WebCrawler):
+        """
+        :param url: Startseite, die nach jedem Neustart geladen wird (inkl. Cookie-Banner)
+        :param max_pages: Aufrufe von ``extract`` bis zum planmäßigen Neustart
+        :param max_rss_mb: Speichergrenze für Chromedriver und Browser in MB
+        :param hang_timeout: Maximale Dauer eines WebDriver-Befehls in Sekunden
+        :param page_load_timeout: Seitenlade-Timeout des WebDrivers in Sekunden
+        :param retry_policy: Optional, Regeln für Wiederholungen und Circuit Breaker (Standard: RetryPolicy())
+        :param crawler_factory: Erstellt den WebCrawler für eine URL (Standard: WebCrawler)
+        """
+        self.url = url
+        self.max_pages = max_pages
+        self.max_rss_mb = max_rss_mb
+        self.hang_timeout = hang_timeout
+        self.page_load_timeout = page_load_timeout
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.crawler_factory = crawler_factory
+        self.dead_letters = DeadLetters()
+
+        self.crawler = None
+        self.pages = 0
+        self.restarts = 0
+        self._clients = []
+
+        # Zustand des Watchdogs: Frist des laufenden WebDriver-Befehls und ob er eingegriffen hat
+        self._deadline = None
+        self._hung = False
+        self._stop = threading.Event()
+        self._watchdog = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @property
+    def driver(self):
+        return self.crawler.driver
+
+    def attach(self, *clients):
+        """
+        Meldet Objekte mit einem Attribut ``driver`` an (z.B. Extraktoren); sie erhalten nach jedem
+        Neustart den neuen Driver.
+        """
+        self._clients.extend(clients)
+        if self.crawler is not None:
+            for client in clients:
+                client.driver = self.crawler.driver
+
+    def start(self):
+        """
+        Startet den Browser, lädt die Startseite und startet den Watchdog. Schlägt schon der Start fehl
+        (z.B. HTTP 503 beim Verbindungstest), wird er nach den Regeln der RetryPolicy wiederholt.
+        """
+        breaker = self.retry_policy.breakers.for_url(self.url)
+        attempt = 1
+        while True:
+            breaker.before_request()
+            try:
+                self.crawler = self.crawler_factory(self.url)
+                break
+            except Exception as e:
+                kind = classify(e)
+                breaker.record_failure(kind)
+                if not self.retry_policy.should_retry(kind, attempt):
+                    raise
+                logger.warning("Start des WebDrivers fehlgeschlagen (%s, Versuch %s): %s", kind, attempt, e)
+                self.retry_policy.wait(kind, attempt)
+                attempt += 1
+        self.crawler.fetch_page_source()
+        self._hung = False
+        self._watch_commands(self.crawler.driver)
+        if self.page_load_timeout:
+            self.crawler.driver.set_page_load_timeout(self.page_load_timeout)
+        for client in self._clients:
+            client.driver = self.crawler.driver
+        self.pages = 0
+
+        if self._watchdog is None or not self._watchdog.is_alive():
+            self._stop.clear()
+            self._watchdog = threading.Thread(target=self._watch, name="driver-watchdog", daemon=True)
+            self._watchdog.start()
+
+    def restart(self, reason):
+        """
+        Beendet den aktuellen Browser und startet einen neuen.
+        :param reason: Grund für Log und Metriken, z.B. "seiten", "speicher" oder "absturz"
+        """
+        logger.info("Starte WebDriver neu (Grund: %s, %s Aufrufe seit dem letzten Start).", reason, self.pages)
+        METRICS.inc("crawler_driver_restarts_total", reason=reason)
+        self.restarts += 1
+        self._shutdown_browser()
+        self.start()
+
+    def close(self):
+        """
+        Beendet Watchdog und Browser.
+        """
+        self._stop.set()
+        if self._watchdog is not None:
+            self._watchdog.join(timeout=5)
+            self._watchdog = None
+        self._shutdown_browser()
+
+    def run(self, items, extract, url_of=None, retry_pass=True, keep_going=None):
+        """
+        Ruft ``extract(item)`` für alle Einträge nacheinander auf und liefert jeweils (item, Ergebnis).
+        Fehler werden klassifiziert (siehe retry_policy.classify): Nach einem Absturz oder Hänger des
+        Browsers wird dieser neu gestartet und der Eintrag sofort wiederholt, bei Timeouts, Drosselung
+        oder Serverfehlern nach der Backoff-Zeit; in der Zwischenzeit laufen die übrigen Einträge weiter.
+        Vor jedem Aufruf bremst der Circuit Breaker des Hosts. Endgültig fehlgeschlagene Einträge
+        kommen in ``dead_letters``.
+
+        :param items: URLs oder andere Einträge (z.B. ProductRecord)
+        :param extract: Funktion, die einen Eintrag mit dem aktuellen Driver verarbeitet
+        :param url_of: Optional, liefert die URL eines Eintrags für Log-Meldungen und Circuit Breaker
+        :param retry_pass: Fehlgeschlagene Einträge am Ende noch einmal versuchen
+        :param keep_going: Optional, Funktion ohne Argumente; liefert sie False, entfällt der zweite Durchgang
+            (z.B. wenn das Zeitbudget aufgebraucht ist)
+        """
+        url_of = url_of or (lambda item: item)
+        policy = self.retry_policy
+        # Einträge werden erst bei Bedarf gelesen (z.B. aus CrawlScheduler.within_budget); Wiederholungen
+        # stehen mit ihrem frühesten Zeitpunkt in ``pending`` und haben Vorrang, sobald sie fällig sind
+        items = iter(items)
+        pending, order = [], count()
+        exhausted = False
+        while True:
+            if pending and (exhausted or pending[0][0] <= time.monotonic()):
+                ready_at, _, item, attempt = heapq.heappop(pending)
+                if ready_at > time.monotonic():
+                    METRICS.sleep(ready_at - time.monotonic(), reason="retry_warten")
+            elif not exhausted:
+                try:
+                    item, attempt = next(items), 1
+                except StopIteration:
+                    exhausted = True
+                    continue
+            elif retry_pass and self.dead_letters.retryable() and (keep_going is None or keep_going()):
+                retry_pass = False
+                logger.info("Zweiter Durchgang für %s fehlgeschlagene Einträge.", self.dead_letters.retryable())
+                items, exhausted = iter(self.dead_letters.take()), False
+                continue
+            else:
+                return
+
+            url = url_of(item)
+            breaker = policy.breakers.for_url(url)
+            self._recycle_if_needed()
+            breaker.before_request()
+            self.pages += 1
+            error = None
+            try:
+                result = extract(item)
+            except Exception as e:
+                error = e
+
+            # Auch ein erfolgreicher Rückgabewert zählt nicht, wenn der Watchdog eingegriffen hat;
+            # die Extraktoren fangen viele WebDriver-Fehler selbst ab und liefern dann Teilergebnisse
+            if self._hung or (error is not None and not self.is_alive()):
+                reason = "haenger" if self._hung else "absturz"
+                METRICS.inc("crawler_driver_failures_total", reason=reason)
+                if policy.should_retry(DRIVER, attempt):
+                    logger.warning("WebDriver ausgefallen bei %s (Versuch %s), URL wird erneut eingereiht.", url, attempt)
+                    heapq.heappush(pending, (time.monotonic(), next(order), item, attempt + 1))
+                else:
+                    logger.error("WebDriver bei %s %s-mal ausgefallen, URL wird zurückgestellt.", url, attempt)
+                    self.dead_letters.add(item, url, DRIVER, error or "Watchdog", attempt)
+                self.restart(reason)
+                continue
+
+            if error is None:
+                breaker.record_success()
+                yield item, result
+                continue
+
+            kind = classify(error)
+            breaker.record_failure(kind)
+            METRICS.inc("crawler_errors_total", kind=kind)
+            if policy.should_retry(kind, attempt):
+                logger.warning("Fehler beim Verarbeiten des Links %s (%s, Versuch %s): %s", url, kind, attempt, error)
+                ready_at = time.monotonic() + policy.backoff(kind, attempt)
+                heapq.heappush(pending, (ready_at, next(order), item, attempt + 1))
+            else:
+                logger.error("Fehler beim Verarbeiten des Links %s (%s): %s", url, kind, error)
+                self.dead_letters.add(item, url, kind, error, attempt)
+
+    def is_alive(self):
+        """
+        Prüft mit einem einfachen Skript, ob Browser und Sitzung noch antworten.
+        """
+        try:
+            self.crawler.driver.execute_script("return 1")
+            return not self._hung
+        except Exception:
+            return False
+
+    def rss_mb(self):
+        """
+        :return: Speicherverbrauch von Chromedriver und Browser in MB oder None, falls nicht ermittelbar
+        """
+        pid = self._driver_pid()
+        if pid is None:
+            return None
+        total = rss_bytes(process_tree(pid))
+        return None if total is None else total / (1024 * 1024)
+
+    def _recycle_if_needed(self):
+        if self.max_pages and self.pages >= self.max_pages:
+            self.restart("seiten")
+            return
+        if self.max_rss_mb:
+            rss = self.rss_mb()
+            if rss is not None and rss > self.max_rss_mb:
+                logger.info("WebDriver belegt %.0f MB (Grenze %s MB).", rss, self.max_rss_mb)
+                self.restart("speicher")
+
+    def _watch_commands(self, driver):
+        """
+        Setzt vor jedem WebDriver-Befehl die Frist für den Watchdog. Alle Befehle, auch die von
+        WebElement und WebDriverWait, laufen über ``driver.execute``.
+        """
+        execute = driver.execute
+
+        def watched_execute(driver_command, params=None):
+            self._deadline = time.monotonic() + self.hang_timeout
+            try:
+                return execute(driver_command, params)
+            finally:
+                self._deadline = None
+
+        driver.execute = watched_execute
+
+    def _watch(self):
+        while not self._stop.wait(1):
+            deadline = self._deadline
+            if deadline is not None and not self._hung and time.monotonic() > deadline:
+                self._hung = True
+                logger.error("WebDriver-Befehl hängt seit über %s s, Browser wird beendet.", self.hang_timeout)
+                # Beendet den Browser; der hängende Befehl kehrt daraufhin mit einem Fehler zurück
+                self._kill_browser()
+
+    def _driver_pid(self, crawler=None):
+        try:
+            return (crawler or self.crawler).driver.service.process.pid
+        except AttributeError:
+            return None
+
+    def _kill_browser(self, crawler=None):
+        pid = self._driver_pid(crawler)
+        if pid is None:
+            return
+        # Kinder zuerst, sonst bleiben verwaiste Chrome-Prozesse zurück
+        for child in reversed(process_tree(pid)):
+            try:
+                os.kill(child, KILL_SIGNAL)
+            except OSError:
+                pass
+
+    def _shutdown_browser(self):
+        crawler, self.crawler = self.crawler, None
+        if crawler is None:
+            return
+        if self._hung:
+            self._kill_browser(crawler)
+        try:
+            crawler.close()
+        except Exception as e:
+            logger.warning("WebDriver ließ sich nicht regulär beenden (%s), Prozesse werden beendet.", e)
+            self._kill_browser(crawler)
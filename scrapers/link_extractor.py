@@ -1,11 +1,10 @@
 import logging
-import time
 import random
 from bs4 import BeautifulSoup
 from selenium.webdriver.common.by import By
+from metrics import METRICS
 
-# Konfiguration des Loggings
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
 
 
 class LinkExtractor:
@@ -24,6 +23,23 @@ class LinkExtractor:
         self.driver = driver
         self.base_url = base_url
 
+    @METRICS.timed("crawler_parse_seconds", page="liste")
+    def parse_product_links(self, html):
+        """
+        Liest die Produktlinks aus dem HTML-Quelltext einer Listenseite (ohne Browser).
+
+        Parameter:
+        html (str): Der HTML-Quelltext der Listenseite.
+
+        Rückgabe:
+        list: Die Produktlinks der Seite.
+        """
+        soup = BeautifulSoup(html, 'html.parser')
+
+        # Finden aller Produktkacheln
+        product_tiles = soup.find_all('a', class_='mu-product-tile mu-product-list__item')
+        return [tile['href'] for tile in product_tiles if 'href' in tile.attrs]
+
     def extract_product_links(self):
         """
         Extrahiert alle Produktlinks von der Webseite, einschließlich aller Seiten.
@@ -35,15 +51,11 @@ class LinkExtractor:
         page_number = 1  # Startseite
 
         while True:
-            logging.info(f"Extrahiere Links von Seite {page_number}...")
+            logger.debug("Extrahiere Links von Seite %s...", page_number)
 
             # Abrufen des Seitenquelltexts
-            page_source = self.driver.page_source
-            soup = BeautifulSoup(page_source, 'html.parser')
-
-            # Finden aller Produktkacheln
-            product_tiles = soup.find_all('a', class_='mu-product-tile mu-product-list__item')
-            links = [tile['href'] for tile in product_tiles if 'href' in tile.attrs]
+            links = self.parse_product_links(self.driver.page_source)
+            METRICS.inc("crawler_pages_total", page="liste")
             all_links.extend(links)  # Hinzufügen der gefundenen Links zur Gesamtliste
 
             # Überprüfen, ob eine nächste Seite vorhanden ist und ob der Button klickbar ist
@@ -52,12 +64,12 @@ class LinkExtractor:
                 # Zur nächsten Seite navigieren
                 page_number += 1
                 next_url = self.base_url if page_number == 1 else f"{self.base_url}?p={page_number}"
-                logging.info(f"Weiter zu Seite {page_number}: {next_url}...")
-                self.driver.get(next_url)
-                time.sleep(random.randint(3, 5))  # Warte, bis die nächste Seite geladen ist
+                logger.debug("Weiter zu Seite %s: %s...", page_number, next_url)
+                with METRICS.timer("crawler_fetch_seconds", page="liste"):
+                    self.driver.get(next_url)
+                METRICS.sleep(random.randint(3, 5), reason="liste_blaettern")  # Warte, bis die nächste Seite geladen ist
             else:
-                logging.info("Keine weiteren Seiten.")
+                logger.debug("Keine weiteren Seiten.")
                 break
-        logging.info(f"Es wurden {len(all_links)} Produkte extrahiert ")
-        logging.info("=" * 100 + "\n\n")
+        logger.info("Es wurden %s Produkte extrahiert", len(all_links), extra={"seiten": page_number})
         return all_links
@@ -0,0 +1,149 @@
+import os
+import copy
+import json
+import queue
+import atexit
+import logging
+import logging.handlers
+from datetime import date, time, datetime
+from decimal import Decimal
+
+# Zentrale Logging-Konfiguration. Module loggen nur über ``logging.getLogger(__name__)`` mit %-Platzhaltern
+# (z.B. ``logger.debug("Preis extrahiert: %s", price)``), konfiguriert wird einmal beim Programmstart.
+# Der aufrufende Thread legt den Datensatz nur in eine Queue; Formatierung und Schreiben in Datei und
+# Konsole übernimmt ein QueueListener-Thread, damit Log-I/O die Crawler-Threads nicht ausbremst.
+
+TEXT_FORMAT = '%(asctime)s - %(levelname)s - %(name)s - %(message)s'
+
+# Level einzelner Logger, z.B. um Bibliotheken leiser zu stellen; ergänzt bzw. überschrieben durch
+# die Umgebungsvariable CRAWLER_LOG_LEVELS, z.B. "scrapers.product_extractor=DEBUG,selenium=ERROR"
+DEFAULT_MODULE_LEVELS = {
+    "urllib3": "WARNING",
+    "selenium": "WARNING",
+}
+LEVELS_ENV = "CRAWLER_LOG_LEVELS"
+
+# Attribute, die jeder LogRecord hat; alles andere stammt aus ``extra=`` und landet als Feld im JSON
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "taskName"}
+
+# Argumente dieser Typen dürfen erst im Listener-Thread formatiert werden
+_IMMUTABLE_TYPES = frozenset({str, int, float, bool, bytes, type(None), date, time, datetime, Decimal})
+
+_listener = None
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formatiert einen Datensatz als eine JSON-Zeile: zeit, level, logger, nachricht, thread sowie
+    alle über ``extra=`` übergebenen Felder und ggf. der Traceback.
+    """
+
+    def format(self, record):
+        entry = {
+            "zeit": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "nachricht": record.getMessage(),
+            "thread": record.threadName,
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info:
+            entry["fehler"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    Legt Datensätze in die Queue. Sind alle Argumente unveränderliche Werte (Text, Zahlen, Datum, None),
+    wird die Nachricht erst im Listener-Thread zusammengesetzt. Andernfalls (z.B. ein Produkt-Datensatz
+    oder eine Liste) wird sie sofort gebildet, sonst stünde im Log der Wert zum Zeitpunkt der Ausgabe.
+    Der Traceback bleibt als exc_info erhalten, damit der JsonFormatter ihn als eigenes Feld schreibt.
+    Nur für Queues innerhalb eines Prozesses; Worker-Prozesse verwenden ``configure_worker``.
+    """
+
+    def prepare(self, record):
+        args = record.args
+        if not args or (isinstance(args, tuple) and all(type(arg) in _IMMUTABLE_TYPES for arg in args)):
+            return record
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+def parse_module_levels(text):
+    """
+    Liest Logger-Level im Format "name=LEVEL,name=LEVEL".
+    :return: Dictionary Logger-Name -> Level-Name
+    """
+    levels = {}
+    for part in filter(None, (part.strip() for part in (text or "").split(","))):
+        name, _, level = part.partition("=")
+        levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def setup_logging(log_file=None, level="INFO", module_levels=None, json_console=False):
+    """
+    Richtet das Logging für den ganzen Prozess ein und startet den Listener-Thread.
+    Vorhandene Handler am Root-Logger werden entfernt; ein erneuter Aufruf ersetzt die Konfiguration.
+
+    :param log_file: Optional, Pfad der Log-Datei (JSON Lines, eine Zeile pro Datensatz)
+    :param level: Level des Root-Loggers, z.B. "INFO" oder "DEBUG"
+    :param module_levels: Optional, zusätzliche Level je Logger-Name (vor CRAWLER_LOG_LEVELS angewendet)
+    :param json_console: Auch auf der Konsole JSON statt Text ausgeben
+    :return: Die Queue, an die Worker-Prozesse über ``configure_worker`` angebunden werden können
+    """
+    stop_logging()
+
+    handlers = []
+    console = logging.StreamHandler()
+    console.setFormatter(JsonFormatter() if json_console else logging.Formatter(TEXT_FORMAT))
+    handlers.append(console)
+    if log_file:
+        file_handler = logging.FileHandler(log_file, encoding="utf-8")
+        file_handler.setFormatter(JsonFormatter())
+        handlers.append(file_handler)
+
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    root.handlers.clear()
+    root.addHandler(DeferredQueueHandler(log_queue))
+    root.setLevel(level)
+
+    levels = {**DEFAULT_MODULE_LEVELS, **(module_levels or {}), **parse_module_levels(os.environ.get(LEVELS_ENV))}
+    for name, module_level in levels.items():
+        logging.getLogger(name).setLevel(module_level)
+
+    global _listener
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    return log_queue
+
+
+def configure_worker(log_queue, level="INFO"):
+    """
+    Bindet einen Worker-Prozess an die Queue des Hauptprozesses (z.B. eine multiprocessing.Queue).
+    Hier formatiert der Standard-QueueHandler die Nachricht im Worker, damit der Datensatz serialisierbar ist.
+    """
+    root = logging.getLogger()
+    root.handlers.clear()
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    root.setLevel(level)
+
+
+def stop_logging():
+    """
+    Beendet den Listener-Thread, nachdem alle wartenden Datensätze geschrieben wurden.
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+atexit.register(stop_logging)
@@ -0,0 +1,129 @@
+import json
+import hashlib
+from collections import OrderedDict
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert
+from DB.models import ParsedReview
+
+
+class ParseCache:
+    """
+    Persistenter Cache für spaCy-Analyseergebnisse von Review-Texten.
+
+    Pro Text wird eine kompakte Token-Tabelle gespeichert: eine Liste von (Lemma, POS-Tag, Head-Index).
+    Das reicht für alle Auswertungen des ReviewAnalyzers und ist deutlich kleiner als ein serialisiertes Doc.
+    """
+
+    # Anzahl Hashes pro IN-Abfrage bzw. Zeilen pro INSERT (SQLite-Limit für gebundene Parameter)
+    QUERY_CHUNK_SIZE = 500
+    INSERT_CHUNK_SIZE = 300
+
+    def __init__(self, session_factory, model_version, memory_size=0):
+        """
+        Initialisiert den Cache.
+
+        Parameter:
+        session_factory (sessionmaker): SQLAlchemy-Session-Factory der Analyse-Datenbank.
+        model_version (str): Name und Version des spaCy-Modells, z.B. "de_core_news_sm-3.7.0".
+        memory_size (int): Anzahl der Einträge, die zusätzlich im Arbeitsspeicher gehalten werden
+                           (LRU, 0 = nur Datenbank). Sinnvoll für langlebige Prozesse wie den Analyse-Server.
+        """
+        self.session_factory = session_factory
+        self.model_version = model_version
+        self.memory_size = memory_size
+        self._memory = OrderedDict()
+
+    def _remember(self, entries):
+        if not self.memory_size:
+            return
+        for text_hash, tokens in entries.items():
+            self._memory[text_hash] = tokens
+            self._memory.move_to_end(text_hash)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    @staticmethod
+    def text_hash(text):
+        """
+        Berechnet den Cache-Schlüssel eines Review-Textes.
+
+        Parameter:
+        text (str): Der Review-Text.
+
+        Rückgabe:
+        str: SHA-1-Hash des Textes als Hex-String.
+        """
+        return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def doc_to_tokens(doc):
+        """
+        Wandelt ein spaCy-Doc in die kompakte Token-Tabelle um.
+
+        Parameter:
+        doc (spacy.tokens.Doc): Das analysierte Dokument.
+
+        Rückgabe:
+        list: Liste von (Lemma, POS-Tag, Head-Index) je Token.
+        """
+        return [(token.lemma_, token.pos_, token.head.i) for token in doc]
+
+    def get_many(self, hashes):
+        """
+        Liest die Token-Tabellen für die angegebenen Text-Hashes.
+
+        Parameter:
+        hashes (iterable of str): Die gesuchten Text-Hashes.
+
+        Rückgabe:
+        dict: Text-Hash -> Token-Tabelle, nur für gefundene Einträge.
+        """
+        found = {}
+        missing = []
+        for text_hash in set(hashes):
+            if text_hash in self._memory:
+                found[text_hash] = self._memory[text_hash]
+                self._memory.move_to_end(text_hash)
+            else:
+                missing.append(text_hash)
+        if not missing:
+            return found
+
+        hashes = missing
+        loaded = {}
+        with self.session_factory() as session:
+            for start in range(0, len(hashes), self.QUERY_CHUNK_SIZE):
+                rows = session.execute(
+                    select(ParsedReview.text_hash, ParsedReview.tokens)
+                    .where(ParsedReview.model_version == self.model_version)
+                    .where(ParsedReview.text_hash.in_(hashes[start:start + self.QUERY_CHUNK_SIZE]))
+                )
+                for text_hash, tokens in rows:
+                    loaded[text_hash] = [tuple(token) for token in json.loads(tokens)]
+        self._remember(loaded)
+        found.update(loaded)
+        return found
+
+    def put_many(self, entries):
+        """
+        Speichert neue Token-Tabellen im Cache. Bereits vorhandene Einträge bleiben unverändert.
+
+        Parameter:
+        entries (dict): Text-Hash -> Token-Tabelle.
+        """
+        if not entries:
+            return
+        self._remember(entries)
+        rows = [
+            {
+                "text_hash": text_hash,
+                "model_version": self.model_version,
+                "tokens": json.dumps(tokens, ensure_ascii=False, separators=(',', ':')),
+            }
+            for text_hash, tokens in entries.items()
+        ]
+        with self.session_factory() as session:
+            for start in range(0, len(rows), self.INSERT_CHUNK_SIZE):
+                stmt = insert(ParsedReview.__table__).values(rows[start:start + self.INSERT_CHUNK_SIZE])
+                session.execute(stmt.on_conflict_do_nothing())
+            session.commit()
@@ -1,11 +1,53 @@
 import logging
 import re
-import time
 import random
-from bs4 import BeautifulSoup
+import msgspec
+from bs4 import BeautifulSoup, SoupStrainer
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
+from DB.records import ProductRecord
+from metrics import METRICS
+from scrapers.retry_policy import RetryPolicy, ELEMENT_FEHLT, raise_for_status
+
+logger = logging.getLogger(__name__)
+
+# Script-Blöcke mit strukturierten Daten: JSON-LD (schema.org) und eingebetteter Seitenzustand als JSON
+_JSON_SCRIPT = re.compile(r'<script\b[^>]*\btype=["\']application/(?:ld\+)?json["\'][^>]*>(.*?)</script>',
+                          re.S | re.I)
+_PRODUCT_TYPES = {"Product", "ProductGroup", "IndividualProduct"}
+# Preisarten eines Offers, die den regulären (durchgestrichenen) Preis angeben
+_LIST_PRICE_TYPES = ("StrikethroughPrice", "ListPrice")
+
+
+def _product_nodes(node):
+    """
+    Liefert alle schema.org-Produkte in einer JSON-Struktur (auch in @graph oder tiefer im Seitenzustand).
+    """
+    if isinstance(node, dict):
+        types = node.get("@type")
+        if (types in _PRODUCT_TYPES) if isinstance(types, str) else bool(_PRODUCT_TYPES.intersection(types or ())):
+            yield node
+        for value in node.values():
+            if isinstance(value, (dict, list)):
+                yield from _product_nodes(value)
+    elif isinstance(node, list):
+        for value in node:
+            yield from _product_nodes(value)
+
+
+def _first(value):
+    return value[0] if isinstance(value, list) and value else value
+
+
+def _german_number(value):
+    """
+    Formatiert einen Preis aus JSON (z.B. 39.96 oder "39.96") wie auf der Seite ("39,96").
+    """
+    try:
+        return f"{float(value):.2f}".replace(".", ",")
+    except (TypeError, ValueError):
+        return None
 
 
 class ProductExtractor:
@@ -13,14 +55,16 @@ class ProductExtractor:
     Eine Klasse, um Produktdetails von einer Produktseite zu extrahieren.
     """
 
-    def __init__(self, driver):
+    def __init__(self, driver, retry_policy=None):
         """
         Initialisiert die ProductExtractor-Klasse.
 
         Parameter:
         driver (WebDriver): Der Selenium WebDriver.
+        retry_policy (RetryPolicy): Optional, Regeln für das Neuladen der Seite (Standard: RetryPolicy()).
         """
         self.driver = driver
+        self.retry_policy = retry_policy or RetryPolicy()
         self.currency_map = {
             '€': 'EUR',
             '$': 'USD',
@@ -55,7 +99,7 @@ class ProductExtractor:
         max_seconds (float): Maximale Schlafzeit.
         """
         sleep_time = random.uniform(min_seconds, max_seconds)
-        time.sleep(sleep_time)
+        METRICS.sleep(sleep_time, reason="produkt_zufall")
 
     def wait_for_element(self, xpath, timeout=10):
         """
@@ -69,9 +113,10 @@ class ProductExtractor:
         WebElement: Das gefundene Element oder None, wenn das Element nicht gefunden wurde.
         """
         try:
-            element = WebDriverWait(self.driver, timeout).until(
-                EC.presence_of_element_located((By.XPATH, xpath))
-            )
+            with METRICS.timer("crawler_wait_seconds", what="produkt_element"):
+                element = WebDriverWait(self.driver, timeout).until(
+                    EC.presence_of_element_located((By.XPATH, xpath))
+                )
             return element
         except Exception:
             return None
@@ -84,37 +129,219 @@ class ProductExtractor:
         url (str): Die URL der Produktseite.
 
         Rückgabe:
-        dict: Ein Dictionary mit den extrahierten Produktdetails.
+        ProductRecord: Die extrahierten Produktdetails.
         """
-        logging.info(f"Rufe Produktseite auf: {url}")
-        self.driver.get(url)
-
-        # Scrollen, um sicherzustellen, dass die Seite vollständig geladen ist
-        self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-        self.random_sleep(1, 2)
-        self.driver.execute_script("window.scrollTo(0, 0);")
-        self.random_sleep(1, 2)
+        logger.debug("Rufe Produktseite auf: %s", url)
+        with METRICS.timer("crawler_fetch_seconds", page="produkt"):
+            self.driver.get(url)
+        METRICS.inc("crawler_pages_total", page="produkt")
+        raise_for_status(self.driver, url)
 
         # Warten, bis die Seite vollständig geladen ist
-        WebDriverWait(self.driver, 10).until(
-            lambda d: d.execute_script("return document.readyState") == "complete"
-        )
+        with METRICS.timer("crawler_wait_seconds", what="produkt_ready_state"):
+            WebDriverWait(self.driver, 10).until(
+                lambda d: d.execute_script("return document.readyState") == "complete"
+            )
+
+        # Mit strukturierten Daten (JSON-LD) steht alles im Quelltext, auch Rating und Anzahl der Reviews
+        product = self.parse_product_page(self.driver.page_source, url)
+        if product.gesamtrating is None:
+            # Scrollen, um sicherzustellen, dass nachgeladene Elemente vorhanden sind
+            self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+            self.random_sleep(1, 2)
+            self.driver.execute_script("window.scrollTo(0, 0);")
+            self.random_sleep(1, 2)
+            product = self.parse_product_page(self.driver.page_source, url)
+            product.gesamtrating, product.gesamtanzahl_reviews = self.read_rating_in_browser(url)
+
+        logger.debug("Gesamtrating extrahiert: %s", product.gesamtrating)
+        logger.debug("Gesamtanzahl der Reviews extrahiert: %s", product.gesamtanzahl_reviews)
+
+        logger.info("Produktdetails extrahiert zu -->  %s, %s", product.produktname, product.artikelnummer,
+                    extra={"artikelnummer": product.artikelnummer, "url": url})
+        return product
+
+    def read_rating_in_browser(self, url):
+        """
+        Ermittelt Gesamtrating und Gesamtanzahl der Reviews über die Bewertungs-Schaltfläche im Browser,
+        falls die Seite keine strukturierten Daten enthält.
+
+        Parameter:
+        url (str): Die URL der Produktseite (für die Statusprüfung nach dem Neuladen).
 
-        page_source = self.driver.page_source
-        soup = BeautifulSoup(page_source, 'html.parser')
+        Rückgabe:
+        tuple: (Gesamtrating, Gesamtanzahl der Reviews) als Texte, '0' wenn nicht gefunden.
+        """
+        rating_button_xpath = '//*[@id="page"]/main/div[1]/div/div[1]/div[2]/div[1]/div[3]/div/button'
+
+        # Versuche, das Element zu finden; Anzahl der Versuche und Wartezeit vor dem Neuladen legt die RetryPolicy fest
+        rating_button = None
+        for attempt in self.retry_policy.attempts(ELEMENT_FEHLT):
+            if attempt > 1:
+                logger.warning("Element nicht gefunden (Versuch %s), Seite wird neu geladen...", attempt - 1)
+                with METRICS.timer("crawler_fetch_seconds", page="produkt_neu_laden"):
+                    self.driver.refresh()
+                raise_for_status(self.driver, url)
+                logger.debug("Seite neu geladen")
+            rating_button = self.wait_for_element(rating_button_xpath, 10)
+            if rating_button:
+                break
+
+        if not rating_button:
+            logger.warning("Element nach %s Versuchen nicht gefunden, fahre ohne Gesamtrating fort.",
+                           self.retry_policy.max_attempts(ELEMENT_FEHLT))
+            overall_rating = '0'
+            total_reviews = '0'
+        else:
+            overall_rating_xpath = '//*[@id="page"]/main/div[1]/div/div[1]/div[2]/div[1]/div[3]/div/button/div[2]'
+            total_reviews_xpath = '//*[@id="page"]/main/div[1]/div/div[1]/div[2]/div[1]/div[3]/div/button/div[3]/div'
+
+            overall_rating_element = self.wait_for_element(overall_rating_xpath, 5)
+            total_reviews_element = self.wait_for_element(total_reviews_xpath, 5)
+
+            overall_rating = self.clean_text(overall_rating_element.text) if overall_rating_element else '0'
+            total_reviews = self.clean_text(
+                total_reviews_element.text.replace('(', '').replace(')', '').strip()) if total_reviews_element else '0'
+
+        return overall_rating, total_reviews
+
+    def parse_structured_data(self, html):
+        """
+        Liest die Produktdaten aus JSON-LD bzw. eingebettetem Seitenzustand, ohne das HTML zu parsen.
+
+        Parameter:
+        html (str): Der HTML-Quelltext der Produktseite.
+
+        Rückgabe:
+        dict: Gefundene Felder des ProductRecord (Texte wie auf der Seite), leer ohne strukturierte Daten.
+        """
+        for block in _JSON_SCRIPT.findall(html):
+            try:
+                data = msgspec.json.decode(block.strip())
+            except msgspec.DecodeError:
+                continue
+            for node in _product_nodes(data):
+                fields = self._fields_from_product(node)
+                if fields:
+                    return fields
+        return {}
+
+    def _fields_from_product(self, node):
+        """
+        Übersetzt ein schema.org-Produkt (Product mit Offer und AggregateRating) in Felder des ProductRecord.
+        """
+        fields = {}
+        if isinstance(node.get("name"), str):
+            fields["produktname"] = self.clean_text(node["name"])
+        article_number = node.get("sku") or node.get("productID") or node.get("mpn")
+        if article_number:
+            fields["artikelnummer"] = str(article_number).strip()
+        brand = _first(node.get("brand"))
+        brand = brand.get("name") if isinstance(brand, dict) else brand
+        if isinstance(brand, str) and brand.strip():
+            fields["marke"] = self.clean_text(brand)
+        if isinstance(node.get("description"), str) and node["description"].strip():
+            fields["artikelbeschreibung"] = self.clean_text(node["description"])
+
+        offer = _first(node.get("offers"))
+        if isinstance(offer, dict):
+            price = _german_number(offer.get("price", offer.get("lowPrice")))
+            specifications = offer.get("priceSpecification") or ()
+            if isinstance(specifications, dict):
+                specifications = [specifications]
+            list_price = None
+            for specification in specifications:
+                if isinstance(specification, dict) and str(specification.get("priceType", "")).endswith(_LIST_PRICE_TYPES):
+                    list_price = _german_number(specification.get("price"))
+            if price is not None:
+                # Mit höherem Listenpreis ist der Angebotspreis ein Promo-Preis, wie auf der Seite dargestellt
+                if list_price is not None and float(list_price.replace(",", ".")) > float(price.replace(",", ".")):
+                    fields.update(preis=list_price, promo_preis=price, on_promo=True)
+                else:
+                    fields.update(preis=price, promo_preis='N/A', on_promo=False)
+                currency = offer.get("priceCurrency")
+                fields["waehrung"] = currency if isinstance(currency, str) and currency else 'Unbekannt'
+
+        # Ohne AggregateRating hat das Produkt noch keine Bewertungen
+        rating = node.get("aggregateRating")
+        if isinstance(rating, dict) and rating.get("ratingValue") is not None:
+            fields["gesamtrating"] = str(rating["ratingValue"])
+            count = rating.get("reviewCount", rating.get("ratingCount"))
+            fields["gesamtanzahl_reviews"] = str(count) if count is not None else '0'
+        elif fields:
+            fields.update(gesamtrating='0', gesamtanzahl_reviews='0')
+        return fields
+
+    @METRICS.timed("crawler_parse_seconds", page="produkt")
+    def parse_product_page(self, html, url):
+        """
+        Liest die Produktdetails aus dem HTML-Quelltext einer Produktseite (ohne Browser).
+        Zuerst werden die strukturierten Daten (JSON-LD bzw. Seitenzustand) gelesen; nur für Felder, die dort
+        fehlen, kommen die CSS-Selektoren zum Einsatz. Gesamtrating und Gesamtanzahl der Reviews sind nur
+        gesetzt, wenn sie in den strukturierten Daten stehen, sonst ermittelt sie ``extract_product_details``
+        im Browser.
+
+        Parameter:
+        html (str): Der HTML-Quelltext der Produktseite.
+        url (str): Die URL der Produktseite.
+
+        Rückgabe:
+        ProductRecord: Die extrahierten Produktdetails.
+        """
+        fields = self.parse_structured_data(html)
+        if fields:
+            METRICS.inc("crawler_structured_data_total", page="produkt")
+        logger.debug("Strukturierte Daten: %s", sorted(fields))
+
+        # Die Inhaltsstoffe stehen nie in den strukturierten Daten; fehlt sonst nichts, genügt es,
+        # nur die Tabellen der Seite zu parsen
+        complete = all(key in fields for key in ("artikelnummer", "produktname", "preis", "marke",
+                                                 "artikelbeschreibung"))
+        soup = BeautifulSoup(html, 'html.parser', parse_only=SoupStrainer('table') if complete else None)
 
         # Artikelnummer
-        article_number_element = soup.select_one('.mu-product-details-page__article-number')
-        article_number = self.clean_text(
-            article_number_element.text.replace('Art.Nr.', '')) if article_number_element else 'Unbekannt'
-        logging.info(f"Artikelnummer extrahiert: {article_number}")
+        if "artikelnummer" not in fields:
+            article_number_element = soup.select_one('.mu-product-details-page__article-number')
+            fields["artikelnummer"] = self.clean_text(
+                article_number_element.text.replace('Art.Nr.', '')) if article_number_element else 'Unbekannt'
+        logger.debug("Artikelnummer extrahiert: %s", fields["artikelnummer"])
 
         # Produktname
-        product_name_element = soup.select_one('.mu-product-details-page__product-name')
-        product_name = self.clean_text(product_name_element.text) if product_name_element else 'Unbekannt'
-        logging.info(f"Produktname extrahiert: {product_name}")
+        if "produktname" not in fields:
+            product_name_element = soup.select_one('.mu-product-details-page__product-name')
+            fields["produktname"] = self.clean_text(product_name_element.text) if product_name_element else 'Unbekannt'
+        logger.debug("Produktname extrahiert: %s", fields["produktname"])
 
         # Preis und Währung
+        if "preis" not in fields:
+            fields.update(self._parse_price(soup))
+        logger.debug("Preis extrahiert: %s %s", fields["preis"], fields["waehrung"])
+        logger.debug("Promo Preis extrahiert: %s %s", fields["promo_preis"], fields["waehrung"])
+        logger.debug("On Promo: %s", fields["on_promo"])
+
+        # Marke
+        if "marke" not in fields:
+            brand_element = soup.select_one('a.mu-product-details-page__brand img')
+            fields["marke"] = self.clean_text(brand_element['alt']) if brand_element else 'Unbekannt'
+        logger.debug("Marke extrahiert: %s", fields["marke"])
+
+        # Artikelbeschreibung
+        if "artikelbeschreibung" not in fields:
+            description_element = soup.select_one('.mu-product-description__text')
+            fields["artikelbeschreibung"] = self.clean_text(description_element.text) if description_element else 'Unbekannt'
+        logger.debug("Artikelbeschreibung extrahiert.")
+
+        # Inhaltsstoffe
+        ingredients_element = soup.select_one('td:-soup-contains("Inhaltsstoffe") + td')
+        fields["inhaltsstoffe"] = self.clean_text(ingredients_element.text) if ingredients_element else 'Unbekannt'
+        logger.debug("Inhaltsstoffe extrahiert.")
+
+        return ProductRecord(produkt_url=url, **fields)
+
+    def _parse_price(self, soup):
+        """
+        Liest Preis, Promo-Preis und Währung über die CSS-Selektoren der Preisanzeige.
+        """
         price_element = soup.select_one('div.mu-product-price__price-container span.mu-product-price__price')
         promo_price_element = soup.select_one(
             'div.mu-product-price__price-container span.mu-product-price__price--promo')
@@ -134,72 +361,4 @@ class ProductExtractor:
                 currency = curr
                 price = price.replace(symbol, '').strip()
                 break
-        logging.info(f"Preis extrahiert: {price} {currency}")
-        logging.info(f"Promo Preis extrahiert: {promo_price} {currency}")
-        logging.info(f"On Promo: {on_promo}")
-
-        # Marke
-        brand_element = soup.select_one('a.mu-product-details-page__brand img')
-        brand = self.clean_text(brand_element['alt']) if brand_element else 'Unbekannt'
-        logging.info(f"Marke extrahiert: {brand}")
-
-        # Artikelbeschreibung
-        description_element = soup.select_one('.mu-product-description__text')
-        description = self.clean_text(description_element.text) if description_element else 'Unbekannt'
-        logging.info("Artikelbeschreibung extrahiert.")
-
-        # Inhaltsstoffe
-        ingredients_element = soup.select_one('td:-soup-contains("Inhaltsstoffe") + td')
-        ingredients = self.clean_text(ingredients_element.text) if ingredients_element else 'Unbekannt'
-        logging.info("Inhaltsstoffe extrahiert.")
-
-        # Gesamtrating und Gesamtanzahl der Reviews
-        rating_button_xpath = '//*[@id="page"]/main/div[1]/div/div[1]/div[2]/div[1]/div[3]/div/button'
-
-        # Versuche, das Element zu finden (maximal 3 Versuche)
-        attempts = 0
-        rating_button = None
-        while attempts < 3 and not rating_button:
-            rating_button = self.wait_for_element(rating_button_xpath, 10)
-            if not rating_button:
-                attempts += 1
-                logging.warning(f"Element nicht gefunden (Versuch {attempts}), Seite wird neu geladen...")
-                self.driver.refresh()
-                self.random_sleep(1, 2)
-                logging.info("Seite neu geladen")
-
-        if not rating_button:
-            logging.warning("Element nach 3 Versuchen nicht gefunden, fahre ohne Gesamtrating fort.")
-            overall_rating = '0'
-            total_reviews = '0'
-        else:
-            overall_rating_xpath = '//*[@id="page"]/main/div[1]/div/div[1]/div[2]/div[1]/div[3]/div/button/div[2]'
-            total_reviews_xpath = '//*[@id="page"]/main/div[1]/div/div[1]/div[2]/div[1]/div[3]/div/button/div[3]/div'
-
-            overall_rating_element = self.wait_for_element(overall_rating_xpath, 5)
-            total_reviews_element = self.wait_for_element(total_reviews_xpath, 5)
-
-            overall_rating = self.clean_text(overall_rating_element.text) if overall_rating_element else '0'
-            total_reviews = self.clean_text(
-                total_reviews_element.text.replace('(', '').replace(')', '').strip()) if total_reviews_element else '0'
-
-        logging.info(f"Gesamtrating extrahiert: {overall_rating}")
-        logging.info(f"Gesamtanzahl der Reviews extrahiert: {total_reviews}")
-
-        logging.info(f"Produktdetails extrahiert zu -->  {product_name}, {article_number}")
-        logging.info("=" * 100 + "\n")
-
-        return {
-            'Produkt_URL': url,
-            'Artikelnummer': article_number,
-            'Produktname': product_name,
-            'Preis': price,
-            'Promo_Preis': promo_price,
-            'on_promo': on_promo,
-            'Währung': currency,
-            'Marke': brand,
-            'Artikelbeschreibung': description,
-            'Inhaltsstoffe': ingredients,
-            'GesamtRating': overall_rating,
-            'Gesamtanzahl_Reviews': total_reviews
-        }
+        return {"preis": price, "promo_preis": promo_price, "on_promo": on_promo, "waehrung": currency}
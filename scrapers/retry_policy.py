@@ -0,0 +1,275 @@
+import time
+import random
+import logging
+import threading
+from urllib.parse import urlparse
+import requests
+from selenium.common.exceptions import (
+    TimeoutException, NoSuchElementException, StaleElementReferenceException,
+    InvalidSessionIdException, NoSuchWindowException, WebDriverException
+)
+from metrics import METRICS
+
+logger = logging.getLogger(__name__)
+
+# Fehlerklassen; danach richten sich Anzahl der Versuche, Wartezeit und der Circuit Breaker
+TIMEOUT = "timeout"
+ELEMENT_FEHLT = "element_fehlt"
+DROSSELUNG = "drosselung"          # HTTP 429
+SERVERFEHLER = "serverfehler"      # HTTP 5xx
+CLIENTFEHLER = "clientfehler"      # übrige HTTP 4xx, eine Wiederholung hilft nicht
+DRIVER = "driver"                  # abgestürzter oder hängender Browser
+SONSTIGE = "sonstige"
+# Kein Fehler aus classify: Review-Bereich nach dem Laden nicht gefunden (Neuladen in ReviewExtractor)
+REVIEWS_FEHLEN = "reviews_fehlen"
+
+# Fehlerklasse -> (maximale Versuche, Basis-Wartezeit in s, maximale Wartezeit in s)
+DEFAULT_RULES = {
+    TIMEOUT: (3, 2.0, 30.0),
+    ELEMENT_FEHLT: (3, 1.0, 8.0),
+    DROSSELUNG: (5, 15.0, 300.0),
+    SERVERFEHLER: (4, 5.0, 120.0),
+    CLIENTFEHLER: (1, 0.0, 0.0),
+    DRIVER: (3, 0.0, 0.0),
+    SONSTIGE: (1, 0.0, 0.0),
+    # Das Review-Widget lädt nachträglich und bleibt öfter aus als ein Element der Produktseite
+    REVIEWS_FEHLEN: (5, 1.0, 8.0),
+}
+
+# Fehlerklassen, die auf eine überlastete oder drosselnde Seite hindeuten
+THROTTLE_KINDS = {DROSSELUNG, SERVERFEHLER, TIMEOUT}
+
+# Meldungen von Selenium/Chromedriver bei abgestürztem Browser
+_DRIVER_MESSAGES = ("session deleted", "disconnected", "chrome not reachable", "target window already closed",
+                    "tab crashed", "no such session")
+
+
+class HttpStatusError(Exception):
+    """
+    Eine Seite wurde mit einem Fehler-Statuscode ausgeliefert.
+    """
+
+    def __init__(self, url, status):
+        super().__init__(f"HTTP {status} für {url}")
+        self.url = url
+        self.status = status
+
+
+# Statuscode der zuletzt geladenen Seite aus der Navigation-Timing-API (Chrome ab Version 109)
+_STATUS_SCRIPT = "const e = performance.getEntriesByType('navigation')[0]; return e ? e.responseStatus : null;"
+
+
+def page_status(driver):
+    """
+    Liefert den HTTP-Statuscode der aktuell geladenen Seite.
+    :return: Der Statuscode oder None, wenn der Browser ihn nicht liefert
+    """
+    try:
+        return driver.execute_script(_STATUS_SCRIPT) or None
+    except Exception:
+        return None
+
+
+def raise_for_status(driver, url):
+    """
+    Löst HttpStatusError aus, wenn die aktuelle Seite mit einem Fehler-Statuscode (ab 400) geladen wurde,
+    z.B. bei Drosselung (429) oder Überlastung (5xx) der Seite.
+    """
+    status = page_status(driver)
+    if status is None:
+        return
+    METRICS.inc("crawler_http_status_total", status=status)
+    if status >= 400:
+        raise HttpStatusError(url, status)
+
+
+def classify(error) -> str:
+    """
+    Ordnet einen Fehler einer Fehlerklasse zu.
+    """
+    if isinstance(error, HttpStatusError):
+        if error.status == 429:
+            return DROSSELUNG
+        return SERVERFEHLER if error.status >= 500 else CLIENTFEHLER
+    if isinstance(error, (TimeoutException, requests.exceptions.Timeout)):
+        return TIMEOUT
+    if isinstance(error, requests.exceptions.ConnectionError):
+        return SERVERFEHLER
+    if isinstance(error, (NoSuchElementException, StaleElementReferenceException)):
+        return ELEMENT_FEHLT
+    if isinstance(error, (InvalidSessionIdException, NoSuchWindowException, ConnectionError)):
+        return DRIVER
+    if isinstance(error, WebDriverException) and any(text in str(error).lower() for text in _DRIVER_MESSAGES):
+        return DRIVER
+    return SONSTIGE
+
+
+class CircuitBreaker:
+    """
+    Schutz pro Host. Nach jeder Drosselung (429) wird der Mindestabstand zwischen zwei Anfragen
+    verdoppelt und bei Erfolgen wieder halbiert. Nach ``threshold`` aufeinanderfolgenden Fehlern, die auf
+    Überlastung hindeuten, pausieren alle Anfragen an den Host für ``cooldown`` Sekunden; jede weitere
+    Öffnung verdoppelt die Pause. Thread-sicher, damit ein Breaker alle Worker eines Hosts bremst.
+    """
+
+    def __init__(self, host, threshold=3, cooldown=60.0, max_cooldown=900.0, max_interval=30.0):
+        self.host = host
+        self.threshold = threshold
+        self.base_cooldown = cooldown
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.max_interval = max_interval
+
+        self.failures = 0
+        self.interval = 0.0
+        self.open_until = 0.0
+        self.next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def before_request(self):
+        """
+        Wartet, bis der Host wieder angefragt werden darf (Pause bzw. Mindestabstand), und reserviert
+        den nächsten Zeitpunkt für diesen Aufrufer.
+        """
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot, self.open_until)
+            self.next_slot = slot + self.interval
+            paused = self.open_until > now
+        if slot > now:
+            METRICS.sleep(slot - now, reason="breaker_pause" if paused else "breaker_abstand")
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.cooldown = self.base_cooldown
+            self.interval = self.interval / 2 if self.interval >= 0.5 else 0.0
+
+    def record_failure(self, kind):
+        if kind not in THROTTLE_KINDS:
+            return
+        with self._lock:
+            self.failures += 1
+            if kind == DROSSELUNG:
+                self.interval = min(self.max_interval, max(1.0, self.interval * 2))
+            if self.failures < self.threshold:
+                return
+            self.open_until = time.monotonic() + self.cooldown
+            logger.warning("Circuit Breaker für %s geöffnet: %s Fehler in Folge (%s), Pause %.0f s.",
+                           self.host, self.failures, kind, self.cooldown)
+            METRICS.inc("crawler_breaker_open_total", host=self.host)
+            self.cooldown = min(self.cooldown * 2, self.max_cooldown)
+            self.failures = 0
+
+
+class CircuitBreakers:
+    """
+    Ein CircuitBreaker je Host, wird beim ersten Zugriff angelegt.
+    """
+
+    def __init__(self, **settings):
+        self.settings = settings
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def for_url(self, url) -> CircuitBreaker:
+        host = urlparse(url).netloc if isinstance(url, str) else ""
+        with self._lock:
+            if host not in self._breakers:
+                self._breakers[host] = CircuitBreaker(host, **self.settings)
+            return self._breakers[host]
+
+
+# Prozessweite Breaker, damit alle Crawler desselben Hosts gemeinsam gebremst werden
+BREAKERS = CircuitBreakers()
+
+
+class RetryPolicy:
+    """
+    Gemeinsame Regeln für Wiederholungen: Anzahl der Versuche und exponentielles Backoff mit
+    zufälliger Streuung (full jitter) je Fehlerklasse.
+    """
+
+    def __init__(self, rules=None, breakers=None, rng=None):
+        """
+        :param rules: Optional, abweichende Regeln je Fehlerklasse (siehe DEFAULT_RULES)
+        :param breakers: Circuit Breaker je Host (Standard: BREAKERS)
+        :param rng: Optional, Zufallsgenerator für reproduzierbare Wartezeiten
+        """
+        self.rules = {**DEFAULT_RULES, **(rules or {})}
+        self.breakers = breakers if breakers is not None else BREAKERS
+        self.rng = rng or random.Random()
+
+    def max_attempts(self, kind) -> int:
+        return self.rules.get(kind, DEFAULT_RULES[SONSTIGE])[0]
+
+    def should_retry(self, kind, attempt) -> bool:
+        """
+        :param attempt: Anzahl der bisherigen Versuche (ab 1)
+        """
+        return attempt < self.max_attempts(kind)
+
+    def backoff(self, kind, attempt) -> float:
+        """
+        Wartezeit vor dem nächsten Versuch: zufällig zwischen 0 und Basis * 2^(attempt-1), höchstens Maximum.
+        """
+        _, base, cap = self.rules.get(kind, DEFAULT_RULES[SONSTIGE])
+        return self.rng.uniform(0, min(cap, base * 2 ** (attempt - 1)))
+
+    def wait(self, kind, attempt):
+        """
+        Wartet die Backoff-Zeit ab (erfasst in den Metriken als crawler_sleep_seconds{reason="retry_<klasse>"}).
+        """
+        delay = self.backoff(kind, attempt)
+        if delay > 0:
+            METRICS.sleep(delay, reason=f"retry_{kind}")
+
+    def attempts(self, kind):
+        """
+        Liefert die Versuchsnummern einer Fehlerklasse und wartet zwischen zwei Versuchen, z.B.:
+
+            for attempt in policy.attempts(ELEMENT_FEHLT):
+                if finde_element():
+                    break
+        """
+        for attempt in range(1, self.max_attempts(kind) + 1):
+            if attempt > 1:
+                self.wait(kind, attempt - 1)
+            yield attempt
+
+
+class DeadLetters:
+    """
+    Endgültig fehlgeschlagene Einträge mit Fehlerklasse, für einen späteren zweiten Durchgang.
+    """
+
+    def __init__(self):
+        self.entries = []
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add(self, item, url, kind, error, attempts):
+        with self._lock:
+            self.entries.append({"item": item, "url": url, "fehlerklasse": kind,
+                                 "fehler": str(error).strip(), "versuche": attempts})
+        METRICS.inc("crawler_dead_letters_total", kind=kind)
+
+    def retryable(self) -> int:
+        """
+        :return: Anzahl der Einträge, bei denen ein weiterer Versuch sinnvoll ist (ohne Client-Fehler wie 404)
+        """
+        return sum(1 for entry in self.entries if entry["fehlerklasse"] != CLIENTFEHLER)
+
+    def take(self) -> list:
+        """
+        Entnimmt alle Einträge außer Client-Fehlern (für einen erneuten Versuch).
+        """
+        with self._lock:
+            taken = [entry for entry in self.entries if entry["fehlerklasse"] != CLIENTFEHLER]
+            self.entries = [entry for entry in self.entries if entry["fehlerklasse"] == CLIENTFEHLER]
+        return [entry["item"] for entry in taken]
+
+    def to_list(self) -> list:
+        return [{key: value for key, value in entry.items() if key != "item"} for entry in self.entries]
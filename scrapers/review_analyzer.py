@@ -1,12 +1,22 @@
 import os
+import numpy as np
 import pandas as pd
 import spacy
 from tqdm import tqdm
 from collections import Counter
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, delete
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.dialects.sqlite import insert
 from datetime import datetime
-from DB.models import Product, Review
+from DB.models import ParsedReview, ReviewCombination, ProductCombinationTotal, AnalysisWatermark, ReviewDuplicate
+from DB.dedup import normalize_review_text
+from DB.aggregates import upsert_counts
+from scrapers.parse_cache import ParseCache
+from scrapers.review_loader import iter_review_chunks, count_reviews
+from scrapers.analysis_buckets import AnalysisBucket
+from scrapers import combination_reports
+from scrapers.combination_matrix import CombinationMatrix
+
 
 class ReviewAnalyzer:
     """
@@ -30,9 +40,32 @@ class ReviewAnalyzer:
         SQLAlchemy-Session-Factory, die an die Datenbank-Engine gebunden ist.
     nlp : spacy.lang.de.German
         SpaCy-Sprachmodell für die Textanalyse auf Deutsch.
+    batch_size : int
+        Anzahl der Reviews, die spaCy pro Batch in ``nlp.pipe`` verarbeitet.
+    n_process : int
+        Anzahl der Prozesse für ``nlp.pipe`` (1 = kein Multiprocessing, -1 = alle CPU-Kerne).
+    parse_cache : ParseCache or None
+        Persistenter Cache der Analyseergebnisse je Review-Text (None, wenn deaktiviert).
     """
 
-    def __init__(self, db_path, output_dir, rating_filter, analysis_filename, is_negative=False):
+    # Für die Kombinationen werden nur POS-Tags, Lemmata und der Dependency-Baum benötigt
+    MODEL_NAME = "de_core_news_sm"
+    UNUSED_COMPONENTS = ["ner"]
+    # Kategorien der Wortkombinationen, der Index ist der Code in den Spaltenarrays
+    KATEGORIEN = ("adj_noun", "verb_adj")
+    # Anzahl der Reviews, für die der Parse-Cache in einem Schritt abgefragt wird
+    CACHE_CHUNK_SIZE = 10000
+    # Wasserstand der inkrementellen Kombinationszählung und Anzahl neuer Reviews pro Transaktion
+    WATERMARK_NAME = "review_combinations"
+    UPDATE_CHUNK_SIZE = 5000
+    # Version der Textvorbereitung (Anreiz-Hinweis entfernt, Duplikate ausgeschlossen, Produkt über die Session
+    # zugeordnet); Teil des Wasserstands, damit ältere Zählungen bei einer Änderung neu aufgebaut werden
+    TEXT_VERSION = "dedup1+session"
+    # Unterverzeichnis von output_dir für die Produkt x Kombination-Matrizen je Bucket
+    MATRIX_DIR = "matrix"
+
+    def __init__(self, db_path, output_dir, rating_filter, analysis_filename, is_negative=False,
+                 batch_size=256, n_process=1, use_cache=True, cache_memory_size=0):
         """
         Initialisiert den ReviewAnalyzer mit den angegebenen Parametern und richtet die Datenbankverbindung ein.
 
@@ -48,6 +81,14 @@ class ReviewAnalyzer:
             Basisname für die Ausgabedatei (CSV), die die Analyseergebnisse enthält.
         is_negative : bool, optional
             Flag, das angibt, ob die Analyse eine Logik für negative Bewertungen verwenden soll (Standard ist False).
+        batch_size : int, optional
+            Anzahl der Reviews pro ``nlp.pipe``-Batch (Standard ist 256).
+        n_process : int, optional
+            Anzahl der Prozesse für ``nlp.pipe`` (Standard ist 1, -1 nutzt alle CPU-Kerne).
+        use_cache : bool, optional
+            Ob Analyseergebnisse im Parse-Cache der Datenbank gelesen/gespeichert werden (Standard ist True).
+        cache_memory_size : int, optional
+            Anzahl der Parse-Cache-Einträge, die zusätzlich im Arbeitsspeicher gehalten werden (Standard ist 0).
         """        
         
         self.db_path = db_path
@@ -55,28 +96,96 @@ class ReviewAnalyzer:
         self.rating_filter = rating_filter
         self.analysis_filename = analysis_filename
         self.is_negative = is_negative  # Neuer Parameter zur Unterscheidung der Logik
+        self.batch_size = batch_size
+        self.n_process = n_process
 
         # Initialisiere die Datenbankverbindung
         self.engine = create_engine(f"sqlite:///{self.db_path}", connect_args={"check_same_thread": False})
         self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
 
-        # Lade das SpaCy Modell für die Textanalyse (Deutsch)
+        # Lade das SpaCy Modell für die Textanalyse (Deutsch), nicht benötigte Komponenten werden deaktiviert
         try:
-            self.nlp = spacy.load("de_core_news_sm")
+            self.nlp = spacy.load(self.MODEL_NAME, disable=self.UNUSED_COMPONENTS)
         except OSError:
             from spacy.cli import download
-            download("de_core_news_sm")
-            self.nlp = spacy.load("de_core_news_sm")
+            download(self.MODEL_NAME)
+            self.nlp = spacy.load(self.MODEL_NAME, disable=self.UNUSED_COMPONENTS)
+
+        # Tabellen für die inkrementelle Analyse anlegen (falls sie noch nicht existieren)
+        for table in (ReviewCombination.__table__, ProductCombinationTotal.__table__, AnalysisWatermark.__table__,
+                      ReviewDuplicate.__table__):
+            table.create(bind=self.engine, checkfirst=True)
+
+        # Persistenter Parse-Cache, Schlüssel enthält die Modellversion
+        self.model_version = f"{self.nlp.meta['lang']}_{self.nlp.meta['name']}-{self.nlp.meta['version']}"
+        self.parse_cache = None
+        if use_cache:
+            ParsedReview.__table__.create(bind=self.engine, checkfirst=True)
+            self.parse_cache = ParseCache(self.SessionLocal, self.model_version, memory_size=cache_memory_size)
+        self.analysis_version = f"{self.model_version}+{self.TEXT_VERSION}"
+
+    def parse_reviews(self, review_rows):
+
+        """
+        Liefert die Token-Tabellen für einen Strom von Reviews. Bereits analysierte Texte werden
+        aus dem Parse-Cache gelesen, nur fehlende Texte laufen durch ``nlp.pipe`` und werden
+        anschließend im Cache gespeichert.
+
+        Parameter
+        ----------
+        review_rows : iterable of tuple
+            Tupel aus (Review-Text, Kontext). Der Kontext wird unverändert durchgereicht.
+
+        Rückgabe
+        ----------
+        generator of tuple
+            Tupel aus (Token-Tabelle, Kontext) in der Eingabereihenfolge.
+        """
+        if self.parse_cache is None:
+            docs = self.nlp.pipe(review_rows, as_tuples=True, batch_size=self.batch_size, n_process=self.n_process)
+            for doc, context in docs:
+                yield ParseCache.doc_to_tokens(doc), context
+            return
+
+        chunk = []
+        for row in review_rows:
+            chunk.append(row)
+            if len(chunk) >= self.CACHE_CHUNK_SIZE:
+                yield from self._parse_chunk(chunk)
+                chunk = []
+        if chunk:
+            yield from self._parse_chunk(chunk)
+
+    def _parse_chunk(self, chunk):
+        hashes = [ParseCache.text_hash(text) for text, _ in chunk]
+        parsed = self.parse_cache.get_many(hashes)
+
+        # Nur Cache-Misses parsen (jeder unterschiedliche Text genau einmal)
+        misses = {}
+        for (text, _), text_hash in zip(chunk, hashes):
+            if text_hash not in parsed and text_hash not in misses:
+                misses[text_hash] = text
+        if misses:
+            docs = self.nlp.pipe(((text, text_hash) for text_hash, text in misses.items()), as_tuples=True,
+                                 batch_size=self.batch_size, n_process=self.n_process)
+            new_entries = {text_hash: ParseCache.doc_to_tokens(doc) for doc, text_hash in docs}
+            self.parse_cache.put_many(new_entries)
+            parsed.update(new_entries)
+
+        for (_, context), text_hash in zip(chunk, hashes):
+            yield parsed[text_hash], context
 
     def analyze_reviews(self, reviews):
 
         """
         Analysiert die übergebenen Reviews, indem häufige Wortkombinationen extrahiert werden.
+        Jedes Review wird als eigenes Dokument über ``nlp.pipe`` verarbeitet, damit keine
+        Dependency-Kanten über Review-Grenzen hinweg entstehen und ``nlp.max_length`` nicht greift.
 
         Parameter
         ----------
-        reviews : list of str
-            Liste von Bewertungen als Text.
+        reviews : iterable of str
+            Bewertungen als Text.
 
         Rückgabe
         ----------
@@ -86,27 +195,13 @@ class ReviewAnalyzer:
             Zähler für häufige Kombinationen von Verben und Adjektiven.
         """
 
-        # Verbinde alle Reviews zu einem langen Text
-        all_reviews_text = ' '.join(reviews)
-
-        # Erstelle ein SpaCy-Dokument
-        doc = self.nlp(all_reviews_text)
-
-        # Häufige Wortkombinationen zählen
-        adj_noun_combinations = Counter()
-        verb_adj_combinations = Counter()
-
-        for token in doc:
-            # Verwende Lemmatization für Adjektive und deren zugehörige Nomen
-            if token.pos_ == 'ADJ' and token.head.pos_ == 'NOUN':
-                lemma_combo = f"{token.lemma_} {token.head.lemma_}"
-                adj_noun_combinations[lemma_combo] += 1
-
-            # Verwende Lemmatization für Adjektive und deren zugehörige Verben
-            if token.pos_ == 'ADJ' and token.head.pos_ == 'VERB':
-                lemma_combo = f"{token.lemma_} {token.head.lemma_}"
-                verb_adj_combinations[lemma_combo] += 1
+        # Häufige Wortkombinationen zählen, dieselbe Extraktion wie bei der inkrementellen Analyse
+        _, columns, vocabulary = self.extract_combinations(self.parse_reviews((text, None) for text in reviews))
+        counters = [Counter() for _ in self.KATEGORIEN]
+        for (kategorie, kombination), count in columns.groupby(["kategorie", "kombination"]).size().items():
+            counters[kategorie][vocabulary[kombination]] = int(count)
 
+        adj_noun_combinations, verb_adj_combinations = counters
         return adj_noun_combinations, verb_adj_combinations
 
     def filter_combinations(self, combinations):
@@ -125,79 +220,210 @@ class ReviewAnalyzer:
             Gefilterte Kombinationen, die den festgelegten Kriterien entsprechen.
         """
 
-        # Unterschiedliche Filterlogik für negative Bewertungen
-        if self.is_negative:
-            # Weniger restriktive Logik: Erlaube auch Kombinationen, die nur einmal vorkommen
-            filtered_combinations = {combo: count for combo, count in combinations.items() if count > 0}
-        else:
-            # Standard-Filterlogik: Nur Kombinationen mit mehr als 2 Vorkommen
-            filtered_combinations = {combo: count for combo, count in combinations.items() if count > 2}
-        
+        min_count = self.bucket.min_count
+        filtered_combinations = {combo: count for combo, count in combinations.items() if count > min_count}
+
         return filtered_combinations
-    
-    def run_analysis(self):
+
+    @property
+    def bucket(self):
 
         """
-        Führt die vollständige Analyse durch, einschließlich des Abrufens der Bewertungen aus der Datenbank, 
-        der Analyse und des Speicherns der Ergebnisse in einer CSV-Datei.
+        Die Auswertung dieses Analyzers als AnalysisBucket (Dateiname, Rating-Filter, Filterlogik).
+        """
+        return AnalysisBucket(self.analysis_filename, self.rating_filter, self.is_negative)
+
+    def update_combination_counts(self):
+
+        """
+        Analysiert alle Reviews, die seit dem letzten Lauf hinzugekommen sind (Review-ID größer als der
+        gespeicherte Wasserstand), speichert die Kombinationen je Review und addiert sie auf die
+        Summen je Produkt und Rating. Als Duplikat markierte Reviews werden übersprungen. Ändert sich die
+        Modell- oder Textversion, werden die Zählungen neu aufgebaut.
+
+        Rückgabe
+        ----------
+        int
+            Anzahl der neu analysierten Reviews.
         """
-        
-    # Erstelle eine neue Session
         session = self.SessionLocal()
 
         try:
-            # Abfrage: Alle Reviews mit den gewünschten Bewertungen abrufen und die zugehörigen Produkte joinen
-            reviews = (
-                session.query(Review)
-                .join(Product, Review.produkt_id == Product.id)
-                .filter(Review.rating.in_(self.rating_filter))
-                .all()
-            )
-
-            reviews_data = [
-                {
-                    "review": review.review,
-                    "rating": review.rating,
-                    "produktname": review.product.produktname,
-                    "marke": review.product.marke
-                }
-                for review in reviews
-            ]
+            watermark = session.get(AnalysisWatermark, self.WATERMARK_NAME)
+            if watermark is None:
+                watermark = AnalysisWatermark(name=self.WATERMARK_NAME, last_review_id=0,
+                                              model_version=self.analysis_version)
+                session.add(watermark)
+            elif watermark.model_version != self.analysis_version:
+                # Zählungen eines anderen Modells sind nicht vergleichbar -> komplett neu aufbauen
+                session.execute(delete(ReviewCombination))
+                session.execute(delete(ProductCombinationTotal))
+                watermark.last_review_id = 0
+                watermark.model_version = self.analysis_version
+            session.commit()
+            last_review_id = watermark.last_review_id
+
+            # Neue Reviews blockweise und nur mit den benötigten Spalten laden (kein ORM, kein N+1)
+            total = count_reviews(session, min_review_id=last_review_id)
+            with tqdm(total=total, desc="Analyse-Fortschritt der neuen Reviews") as pbar:
+                for chunk in iter_review_chunks(self.SessionLocal, min_review_id=last_review_id,
+                                                chunk_size=self.UPDATE_CHUNK_SIZE):
+                    self._store_combinations(session, chunk)
+                    # Wasserstand in derselben Transaktion wie die Zählungen fortschreiben
+                    watermark.last_review_id = chunk[-1].id
+                    watermark.updated_at = datetime.now()
+                    session.commit()
+                    pbar.update(len(chunk))
+
+            return total
+
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
 
-            # Erstelle DataFrame
-            df_reviews = pd.DataFrame(reviews_data)
+    def extract_combinations(self, parsed):
 
-            results_combined = []
+        """
+        Extrahiert die Wortkombinationen eines Review-Stroms in Spaltenarrays. Jede Kombination wird
+        einmal in einem Vokabular abgelegt und danach nur noch über ihren Integer-Code referenziert.
+
+        Parameter
+        ----------
+        parsed : iterable of tuple
+            Tupel aus (Token-Tabelle, Kontext), siehe ``parse_reviews``.
 
-            grouped = df_reviews.groupby(['marke', 'produktname'])
+        Rückgabe
+        ----------
+        contexts : list
+            Die Kontexte der Reviews in Eingabereihenfolge.
+        columns : pandas.DataFrame
+            Eine Zeile pro Fundstelle mit den Spalten review (Position in ``contexts``),
+            kategorie (Code in ``KATEGORIEN``) und kombination (Code im Vokabular).
+        vocabulary : list of str
+            Die Kombinationen in Code-Reihenfolge.
+        """
+        vocabulary = {}
+        contexts = []
+        review_positions = []
+        category_codes = []
+        combination_codes = []
+        category_of_head = {'NOUN': 0, 'VERB': 1}
+
+        for position, (tokens, context) in enumerate(parsed):
+            contexts.append(context)
+            for lemma, pos, head in tokens:
+                if pos != 'ADJ':
+                    continue
+                head_lemma, head_pos, _ = tokens[head]
+                category = category_of_head.get(head_pos)
+                if category is None:
+                    continue
+                combo = f"{lemma} {head_lemma}"
+                code = vocabulary.get(combo)
+                if code is None:
+                    code = vocabulary[combo] = len(vocabulary)
+                review_positions.append(position)
+                category_codes.append(category)
+                combination_codes.append(code)
+
+        columns = pd.DataFrame({
+            "review": np.asarray(review_positions, dtype=np.int64),
+            "kategorie": np.asarray(category_codes, dtype=np.int8),
+            "kombination": np.asarray(combination_codes, dtype=np.int64),
+        })
+        return contexts, columns, list(vocabulary)
+
+    def _store_combinations(self, session, reviews):
+        parsed = self.parse_reviews((normalize_review_text(review.review), review) for review in reviews if review.review)
+        contexts, columns, vocabulary = self.extract_combinations(parsed)
+        if columns.empty:
+            return
+
+        # Review-Attribute per Index auf die Fundstellen übertragen (ein Array-Zugriff statt Python-Schleife)
+        positions = columns["review"].to_numpy()
+        columns["review_id"] = np.fromiter((review.id for review in contexts), np.int64, len(contexts))[positions]
+        columns["produkt_id"] = np.fromiter((review.produkt_id for review in contexts), np.int64, len(contexts))[positions]
+        columns["rating"] = np.fromiter((review.rating for review in contexts), np.int64, len(contexts))[positions]
+
+        per_review = columns.groupby(["review_id", "kategorie", "kombination"], sort=False).size()
+        per_product = columns.groupby(["produkt_id", "rating", "kategorie", "kombination"], sort=False).size()
+
+        session.execute(
+            insert(ReviewCombination.__table__).on_conflict_do_nothing(),
+            self._to_rows(per_review, vocabulary)
+        )
+        upsert_counts(session, ProductCombinationTotal, ["produkt_id", "rating", "kategorie", "kombination"],
+                      self._to_rows(per_product, vocabulary))
+
+    def _to_rows(self, counts, vocabulary):
+        # Codes erst beim Schreiben in die Datenbank wieder in Texte übersetzen
+        frame = counts.rename("anzahl").reset_index()
+        frame["kategorie"] = pd.Categorical.from_codes(frame["kategorie"], categories=list(self.KATEGORIEN))
+        frame["kombination"] = pd.Categorical.from_codes(frame["kombination"], categories=vocabulary)
+        return frame.astype({"kategorie": str, "kombination": str}).to_dict("records")
 
-            # Initialisiere den Fortschrittsbalken basierend auf der Anzahl der Gruppen (Marke/Produktname)
-            with tqdm(total=len(grouped), desc="Analyse-Fortschritt der gefilterten Gruppen") as pbar:
-                for (brand, product), group in grouped:
-                    reviews_texts = group['review'].tolist()
-                    adj_noun_combinations, verb_adj_combinations = self.analyze_reviews(reviews_texts)
+    def run_analysis(self):
 
-                    filtered_adj_noun_combinations = self.filter_combinations(adj_noun_combinations)
-                    filtered_verb_adj_combinations = self.filter_combinations(verb_adj_combinations)
+        """
+        Führt die Analyse durch: neue Reviews werden inkrementell ausgewertet, anschließend werden die
+        gespeicherten Kombinationen für den Rating-Filter abgefragt und in einer CSV-Datei gespeichert.
+        """
 
-                    for combo, count in filtered_adj_noun_combinations.items():
-                        results_combined.append({"marke": brand, "produktname": product, "kombination": combo, "anzahl": count})
+        self.run_buckets([self.bucket])
 
-                    for combo, count in filtered_verb_adj_combinations.items():
-                        results_combined.append({"marke": brand, "produktname": product, "kombination": combo, "anzahl": count})
+    def run_buckets(self, buckets, top_k=None):
 
-                    # Fortschrittsbalken nach jeder Verarbeitung einer Gruppe aktualisieren
-                    pbar.update(1)
+        """
+        Erstellt mehrere Auswertungen in einem Durchlauf. Das Modell wird nur einmal geladen und jedes
+        neue Review nur einmal geparst; danach wird pro Bucket nur noch die gespeicherte Summe abgefragt.
 
-            # Strukturierte Ergebnisse in DataFrame umwandeln und in CSV-Datei speichern
-            combined_df = pd.DataFrame(results_combined)
+        Parameter
+        ----------
+        buckets : list of AnalysisBucket
+            Die zu erstellenden Auswertungen.
+        top_k : int, optional
+            Wenn gesetzt, werden pro Bucket zusätzlich die k häufigsten Kombinationen je Marke
+            und über alle Produkte als eigene CSV-Dateien geschrieben.
 
-            # Stelle sicher, dass das Output-Verzeichnis existiert
-            os.makedirs(self.output_dir, exist_ok=True)
+        Zusätzlich wird pro Bucket die ungefilterte Produkt x Kombination-Matrix unter
+        ``output_dir/matrix/<analysis_filename>`` gespeichert (siehe ``CombinationMatrix``).
 
-            # Speichere DataFrame als CSV-Datei mit Timestamp
-            timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-            combined_df.to_csv(os.path.join(self.output_dir, f'{self.analysis_filename}_{timestamp}.csv'), index=False)
+        Rückgabe
+        ----------
+        list of str
+            Pfade der geschriebenen CSV-Dateien und Matrix-Verzeichnisse.
+        """
 
-        finally:
-            session.close()
\ No newline at end of file
+        self.update_combination_counts()
+
+        # Stelle sicher, dass das Output-Verzeichnis existiert
+        os.makedirs(self.output_dir, exist_ok=True)
+
+        # Alle Dateien eines Laufs bekommen denselben Timestamp
+        timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
+        output_files = []
+        for bucket in buckets:
+            with self.engine.connect() as connection:
+                frame = combination_reports.load_combination_frame(connection, bucket.rating_filter)
+            combined_df = combination_reports.aggregate_combinations(frame, bucket.min_count)
+            output_file = os.path.join(self.output_dir, f'{bucket.analysis_filename}_{timestamp}.csv')
+            combined_df.to_csv(output_file, index=False)
+            output_files.append(output_file)
+
+            # Matrix ohne Häufigkeitsfilter, damit Abfragen über alle Produkte die vollständigen Zählungen sehen
+            matrix_dir = os.path.join(self.output_dir, self.MATRIX_DIR, bucket.analysis_filename)
+            CombinationMatrix.from_combinations(combination_reports.aggregate_combinations(frame, 0)).save(matrix_dir)
+            output_files.append(matrix_dir)
+
+            if top_k:
+                reports = {
+                    f'top{top_k}_marken': combination_reports.top_k_per_group(combined_df, ["marke"], top_k),
+                    f'top{top_k}_gesamt': combination_reports.global_top_k(combined_df, top_k),
+                }
+                for report_name, report_df in reports.items():
+                    report_file = os.path.join(self.output_dir, f'{bucket.analysis_filename}_{report_name}_{timestamp}.csv')
+                    report_df.to_csv(report_file, index=False)
+                    output_files.append(report_file)
+        return output_files
@@ -1,11 +1,14 @@
-import time
-import random
 import logging
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from bs4 import BeautifulSoup
 from selenium.common.exceptions import NoSuchElementException, TimeoutException
+from DB.records import ReviewRecord
+from metrics import METRICS
+from scrapers.retry_policy import RetryPolicy, REVIEWS_FEHLEN, raise_for_status
+
+logger = logging.getLogger(__name__)
 
 
 class ReviewExtractor:
@@ -13,15 +16,18 @@ class ReviewExtractor:
     Eine Klasse, um Produktbewertungen von einer Produktseite zu extrahieren.
     """
 
-    def __init__(self, driver):
+    def __init__(self, driver, retry_policy=None):
         """
         Initialisiert die ReviewExtractor-Klasse.
 
         Parameter:
         driver (WebDriver): Der Selenium WebDriver.
+        retry_policy (RetryPolicy): Optional, Regeln für das Neuladen der Seite (Standard: RetryPolicy()).
         """
         self.driver = driver
+        self.retry_policy = retry_policy or RetryPolicy()
 
+    @METRICS.timed("crawler_parse_seconds", page="reviews")
     def extrahiere_reviews_von_seite(self, html):
         """
         Extrahiert alle Bewertungen von einer einzelnen Seite.
@@ -30,7 +36,7 @@ class ReviewExtractor:
         html (str): Der HTML-Quelltext der Seite.
 
         Rückgabe:
-        list: Eine Liste von Dictionaries mit den extrahierten Bewertungen.
+        list: Eine Liste von ReviewRecord-Datensätzen mit den extrahierten Bewertungen.
         """
         soup = BeautifulSoup(html, 'html.parser')
         reviews = []
@@ -65,19 +71,19 @@ class ReviewExtractor:
                     user_info_elements) > 0 else 'Unbekannt'
                 author_age = user_info_elements[1].get_text(strip=True) if len(user_info_elements) > 1 else 'Unbekannt'
 
-                reviews.append({
-                    'Reviewer': reviewer,
-                    'Review': review_text,
-                    'Rating': review_rating,
-                    'Date': review_date,
-                    'Author_Location': author_location,
-                    'Review_Count': review_count,
-                    'Review_Votes': review_votes,
-                    'Gender': author_gender,
-                    'Age': author_age
-                })
+                reviews.append(ReviewRecord(
+                    reviewer=reviewer,
+                    review=review_text,
+                    rating=review_rating,
+                    date=review_date,
+                    author_location=author_location,
+                    review_count=review_count,
+                    review_votes=review_votes,
+                    gender=author_gender,
+                    age=author_age
+                ))
             else:
-                logging.warning("Ein Rezensionselement konnte nicht vollständig extrahiert werden.")
+                logger.warning("Ein Rezensionselement konnte nicht vollständig extrahiert werden.")
         return reviews
 
     def check_for_reviews(self):
@@ -88,70 +94,77 @@ class ReviewExtractor:
         bool: True, wenn das Element gefunden wird, sonst False.
         """
         try:
-            reviews_container = WebDriverWait(self.driver, 15).until(
-                EC.presence_of_element_located((By.ID, 'BVRRContainer'))
-            )
-            logging.info("Review-Element gefunden. Extraktion kann beginnen.")
+            with METRICS.timer("crawler_wait_seconds", what="review_container"):
+                reviews_container = WebDriverWait(self.driver, 15).until(
+                    EC.presence_of_element_located((By.ID, 'BVRRContainer'))
+                )
+            logger.debug("Review-Element gefunden. Extraktion kann beginnen.")
             return True
         except TimeoutException:
-            logging.warning("Review-Element nicht gefunden.")
+            logger.warning("Review-Element nicht gefunden.")
             return False
 
     def extract_reviews(self, url, artikelnummer, produktname,
                         max_reviews=300):  # Erhöhen Sie die maximale Anzahl der Reviews auf 300
 
         reviews = []
-        self.driver.get(url)
-        logging.info(f"Extrahiere Reviews: {url}")
-
-        # Überprüfen, ob das Review-Element vorhanden ist, und gegebenenfalls die Seite neu laden (bis zu 5 Versuche)
-        for attempt in range(1, 6):
+        with METRICS.timer("crawler_fetch_seconds", page="reviews"):
+            self.driver.get(url)
+        raise_for_status(self.driver, url)
+        logger.debug("Extrahiere Reviews: %s", url)
+
+        # Überprüfen, ob das Review-Element vorhanden ist, und gegebenenfalls die Seite neu laden
+        # (Anzahl der Versuche und Wartezeit vor dem Neuladen legt die RetryPolicy fest)
+        for attempt in self.retry_policy.attempts(REVIEWS_FEHLEN):
+            if attempt > 1:
+                logger.warning("Versuch %s - Seite wird neu geladen.", attempt - 1)
+                with METRICS.timer("crawler_fetch_seconds", page="reviews_neu_laden"):
+                    self.driver.refresh()
+                raise_for_status(self.driver, url)
             if self.check_for_reviews():
                 break
-            else:
-                logging.warning(f"Versuch {attempt} - Seite wird neu geladen.")
-                self.driver.refresh()
-                time.sleep(random.randint(1, 6))  # Wartezeit nach dem Neuladen der Seite
-                if attempt == 5:
-                    logging.info("Keine Reviews nach 5 Neuladeversuchen gefunden. Beenden der Extraktion.")
-                    return reviews
+        else:
+            logger.info("Keine Reviews nach %s Versuchen gefunden. Beenden der Extraktion.", attempt)
+            return reviews
 
         # Scrollen, um sicherzustellen, dass die Seite vollständig geladen ist
-        for _ in range(2):  # Reduzierte Anzahl der Scrollvorgänge
-            self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-            WebDriverWait(self.driver, 1).until(lambda d: d.execute_script("return document.readyState") == "complete")
-            self.driver.execute_script("window.scrollTo(0, 0);")
-            WebDriverWait(self.driver, 1).until(lambda d: d.execute_script("return document.readyState") == "complete")
-
-        # Warten, bis die Seite vollständig geladen ist
-        WebDriverWait(self.driver, 20).until(
-            lambda d: d.execute_script("return document.readyState") == "complete"
-        )
+        with METRICS.timer("crawler_wait_seconds", what="reviews_ready_state"):
+            for _ in range(2):  # Reduzierte Anzahl der Scrollvorgänge
+                self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+                WebDriverWait(self.driver, 1).until(lambda d: d.execute_script("return document.readyState") == "complete")
+                self.driver.execute_script("window.scrollTo(0, 0);")
+                WebDriverWait(self.driver, 1).until(lambda d: d.execute_script("return document.readyState") == "complete")
+
+            # Warten, bis die Seite vollständig geladen ist
+            WebDriverWait(self.driver, 20).until(
+                lambda d: d.execute_script("return document.readyState") == "complete"
+            )
 
         # Erste Extraktion durchführen
-        time.sleep(2)  # Warten, um sicherzustellen, dass die Seite vollständig geladen ist
+        METRICS.sleep(2, reason="reviews_seite")  # Warten, um sicherzustellen, dass die Seite vollständig geladen ist
         html = self.driver.page_source
+        METRICS.inc("crawler_pages_total", page="reviews")
         extracted_reviews = self.extrahiere_reviews_von_seite(html)
         reviews.extend(extracted_reviews)
-        logging.info(f"{len(extracted_reviews)} neue Reviews extrahiert, insgesamt {len(reviews)} Reviews.")
+        logger.debug("%s neue Reviews extrahiert, insgesamt %s Reviews.", len(extracted_reviews), len(reviews))
 
         # Überprüfen der Anzahl der extrahierten Reviews
         if len(extracted_reviews) < 8:
-            logging.info("Weniger als 8 Reviews extrahiert, Beenden der Extraktion.")
-            logging.info(f"Insgesamt {len(reviews)} Reviews extrahiert.")
-            logging.info("=" * 100 + "\n")
+            logger.debug("Weniger als 8 Reviews extrahiert, Beenden der Extraktion.")
+            logger.info("Insgesamt %s Reviews extrahiert.", len(reviews), extra={"artikelnummer": artikelnummer})
             return reviews
 
         # Normale Überprüfung des "Weiter"-Buttons und Fortsetzung der Extraktion
         while len(reviews) < max_reviews:
             try:
-                next_button = WebDriverWait(self.driver, 20).until(
-                    EC.presence_of_element_located(
-                        (By.XPATH, '//*[@id="BVRRContainer"]/div/div/div/div/div[3]/div/ul/li[2]/a'))
-                )
+                with METRICS.timer("crawler_wait_seconds", what="reviews_weiter_button"):
+                    next_button = WebDriverWait(self.driver, 20).until(
+                        EC.presence_of_element_located(
+                            (By.XPATH, '//*[@id="BVRRContainer"]/div/div/div/div/div[3]/div/ul/li[2]/a'))
+                    )
                 if 'bv-content-pagination-buttons-item-disabled' in next_button.get_attribute('class') or len(
                         reviews) >= max_reviews:
-                    logging.info(
+                    logger.debug(
                         "Weiter-Button ist deaktiviert oder maximale Anzahl an Reviews erreicht, Beenden der Extraktion.")
                     break
                 else:
@@ -160,20 +173,21 @@ class ReviewExtractor:
                     # Klick mithilfe von JavaScript ausführen
                     self.driver.execute_script("arguments[0].click();", next_button)
                     # Warten, bis die neue Seite geladen ist
-                    WebDriverWait(self.driver, 10).until(
-                        lambda d: d.execute_script("return document.readyState") == "complete"
-                    )
-                    time.sleep(2)  # Warten, um sicherzustellen, dass die Seite vollständig geladen ist
+                    with METRICS.timer("crawler_fetch_seconds", page="reviews_weiter"):
+                        WebDriverWait(self.driver, 10).until(
+                            lambda d: d.execute_script("return document.readyState") == "complete"
+                        )
+                    METRICS.sleep(2, reason="reviews_seite")  # Warten, um sicherzustellen, dass die Seite vollständig geladen ist
 
                     # Extrahiere Reviews der nächsten Seite
                     html = self.driver.page_source
+                    METRICS.inc("crawler_pages_total", page="reviews")
                     extracted_reviews = self.extrahiere_reviews_von_seite(html)
                     reviews.extend(extracted_reviews)
-                    logging.info(f"{len(extracted_reviews)} neue Reviews extrahiert, insgesamt {len(reviews)} Reviews.")
+                    logger.debug("%s neue Reviews extrahiert, insgesamt %s Reviews.", len(extracted_reviews), len(reviews))
             except Exception as e:
-                logging.info("Kein 'Weiter'-Button gefunden, Beenden der Extraktion.")
+                logger.debug("Kein 'Weiter'-Button gefunden, Beenden der Extraktion.")
                 break
 
-        logging.info(f"Insgesamt {len(reviews)} Reviews extrahiert.")
-        logging.info("=" * 100 + "\n")
+        logger.info("Insgesamt %s Reviews extrahiert.", len(reviews), extra={"artikelnummer": artikelnummer})
         return reviews
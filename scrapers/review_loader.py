@@ -0,0 +1,102 @@
+from sqlalchemy import select, func, and_
+from DB.models import Product, Review, ReviewDuplicate
+
+
+# Nur die Spalten, die die Analyse tatsächlich benötigt; das Produkt wird per JOIN in derselben Abfrage geholt.
+# produkt_id ist hier products.id: reviews.produkt_id wird je Session vergeben (1..n) und identifiziert das
+# Produkt nur zusammen mit Datum und Uhrzeit der Session.
+REVIEW_COLUMNS = (
+    Review.id,
+    Review.review,
+    Review.rating,
+    Product.id.label("produkt_id"),
+    Product.marke,
+    Product.produktname,
+)
+
+
+def review_query(rating_filter=None, min_review_id=0, include_duplicates=False):
+    """
+    Erstellt die spaltenprojizierte Abfrage über Reviews und Produkte.
+
+    Parameter:
+    rating_filter (list of int): Optional, nur Reviews mit diesen Bewertungen.
+    min_review_id (int): Nur Reviews mit einer größeren ID (z.B. ein Analyse-Wasserstand).
+    include_duplicates (bool): Auch Reviews liefern, die beim Ingest als Duplikat markiert wurden.
+
+    Rückgabe:
+    sqlalchemy.Select: Die Abfrage ohne Sortierung.
+    """
+    query = (
+        select(*REVIEW_COLUMNS)
+        .join(Product, and_(Product.produkt_id == Review.produkt_id, Product.session_date == Review.session_date,
+                            Product.session_time == Review.session_time))
+        .where(Review.id > min_review_id)
+    )
+    if rating_filter:
+        query = query.where(Review.rating.in_(rating_filter))
+    if not include_duplicates:
+        # Jeder Duplikat-Cluster geht nur mit seinem Original in die Analyse ein
+        query = query.where(~select(ReviewDuplicate.review_id).where(ReviewDuplicate.review_id == Review.id).exists())
+    return query
+
+
+def count_reviews(session, rating_filter=None, min_review_id=0, include_duplicates=False):
+    """
+    Zählt die Reviews, die die Loader-Funktionen liefern würden (z.B. für Fortschrittsbalken).
+
+    Rückgabe:
+    int: Anzahl der Reviews.
+    """
+    subquery = review_query(rating_filter, min_review_id, include_duplicates).subquery()
+    return session.execute(select(func.count()).select_from(subquery)).scalar_one()
+
+
+def iter_review_chunks(session_factory, rating_filter=None, min_review_id=0, chunk_size=5000,
+                       include_duplicates=False):
+    """
+    Liefert Reviews nach ID sortiert in Blöcken (Keyset-Pagination). Jeder Block ist eine eigene,
+    kurze Abfrage, daher darf der Aufrufer zwischen den Blöcken in die Datenbank schreiben und committen.
+
+    Parameter:
+    session_factory (sessionmaker): Session-Factory für die Leseabfragen.
+    rating_filter (list of int): Optional, nur Reviews mit diesen Bewertungen.
+    min_review_id (int): Nur Reviews mit einer größeren ID.
+    chunk_size (int): Anzahl Reviews pro Block.
+    include_duplicates (bool): Auch als Duplikat markierte Reviews liefern.
+
+    Rückgabe:
+    generator of list: Blöcke von Zeilen mit den Attributen aus REVIEW_COLUMNS.
+    """
+    last_id = min_review_id
+    while True:
+        with session_factory() as session:
+            chunk = session.execute(
+                review_query(rating_filter, last_id, include_duplicates).order_by(Review.id).limit(chunk_size)
+            ).all()
+        if not chunk:
+            return
+        yield chunk
+        last_id = chunk[-1].id
+
+
+def stream_reviews(connection, rating_filter=None, min_review_id=0, yield_per=2000, include_duplicates=False):
+    """
+    Streamt Reviews nach Produkt sortiert über einen serverseitigen Cursor, ohne ORM-Objekte zu erzeugen.
+    Nur für reine Leseläufe gedacht: solange der Generator läuft, bleibt die Abfrage offen.
+
+    Parameter:
+    connection (sqlalchemy.engine.Connection): Eine offene Verbindung.
+    rating_filter (list of int): Optional, nur Reviews mit diesen Bewertungen.
+    min_review_id (int): Nur Reviews mit einer größeren ID.
+    yield_per (int): Anzahl der Zeilen, die pro Fetch aus dem Cursor gelesen werden.
+    include_duplicates (bool): Auch als Duplikat markierte Reviews liefern.
+
+    Rückgabe:
+    generator: Zeilen mit den Attributen aus REVIEW_COLUMNS.
+    """
+    query = review_query(rating_filter, min_review_id, include_duplicates).order_by(Product.id, Review.id)
+    result = connection.execution_options(yield_per=yield_per).execute(query)
+    for partition in result.partitions():
+        yield from partition
+
@@ -1,4 +1,3 @@
-import time
 import requests
 import logging
 from selenium import webdriver
@@ -8,9 +7,10 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from chromedriver_py import binary_path
 from scrapers.browser_settings import get_chrome_options, clear_cache
+from metrics import METRICS
+from scrapers.retry_policy import HttpStatusError
 
-# Konfiguration des Loggings
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
 
 
 class WebCrawler:
@@ -44,8 +44,9 @@ class WebCrawler:
         self.driver = webdriver.Chrome(service=self.svc, options=chrome_options)
 
         # Die angegebene URL laden
-        self.driver.get(self.url)
-        logging.info(f"WebDriver gestartet und URL {url} geladen.")
+        with METRICS.timer("crawler_fetch_seconds", page="start"):
+            self.driver.get(self.url)
+        logger.info("WebDriver gestartet und URL %s geladen.", url)
 
     def get_request_headers(self):
         """
@@ -64,24 +65,24 @@ class WebCrawler:
         """
         try:
             # SSL-Überprüfung deaktivieren
-            response = requests.get(self.url, headers=self.headers, verify=False)
+            with METRICS.timer("crawler_fetch_seconds", page="verbindungstest"):
+                response = requests.get(self.url, headers=self.headers, verify=False)
+            METRICS.inc("crawler_http_status_total", status=response.status_code)
             if response.status_code == 200:
-                logging.info(f"Verbindung zur URL {self.url} erfolgreich, Statuscode: {response.status_code}")
+                logger.info("Verbindung zur URL %s erfolgreich, Statuscode: %s", self.url, response.status_code)
             elif 400 <= response.status_code < 500:
-                logging.error(
-                    f"Client-Fehler bei der Verbindung zur URL {self.url}, Statuscode: {response.status_code}")
-                raise Exception(
-                    f"Client-Fehler: Kann nicht auf URL {self.url} zugreifen, Statuscode: {response.status_code}")
+                logger.error("Client-Fehler bei der Verbindung zur URL %s, Statuscode: %s", self.url,
+                             response.status_code)
+                raise HttpStatusError(self.url, response.status_code)
             elif 500 <= response.status_code < 600:
-                logging.error(
-                    f"Server-Fehler bei der Verbindung zur URL {self.url}, Statuscode: {response.status_code}")
-                raise Exception(
-                    f"Server-Fehler: Kann nicht auf URL {self.url} zugreifen, Statuscode: {response.status_code}")
+                logger.error("Server-Fehler bei der Verbindung zur URL %s, Statuscode: %s", self.url,
+                             response.status_code)
+                raise HttpStatusError(self.url, response.status_code)
         except requests.exceptions.SSLError as e:
-            logging.error(f"SSL-Fehler bei der Verbindung zur URL {self.url}: {e}")
+            logger.error("SSL-Fehler bei der Verbindung zur URL %s: %s", self.url, e)
             raise
         except Exception as e:
-            logging.error(f"Ein Fehler ist bei der Verbindung zur URL {self.url} aufgetreten: {e}")
+            logger.error("Ein Fehler ist bei der Verbindung zur URL %s aufgetreten: %s", self.url, e)
             raise
 
     def accept_cookies(self):
@@ -89,25 +90,27 @@ class WebCrawler:
         Akzeptiert Cookies auf der Webseite, falls vorhanden.
         """
         try:
-            logging.info("Versuche, das Cookie-Banner zu akzeptieren...")
+            logger.debug("Versuche, das Cookie-Banner zu akzeptieren...")
             # Warten, bis das Cookie-Banner geladen ist
             wait = WebDriverWait(self.driver, 15)
-            shadow_host = wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, 'div#usercentrics-root')))
+            with METRICS.timer("crawler_wait_seconds", what="cookie_banner"):
+                shadow_host = wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, 'div#usercentrics-root')))
 
             # Zugriff auf das Shadow DOM
             shadow_root = self.driver.execute_script('return arguments[0].shadowRoot', shadow_host)
 
             # Warten, bis der Akzeptieren-Button klickbar ist
-            accept_button = WebDriverWait(shadow_root, 15).until(
-                EC.element_to_be_clickable((By.CSS_SELECTOR, 'button[data-testid="uc-accept-all-button"]'))
-            )
+            with METRICS.timer("crawler_wait_seconds", what="cookie_button"):
+                accept_button = WebDriverWait(shadow_root, 15).until(
+                    EC.element_to_be_clickable((By.CSS_SELECTOR, 'button[data-testid="uc-accept-all-button"]'))
+                )
 
             # Akzeptieren-Button klicken
             accept_button.click()
-            logging.info("Cookies wurden akzeptiert.")
+            logger.info("Cookies wurden akzeptiert.")
         except Exception as e:
             # Fehlerbehandlung, falls etwas schiefgeht
-            logging.error(f"Ein Fehler ist beim Klicken auf den Cookie-Button aufgetreten: {e}")
+            logger.error("Ein Fehler ist beim Klicken auf den Cookie-Button aufgetreten: %s", e)
 
     def fetch_page_source(self) -> str:
         """
@@ -116,18 +119,17 @@ class WebCrawler:
         Rückgabe:
         str: Der HTML-Seitenquelltext.
         """
-        logging.info("Cookies werden akzeptiert, falls vorhanden.")
+        logger.debug("Cookies werden akzeptiert, falls vorhanden.")
         # Cookies akzeptieren, falls das Banner vorhanden ist
         self.accept_cookies()
 
         # Warten, bis die Seite vollständig geladen ist
-        logging.info("Warte, bis die Seite vollständig geladen ist...")
-        time.sleep(5)
+        logger.debug("Warte, bis die Seite vollständig geladen ist...")
+        METRICS.sleep(5, reason="seite_laden")
 
         # Seitenquelltext abrufen
         page_source = self.driver.page_source
-        logging.info("Seitenquelltext abgerufen.")
-        logging.info("=" * 100 + "\n\n")
+        logger.debug("Seitenquelltext abgerufen.")
         return page_source
 
     def close(self):
@@ -136,4 +138,4 @@ class WebCrawler:
         """
         # WebDriver schließen
         self.driver.quit()
-        logging.info("WebDriver geschlossen und Browser-Sitzung beendet.")
+        logger.info("WebDriver geschlossen und Browser-Sitzung beendet.")
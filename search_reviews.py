@@ -0,0 +1,39 @@
+import os
+import argparse
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from DB.search import init_search_index, search_reviews
+
+# Dynamischer Pfad zur SQLite-Datenbank
+db_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'DB', 'mueller_crawler.db')
+SQLALCHEMY_DATABASE_URL = f"sqlite:///{db_path}"
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Volltextsuche in den Review-Texten (SQLite FTS5).")
+    parser.add_argument("terms", nargs="+", help='Suchbegriffe bzw. Phrasen, z.B. "hält lange" "Flakon kaputt"')
+    parser.add_argument("--any", action="store_true", help="Mindestens ein Begriff statt aller Begriffe muss vorkommen")
+    parser.add_argument("--limit", type=int, default=20, help="Maximale Anzahl Treffer (Standard: 20)")
+    parser.add_argument("--rating", type=int, nargs="*", help="Nur Reviews mit diesen Bewertungen, z.B. --rating 1 2")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+    init_search_index(engine)
+
+    db = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    try:
+        hits = search_reviews(db, args.terms, limit=args.limit, match_any=args.any, rating_filter=args.rating)
+    finally:
+        db.close()
+
+    for hit in hits:
+        print(f"[{hit['rating']}★] {hit['marke']} - {hit['produktname']} (Review {hit['id']}, {hit['date']})")
+        print(f"    {hit['snippet']}")
+    print(f"{len(hits)} Treffer.")
+
+
+if __name__ == "__main__":
+    main()
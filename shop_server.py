@@ -0,0 +1,347 @@
+import os
+import re
+import json
+import time
+import html
+import random
+import logging
+import argparse
+import threading
+from collections import Counter, defaultdict
+from urllib.parse import urlsplit, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import pandas as pd
+
+# Lokaler Ersatz-Shop für reproduzierbare Last- und Ende-zu-Ende-Tests des Crawlers ohne mueller.de.
+# Liefert Kategorie-Listenseiten (?p=N), Produktseiten und Bazaarvoice-artige Review-Seiten (?bvpage=N) mit
+# derselben Struktur (CSS-Klassen, XPath-Pfade, Cookie-Banner im Shadow DOM), die die Extraktoren erwarten.
+# Grundlage ist der Datenbestand unter BACKUP/Anlyse/Data; mit --scale 10 bzw. 100 wird daraus ein größerer
+# Katalog erzeugt. Latenz und Fehlerquote sind pro Pfad und Versuch deterministisch (abhängig von --seed).
+#
+# Beispiel: python shop_server.py --scale 10 --latency-ms 200 --error-rate 0.02
+#           CRAWLER_URL=http://127.0.0.1:8766/parfuemerie/duefte-fuer-ihn/duefte/ python main.py
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8766
+CATEGORY_PATH = "/parfuemerie/duefte-fuer-ihn/duefte/"
+DATA_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), 'BACKUP', 'Anlyse', 'Data'))
+
+_SENTENCE_SPLIT = re.compile(r'(?<=[.!?])\s+')
+_INCENTIVE_NOTE = re.compile(r'^\[Diese Bewertung wurde nach Erhalt eines Anreizes.*?eingereicht\.\]\s*')
+_SLUG = re.compile(r'[^a-z0-9]+')
+e = html.escape
+
+
+class ShopCatalog:
+    """
+    Produkt- und Review-Katalog des Ersatz-Shops.
+
+    Produkt ``index`` ist Kopie ``index // n`` des Originalprodukts ``index % n`` (n = Anzahl Originalprodukte).
+    Kopie 0 ist das Original mit seinen echten Reviews. Weitere Kopien bekommen eine eigene Artikelnummer
+    und Reviews, die deterministisch aus Sätzen des gesamten Bestands zusammengesetzt werden. Dadurch werden
+    sie bei der Duplikaterkennung nicht als Kopien erkannt. Reviews werden erst beim Abruf erzeugt, auch bei
+    --scale 100 liegt nur der Originalbestand im Speicher.
+    """
+
+    def __init__(self, data_dir=DATA_DIR, scale=1, seed=42):
+        products = pd.read_csv(os.path.join(data_dir, 'products.csv'), sep=';', keep_default_na=False)
+        reviews = pd.read_csv(os.path.join(data_dir, 'reviews.csv'), sep=';', keep_default_na=False)
+        self.base_products = products.to_dict('records')
+        self.scale = scale
+        self.seed = seed
+
+        columns = ['reviewer', 'review', 'rating', 'date', 'author_location', 'review_count', 'review_votes',
+                   'gender', 'age']
+        self.base_reviews = defaultdict(list)
+        for review in reviews[columns + ['produkt_id']].to_dict('records'):
+            self.base_reviews[review.pop('produkt_id')].append(review)
+
+        # Satz- und Namensvorrat für die Reviews der Kopien
+        self.sentences = [sentence for text in reviews['review']
+                          for sentence in _SENTENCE_SPLIT.split(_INCENTIVE_NOTE.sub('', str(text))) if sentence]
+        self.reviewers = sorted(set(reviews['reviewer'].astype(str)))
+        self._index = {self.product(index)['artikelnummer']: index for index in range(len(self))}
+
+    def __len__(self):
+        return len(self.base_products) * self.scale
+
+    def product(self, index):
+        base = self.base_products[index % len(self.base_products)]
+        copy = index // len(self.base_products)
+        product = dict(base)
+        product['kopie'] = copy
+        product['artikelnummer'] = str(base['artikelnummer'])
+        if copy:
+            product['artikelnummer'] += f"{copy:03d}"
+            product['produktname'] = f"{base['produktname']} Nr. {copy}"
+        product['slug'] = f"{_SLUG.sub('-', str(base['produktname']).lower()).strip('-')}-{product['artikelnummer']}"
+        return product
+
+    def find(self, slug):
+        """Liefert den Index eines Produkts anhand seines URL-Slugs (Artikelnummer am Ende) oder None."""
+        return self._index.get(slug.rsplit('-', 1)[-1])
+
+    def reviews(self, index):
+        product = self.product(index)
+        originals = self.base_reviews.get(product['produkt_id'], [])
+        if not product['kopie']:
+            return originals
+        rng = random.Random(f"{self.seed}:{product['artikelnummer']}")
+        reviews = []
+        for original in originals:
+            review = dict(original)
+            review['reviewer'] = rng.choice(self.reviewers)
+            review['review'] = ' '.join(rng.choice(self.sentences) for _ in range(rng.randint(2, 4)))
+            reviews.append(review)
+        return reviews
+
+
+def _price(value):
+    return f"{float(value):.2f}".replace('.', ',') + " €"
+
+
+def _json_ld(product):
+    """schema.org-Produkt mit Offer und AggregateRating, wie es Shops für Suchmaschinen einbetten."""
+    offer = {"@type": "Offer", "priceCurrency": "EUR", "availability": "https://schema.org/InStock",
+             "price": f"{float(product['promo_preis'] if product['on_promo'] else product['preis']):.2f}"}
+    if product['on_promo']:
+        offer["priceSpecification"] = {"@type": "UnitPriceSpecification",
+                                       "priceType": "https://schema.org/StrikethroughPrice",
+                                       "price": f"{float(product['preis']):.2f}", "priceCurrency": "EUR"}
+    data = {"@context": "https://schema.org", "@type": "Product", "name": str(product['produktname']),
+            "sku": str(product['artikelnummer']), "brand": {"@type": "Brand", "name": str(product['marke'])},
+            "description": str(product['artikelbeschreibung']), "offers": offer}
+    if float(product['gesamtrating'] or 0) > 0:
+        data["aggregateRating"] = {"@type": "AggregateRating", "ratingValue": product['gesamtrating'],
+                                   "reviewCount": product['gesamtanzahl_reviews']}
+    # "</" im Text würde den Script-Block vorzeitig beenden
+    body = json.dumps(data, ensure_ascii=False, default=str).replace("</", "<\\/")
+    return f'<script type="application/ld+json">{body}</script>'
+
+
+def _page(title, main, head=""):
+    # Cookie-Banner wie bei Usercentrics: Schaltfläche im Shadow DOM von div#usercentrics-root
+    return f"""<!DOCTYPE html>
+<html lang="de"><head><meta charset="utf-8"><title>{e(title)} | Müller</title>{head}</head>
+<body><div id="page"><header class="mu-header"><nav class="mu-navigation"></nav></header>
+{main}
+<footer class="mu-footer"></footer></div>
+<div id="usercentrics-root"></div>
+<script>
+const ucRoot = document.getElementById('usercentrics-root').attachShadow({{mode: 'open'}});
+ucRoot.innerHTML = '<button data-testid="uc-accept-all-button">Alle akzeptieren</button>';
+ucRoot.querySelector('button').addEventListener('click', () => document.getElementById('usercentrics-root').remove());
+</script>
+</body></html>"""
+
+
+def render_listing(catalog, base_url, page, page_size, max_pages):
+    pages = max(1, -(-len(catalog) // page_size))
+    if max_pages:
+        pages = min(pages, max_pages)
+    tiles = []
+    for index in range((page - 1) * page_size, min(page * page_size, len(catalog))):
+        product = catalog.product(index)
+        promo = (f'<span class="mu-product-price__price--promo">{_price(product["promo_preis"])}</span>'
+                 if product['on_promo'] else '')
+        tiles.append(
+            f'<a class="mu-product-tile mu-product-list__item" href="{base_url}/p/{product["slug"]}/">'
+            f'<div class="mu-product-tile__brand">{e(product["marke"])}</div>'
+            f'<div class="mu-product-tile__name">{e(product["produktname"])}</div>'
+            f'<div class="mu-product-price__price-container"><span class="mu-product-price__price">'
+            f'{_price(product["preis"])}</span>{promo}</div></a>'
+        )
+    next_class = " disabled" if page >= pages else ""
+    main = f"""<main><h1>Düfte für Ihn</h1>
+<div class="mu-product-list">{''.join(tiles)}</div>
+<div class="mu-pagination"><span class="mu-pagination__page">{page} / {pages}</span>
+<button class="mu-pagination__navigation mu-pagination__navigation--next{next_class}">Weiter</button></div>
+</main>"""
+    return _page("Düfte für Ihn", main)
+
+
+def _review_item(review):
+    info = ''.join(f'<li><span class="bv-author-userinfo-value">{e(str(value))}</span></li>'
+                   for value in (review['gender'], review['age']) if value and value != 'Unbekannt')
+    location = (f'<div class="bv-author-location"><span>{e(str(review["author_location"]))}</span></div>'
+                if review['author_location'] and review['author_location'] != 'Unbekannt' else '')
+    return f"""<li class="bv-content-item bv-content-review">
+<div class="bv-author-profile"><h3 class="bv-author">{e(str(review['reviewer']))}</h3>{location}
+<ul><li class="bv-author-userstats-reviews"><span class="bv-author-userstats-value">{review['review_count']}</span></li>
+<li class="bv-author-userstats-votes"><span class="bv-author-userstats-value">{review['review_votes']}</span></li></ul>
+<ul class="bv-author-userinfo">{info}</ul></div>
+<div class="bv-content-rating"><span class="bv-rating-stars-container"><abbr title="{review['rating']} von 5 Sternen"></abbr></span></div>
+<div class="bv-content-datetime"><span class="bv-content-datetime-stamp">{e(str(review['date']))}</span></div>
+<div class="bv-content-summary-body-text"><p>{e(str(review['review']))}</p></div></li>"""
+
+
+def render_product(catalog, index, review_page, reviews_per_page, json_ld=True):
+    product = catalog.product(index)
+    promo = (f'<span class="mu-product-price__price--promo">{_price(product["promo_preis"])}</span>'
+             if product['on_promo'] else '')
+
+    # Verschachtelung entspricht den XPath-Angaben der Bewertungs-Schaltfläche im ProductExtractor
+    main = f"""<main><div><div><div>
+<div class="mu-product-details-page__gallery"></div>
+<div><div>
+<div><a class="mu-product-details-page__brand" href="#"><img src="" alt="{e(str(product['marke']))}"></a></div>
+<div><h1 class="mu-product-details-page__product-name">{e(str(product['produktname']))}</h1></div>
+<div><div><button class="mu-product-details-page__rating"><div></div><div>{product['gesamtrating']}</div><div><div>({product['gesamtanzahl_reviews']})</div></div></button></div></div>
+<div class="mu-product-details-page__article-number">Art.Nr. {product['artikelnummer']}</div>
+<div class="mu-product-price__price-container"><span class="mu-product-price__price">{_price(product['preis'])}</span>{promo}</div>
+</div></div>
+</div></div></div>
+<section><div class="mu-product-description__text">{e(str(product['artikelbeschreibung']))}</div></section>
+<section><table><tbody><tr><td>Inhaltsstoffe</td><td>{e(str(product['inhaltsstoffe']))}</td></tr></tbody></table></section>
+{render_reviews(catalog, index, review_page, reviews_per_page) if float(product['gesamtrating'] or 0) > 0 else ''}
+</main>"""
+    return _page(str(product['produktname']), main, _json_ld(product) if json_ld else "")
+
+
+def render_reviews(catalog, index, page, reviews_per_page):
+    reviews = catalog.reviews(index)
+    pages = max(1, -(-len(reviews) // reviews_per_page))
+    items = ''.join(_review_item(review) for review in reviews[(page - 1) * reviews_per_page:page * reviews_per_page])
+    previous_class = " bv-content-pagination-buttons-item-disabled" if page <= 1 else ""
+    next_class = " bv-content-pagination-buttons-item-disabled" if page >= pages else ""
+
+    # Verschachtelung entspricht dem XPath des Weiter-Links im ReviewExtractor
+    return f"""<div id="BVRRContainer"><div><div><div><div>
+<div class="bv-content-header-meta">Seite {page} von {pages}</div>
+<div><ol class="bv-content-list">{items}</ol></div>
+<div class="bv-content-pagination"><div><ul>
+<li><a class="bv-content-btn{previous_class}" href="?bvpage={max(page - 1, 1)}">Zurück</a></li>
+<li><a class="bv-content-btn{next_class}" href="?bvpage={min(page + 1, pages)}">Weiter</a></li>
+</ul></div></div></div></div></div></div></div>"""
+
+
+class ShopRequestHandler(BaseHTTPRequestHandler):
+    """
+    HTTP-Handler des Ersatz-Shops.
+
+    GET <Kategorie>?p=N       -> Listenseite N
+    GET /p/<slug>/?bvpage=N   -> Produktseite mit Review-Seite N
+    GET /__stats              -> Anzahl Anfragen und simulierte Fehler (JSON)
+    """
+
+    def _send(self, status, body, content_type="text/html; charset=utf-8"):
+        body = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _simulate(self, path):
+        """Latenz und Fehler pro Pfad und Versuch; ein erneuter Versuch derselben URL würfelt neu."""
+        server = self.server
+        with server.lock:
+            server.attempts[path] += 1
+            attempt = server.attempts[path]
+        rng = random.Random(f"{server.seed}:{path}:{attempt}")
+        delay = server.latency_ms + rng.uniform(0, server.jitter_ms)
+        if delay:
+            time.sleep(delay / 1000)
+        failed = rng.random() < server.error_rate
+        with server.lock:
+            server.stats["anfragen"] += 1
+            if failed:
+                server.stats["fehler"] += 1
+        return failed
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+        server = self.server
+        if url.path == "/__stats":
+            with server.lock:
+                self._send(200, json.dumps(dict(server.stats)), "application/json; charset=utf-8")
+            return
+        if url.path == "/favicon.ico":
+            self._send(404, "")
+            return
+
+        if self._simulate(self.path):
+            self._send(503, "<html><body><h1>Service Unavailable</h1></body></html>")
+            return
+
+        try:
+            if url.path == CATEGORY_PATH:
+                page = max(1, int(query.get("p", ["1"])[0]))
+                self._send(200, render_listing(server.catalog, server.base_url, page, server.page_size,
+                                               server.max_pages))
+                return
+            if url.path.startswith("/p/"):
+                index = server.catalog.find(url.path[3:].strip("/"))
+                if index is not None:
+                    page = max(1, int(query.get("bvpage", ["1"])[0]))
+                    self._send(200, render_product(server.catalog, index, page, server.reviews_per_page, server.json_ld))
+                    return
+        except ValueError:
+            self._send(400, "<html><body><h1>Bad Request</h1></body></html>")
+            return
+        self._send(404, "<html><body><h1>Seite nicht gefunden</h1></body></html>")
+
+    def log_message(self, format, *args):
+        logging.debug("%s - %s", self.address_string(), format % args)
+
+
+def create_server(host=DEFAULT_HOST, port=DEFAULT_PORT, scale=1, latency_ms=0, jitter_ms=0, error_rate=0.0,
+                  page_size=48, max_pages=0, reviews_per_page=8, seed=42, data_dir=DATA_DIR, json_ld=True):
+    """
+    Erstellt den Ersatz-Shop (noch nicht gestartet), z.B. für Lasttests im selben Prozess:
+    ``server = create_server(port=0); threading.Thread(target=server.serve_forever, daemon=True).start()``.
+    Die Kategorie-URL steht danach in ``server.category_url``.
+    """
+    server = ThreadingHTTPServer((host, port), ShopRequestHandler)
+    server.daemon_threads = True
+    server.catalog = ShopCatalog(data_dir, scale, seed)
+    server.base_url = f"http://{host}:{server.server_address[1]}"
+    server.category_url = server.base_url + CATEGORY_PATH
+    server.latency_ms = latency_ms
+    server.jitter_ms = jitter_ms
+    server.error_rate = error_rate
+    server.page_size = page_size
+    server.max_pages = max_pages
+    server.reviews_per_page = reviews_per_page
+    server.seed = seed
+    server.json_ld = json_ld
+    server.lock = threading.Lock()
+    server.attempts = Counter()
+    server.stats = Counter()
+    return server
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Startet den lokalen Ersatz-Shop für Crawler-Tests.")
+    parser.add_argument("--host", default=DEFAULT_HOST, help=f"Adresse (Standard: {DEFAULT_HOST})")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"Port (Standard: {DEFAULT_PORT})")
+    parser.add_argument("--scale", type=int, default=1, help="Katalog-Faktor, z.B. 10 oder 100 (Standard: 1)")
+    parser.add_argument("--latency-ms", type=float, default=0, help="Feste Antwortzeit je Seite in ms")
+    parser.add_argument("--jitter-ms", type=float, default=0, help="Zusätzliche zufällige Antwortzeit bis zu x ms")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Anteil der Antworten mit Status 503 (0-1)")
+    parser.add_argument("--page-size", type=int, default=48, help="Produkte pro Listenseite (Standard: 48)")
+    parser.add_argument("--max-pages", type=int, default=0, help="Maximale Anzahl Listenseiten (0 = alle)")
+    parser.add_argument("--reviews-per-page", type=int, default=8, help="Reviews pro Review-Seite (Standard: 8)")
+    parser.add_argument("--seed", type=int, default=42, help="Startwert für Katalog, Latenz und Fehler")
+    parser.add_argument("--no-json-ld", action="store_true",
+                        help="Produktseiten ohne JSON-LD ausliefern (testet die Selektoren des ProductExtractor)")
+    return parser.parse_args()
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    args = parse_args()
+    server = create_server(args.host, args.port, args.scale, args.latency_ms, args.jitter_ms, args.error_rate,
+                           args.page_size, args.max_pages, args.reviews_per_page, args.seed,
+                           json_ld=not args.no_json_ld)
+    logging.info(f"Ersatz-Shop mit {len(server.catalog)} Produkten bereit: {server.category_url}")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        logging.info("Ersatz-Shop beendet.")
+
+
+if __name__ == "__main__":
+    main()
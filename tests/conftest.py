@@ -0,0 +1,41 @@
+import os
+import sys
+import time
+import pytest
+
+# Verhaltenstests ohne Browser und Netzwerk: python -m pytest tests
+# Zeitabhängige Teile (Backoff, Circuit Breaker, Zeitbudget) laufen gegen eine künstliche Uhr.
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+
+sys.path.insert(0, REPO_ROOT)
+
+from metrics import METRICS  # noqa: E402
+
+
+class FakeClock:
+    """
+    Ersetzt time.monotonic; Pausen über METRICS.sleep stellen die Uhr nur vor, statt zu warten.
+    """
+
+    def __init__(self, start=1000.0):
+        self.now = start
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+    def sleep(self, seconds, reason):
+        self.sleeps.append((reason, seconds))
+        self.advance(seconds)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(time, "monotonic", fake.monotonic)
+    monkeypatch.setattr(METRICS, "sleep", fake.sleep)
+    return fake
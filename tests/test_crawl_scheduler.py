@@ -0,0 +1,53 @@
+from datetime import date
+from scrapers.crawl_scheduler import CrawlScheduler
+
+TODAY = date(2024, 9, 7)
+
+
+def _crawl(scheduler, items, stage, seconds_per_item, clock):
+    done = []
+    for item in scheduler.within_budget(items, stage):
+        done.append(item)
+        clock.advance(seconds_per_item)
+    return done
+
+
+def test_unlimited_budget_delivers_everything(clock):
+    scheduler = CrawlScheduler({}, today=TODAY)
+
+    assert _crawl(scheduler, list("abcde"), "produkte", 600, clock) == list("abcde")
+    assert scheduler.deferred == {"produkte": [], "reviews": []}
+
+
+def test_products_stop_before_review_share(clock):
+    # 10 Minuten Budget, davon 6 für Produkte; jeder Job dauert 100 s
+    scheduler = CrawlScheduler({}, budget_minutes=10, review_share=0.4, today=TODAY)
+
+    done = _crawl(scheduler, list("abcdefgh"), "produkte", 100, clock)
+
+    # Nach 3 Jobs (300 s) würde der vierte erst bei 400 s enden, also nach dem Produkt-Budget von 360 s
+    assert done == list("abc")
+    assert scheduler.deferred["produkte"] == list("defgh")
+
+
+def test_reviews_use_remaining_budget(clock):
+    scheduler = CrawlScheduler({}, budget_minutes=10, review_share=0.4, today=TODAY)
+    clock.advance(360)
+
+    done = _crawl(scheduler, [f"https://shop.test/{name}" for name in "abcd"], "reviews", 100, clock)
+
+    assert done == ["https://shop.test/a", "https://shop.test/b"]
+    assert scheduler.deferred["reviews"] == ["https://shop.test/c", "https://shop.test/d"]
+
+
+def test_deadline_follows_average_job_duration(clock):
+    scheduler = CrawlScheduler({}, budget_minutes=1, review_share=0.0, today=TODAY)
+    durations = iter([5, 5, 40])
+    done = []
+    for item in scheduler.within_budget(list("abcd"), "reviews", url_of=str.upper):
+        done.append(item)
+        clock.advance(next(durations))
+
+    # Nach dem 40-s-Job liegt das gleitende Mittel bei 0.3 * 40 + 0.7 * 5 = 15.5 s; 50 s + 15.5 s > 60 s
+    assert done == list("abc")
+    assert scheduler.deferred["reviews"] == ["D"]
@@ -0,0 +1,59 @@
+from types import SimpleNamespace
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+from DB import models
+from DB.dedup import review_signature, band_keys, flag_duplicates, SIMILARITY_THRESHOLD
+
+ORIGINAL = ("Der Duft hält den ganzen Tag und ist weder zu süß noch zu schwer. Meine Frau mag ihn sehr, "
+            "ich bekomme ständig Komplimente im Büro und werde ihn auf jeden Fall wieder kaufen.")
+# Dieselbe Review mit geändertem Schluss, wie sie der Shop z.B. für mehrere Größen eines Duftes anzeigt
+NEAR_DUPLICATE = ORIGINAL.replace("wieder kaufen.", "nachkaufen!")
+DIFFERENT = ("Leider riecht das Parfum auf meiner Haut nach kurzer Zeit nur noch nach Alkohol, "
+             "außerdem war der Flakon bei der Lieferung beschädigt und die Verpackung eingedrückt.")
+INCENTIVE = "[Diese Bewertung wurde nach Erhalt eines Anreizes (Gutschein, Rabatt, Gratisprobe etc.) eingereicht.] "
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    models.Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+def _reviews(*texts, start=1):
+    return [SimpleNamespace(id=index, review=text) for index, text in enumerate(texts, start)]
+
+
+def test_short_reviews_have_no_signature():
+    assert review_signature("Top, riecht gut!") is None
+    assert review_signature(ORIGINAL) is not None
+
+
+def test_incentive_note_is_ignored():
+    assert (review_signature(INCENTIVE + ORIGINAL) == review_signature(ORIGINAL)).all()
+
+
+def test_near_duplicates_share_a_band():
+    original, near, different = (band_keys(review_signature(text)) for text in (ORIGINAL, NEAR_DUPLICATE, DIFFERENT))
+    assert set(original) & set(near)
+    assert not set(original) & set(different)
+
+
+def test_flag_duplicates_within_batch(db):
+    duplicates = flag_duplicates(db, _reviews(ORIGINAL, NEAR_DUPLICATE, DIFFERENT, "Top!"))
+
+    assert [(row["review_id"], row["cluster_id"]) for row in duplicates] == [(2, 1)]
+    assert duplicates[0]["aehnlichkeit"] >= SIMILARITY_THRESHOLD
+    # Nur Originale kommen in den Index, kurze Reviews gar nicht
+    assert sorted(db.scalars(select(models.ReviewSignature.review_id))) == [1, 3]
+
+
+def test_flag_duplicates_against_stored_index(db):
+    assert flag_duplicates(db, _reviews(ORIGINAL, DIFFERENT)) == []
+
+    duplicates = flag_duplicates(db, _reviews(INCENTIVE + NEAR_DUPLICATE, start=10))
+
+    assert [(row["review_id"], row["cluster_id"]) for row in duplicates] == [(10, 1)]
@@ -0,0 +1,72 @@
+from DB.diff import compare_snapshots, snapshot_from_records, encode_change_set, decode_change_set
+from DB.records import ProductRecord, ReviewRecord
+
+
+def _product(produkt_id, artikelnummer, **values):
+    fields = dict(produkt_url=f"https://shop.test/p/{artikelnummer}", artikelnummer=artikelnummer,
+                  produktname=f"Duft {artikelnummer}", preis=29.99, promo_preis=None, waehrung="EUR", marke="Marke",
+                  artikelbeschreibung="Beschreibung", inhaltsstoffe="Alcohol", gesamtrating=4.5,
+                  gesamtanzahl_reviews=2, produkt_id=produkt_id)
+    fields.update(values)
+    return ProductRecord(**fields)
+
+
+def _review(produkt_id, review_id, text):
+    return ReviewRecord(reviewer="Kunde", review=text, rating=5, date="vor 2 Monaten", review_id=review_id,
+                        produkt_id=produkt_id)
+
+
+OLD_PRODUCTS = [_product(1, "100"), _product(2, "200"), _product(3, "300"), _product(4, "400")]
+OLD_REVIEWS = [_review(1, 1, "Gut"), _review(1, 2, "Sehr gut"), _review(2, 3, "Okay")]
+
+
+def test_classifies_changes():
+    # Neue Session: andere Produkt-IDs, 200 mit neuem Preis, 300 fehlt, 400 zurückgestellt, 500 neu
+    new_products = [_product(1, "200", preis=24.99, inhaltsstoffe="Aqua"), _product(2, "100"), _product(3, "500")]
+    new_reviews = [_review(2, 1, "Gut"), _review(2, 2, "Sehr gut"), _review(2, 9, "Neu dabei"),
+                   _review(1, 3, "Okay")]
+    old = snapshot_from_records("alt", OLD_PRODUCTS, OLD_REVIEWS)
+    new = snapshot_from_records("neu", new_products, new_reviews, skipped_products=["https://shop.test/p/400"])
+
+    change_set = compare_snapshots(old, new)
+
+    assert [entry.artikelnummer for entry in change_set.neu] == ["500"]
+    assert [entry.artikelnummer for entry in change_set.entfernt] == ["300"]
+    assert [entry.artikelnummer for entry in change_set.nicht_gecrawlt] == ["400"]
+    assert len(change_set.geaendert) == 1
+    change = change_set.geaendert[0]
+    assert change.artikelnummer == "200"
+    assert change.aenderungen == {"preis": [29.99, 24.99]}
+    assert change.texte == ["inhaltsstoffe"]
+    assert change_set.unveraendert == 1
+    assert [(entry.artikelnummer, entry.anzahl) for entry in change_set.neue_reviews] == [("100", 1)]
+    assert change_set.changed_urls() == {"https://shop.test/p/500", "https://shop.test/p/200",
+                                         "https://shop.test/p/100"}
+
+
+def test_identical_sessions_have_no_changes():
+    change_set = compare_snapshots(snapshot_from_records("alt", OLD_PRODUCTS, OLD_REVIEWS),
+                                   snapshot_from_records("neu", OLD_PRODUCTS, OLD_REVIEWS))
+
+    assert change_set.summary() == {"von": "alt", "bis": "neu", "neu": 0, "entfernt": 0, "geaendert": 0,
+                                    "unveraendert": 4, "nicht_gecrawlt": 0, "neue_reviews": 0}
+
+
+def test_reviews_not_counted_without_old_review_crawl():
+    old = snapshot_from_records("alt", OLD_PRODUCTS, [], skipped_reviews=["https://shop.test/p/100"])
+    new = snapshot_from_records("neu", OLD_PRODUCTS, OLD_REVIEWS)
+
+    change_set = compare_snapshots(old, new)
+
+    # Reviews von 100 wurden in der alten Session nicht gecrawlt, die von 200 schon (es gab nur keine)
+    assert [(entry.artikelnummer, entry.anzahl) for entry in change_set.neue_reviews] == [("200", 1)]
+
+
+def test_products_without_article_number_use_url():
+    old = snapshot_from_records("alt", [_product(1, None, produkt_url="https://shop.test/p/x", preis=10.0)])
+    new = snapshot_from_records("neu", [_product(1, None, produkt_url="https://shop.test/p/x", preis=12.0)])
+
+    change_set = decode_change_set(encode_change_set(compare_snapshots(old, new)))
+
+    assert [(entry.artikelnummer, entry.product_url) for entry in change_set.geaendert] == [
+        (None, "https://shop.test/p/x")]
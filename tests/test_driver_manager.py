@@ -0,0 +1,131 @@
+import random
+import pytest
+from selenium.common.exceptions import TimeoutException, WebDriverException
+
+# driver_manager importiert WebCrawler und damit chromedriver_py, auch wenn hier kein Browser startet
+pytest.importorskip("chromedriver_py")
+
+from scrapers.driver_manager import DriverManager  # noqa: E402
+from scrapers.retry_policy import RetryPolicy, CircuitBreakers, HttpStatusError, DRIVER, SONSTIGE, CLIENTFEHLER  # noqa: E402
+
+START_URL = "http://shop.test/"
+
+
+class FakeDriver:
+    def __init__(self):
+        self.alive = True
+
+    def execute(self, driver_command, params=None):
+        return None
+
+    def execute_script(self, script):
+        if not self.alive:
+            raise WebDriverException("chrome not reachable")
+        return 1
+
+    def set_page_load_timeout(self, seconds):
+        pass
+
+
+class FakeCrawler:
+    """Steht für WebCrawler: ein Browser je Instanz, ohne Prozess (kein Speicher-Recycling)."""
+
+    started = []
+
+    def __init__(self, url):
+        self.driver = FakeDriver()
+        self.closed = False
+        FakeCrawler.started.append(self)
+
+    def fetch_page_source(self):
+        return "<html></html>"
+
+    def close(self):
+        self.closed = True
+
+
+class Extractor:
+    """Liefert je URL das Ergebnis oder wirft der Reihe nach die vorgegebenen Fehler."""
+
+    def __init__(self, manager, failures):
+        self.manager = manager
+        self.failures = {url: list(errors) for url, errors in failures.items()}
+        self.calls = []
+
+    def __call__(self, url):
+        self.calls.append(url)
+        errors = self.failures.get(url)
+        if errors:
+            error = errors.pop(0)
+            if isinstance(error, WebDriverException) and "reachable" in str(error):
+                self.manager.crawler.driver.alive = False
+            raise error
+        return url.rsplit("/", 1)[1].upper()
+
+
+@pytest.fixture
+def manager(clock):
+    FakeCrawler.started = []
+    policy = RetryPolicy(breakers=CircuitBreakers(), rng=random.Random(1))
+    with DriverManager(START_URL, max_rss_mb=0, retry_policy=policy, crawler_factory=FakeCrawler) as drivers:
+        yield drivers
+
+
+def _urls(*names):
+    return [START_URL + name for name in names]
+
+
+def test_transient_error_is_requeued_after_backoff(manager, clock):
+    extract = Extractor(manager, {START_URL + "b": [TimeoutException("langsam")]})
+
+    results = list(manager.run(_urls("a", "b", "c"), extract))
+
+    # b wird nach dem Backoff wiederholt, c läuft in der Zwischenzeit weiter
+    assert [result for _, result in results] == ["A", "C", "B"]
+    assert extract.calls == _urls("a", "b", "c", "b")
+    assert [reason for reason, _ in clock.sleeps] == ["retry_warten"]
+    assert len(manager.dead_letters) == 0
+
+
+def test_crash_restarts_browser_and_retries_immediately(manager):
+    extract = Extractor(manager, {START_URL + "a": [WebDriverException("chrome not reachable")]})
+
+    results = list(manager.run(_urls("a", "b"), extract))
+
+    assert [result for _, result in results] == ["A", "B"]
+    assert manager.restarts == 1
+    assert len(FakeCrawler.started) == 2 and FakeCrawler.started[0].closed
+    assert manager.driver is FakeCrawler.started[1].driver
+
+
+def test_repeated_crashes_end_in_dead_letters(manager):
+    crash = WebDriverException("chrome not reachable")
+    extract = Extractor(manager, {START_URL + "a": [crash] * 3})
+
+    results = list(manager.run(_urls("a"), extract, retry_pass=False))
+
+    assert results == []
+    assert manager.restarts == 3
+    assert [(entry["fehlerklasse"], entry["versuche"]) for entry in manager.dead_letters.to_list()] == [(DRIVER, 3)]
+
+
+def test_second_pass_retries_dead_letters_except_client_errors(manager):
+    extract = Extractor(manager, {
+        START_URL + "a": [ValueError("unerwartet")],
+        START_URL + "b": [HttpStatusError(START_URL + "b", 404)],
+    })
+
+    results = list(manager.run(_urls("a", "b", "c"), extract))
+
+    assert [result for _, result in results] == ["C", "A"]
+    assert extract.calls == _urls("a", "b", "c", "a")
+    assert [entry["fehlerklasse"] for entry in manager.dead_letters.to_list()] == [CLIENTFEHLER]
+
+
+def test_no_second_pass_without_time(manager):
+    extract = Extractor(manager, {START_URL + "a": [ValueError("unerwartet")]})
+
+    results = list(manager.run(_urls("a", "b"), extract, keep_going=lambda: False))
+
+    assert [result for _, result in results] == ["B"]
+    assert [entry["fehlerklasse"] for entry in manager.dead_letters.to_list()] == [SONSTIGE]
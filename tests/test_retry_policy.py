@@ -0,0 +1,97 @@
+import random
+import pytest
+from selenium.common.exceptions import TimeoutException, NoSuchElementException, WebDriverException
+from scrapers.retry_policy import (
+    CircuitBreaker, CircuitBreakers, RetryPolicy, HttpStatusError, classify,
+    TIMEOUT, ELEMENT_FEHLT, DROSSELUNG, SERVERFEHLER, CLIENTFEHLER, DRIVER, SONSTIGE, REVIEWS_FEHLEN
+)
+
+URL = "http://shop.test/produkt"
+
+
+@pytest.mark.parametrize("error, kind", [
+    (HttpStatusError(URL, 429), DROSSELUNG),
+    (HttpStatusError(URL, 503), SERVERFEHLER),
+    (HttpStatusError(URL, 404), CLIENTFEHLER),
+    (TimeoutException("langsam"), TIMEOUT),
+    (NoSuchElementException("fehlt"), ELEMENT_FEHLT),
+    (WebDriverException("unknown error: session deleted because of page crash"), DRIVER),
+    (ValueError("unerwartet"), SONSTIGE),
+])
+def test_classify(error, kind):
+    assert classify(error) == kind
+
+
+def test_breaker_opens_after_threshold_and_doubles_cooldown(clock):
+    breaker = CircuitBreaker("shop.test", threshold=3, cooldown=60.0)
+
+    for _ in range(2):
+        breaker.record_failure(SERVERFEHLER)
+    breaker.before_request()
+    assert clock.sleeps == []
+
+    breaker.record_failure(TIMEOUT)
+    breaker.before_request()
+    assert clock.sleeps == [("breaker_pause", 60.0)]
+
+    # Erneut drei Fehler in Folge: die Pause verdoppelt sich
+    for _ in range(3):
+        breaker.record_failure(SERVERFEHLER)
+    breaker.before_request()
+    assert clock.sleeps[-1] == ("breaker_pause", 120.0)
+
+    # Ein Erfolg setzt Zähler und Pause zurück
+    breaker.record_success()
+    assert breaker.failures == 0 and breaker.cooldown == 60.0
+
+
+def test_breaker_ignores_errors_without_overload(clock):
+    breaker = CircuitBreaker("shop.test", threshold=2)
+
+    for kind in (ELEMENT_FEHLT, CLIENTFEHLER, DRIVER, SONSTIGE):
+        breaker.record_failure(kind)
+    breaker.before_request()
+
+    assert breaker.failures == 0 and clock.sleeps == []
+
+
+def test_throttling_spaces_requests(clock):
+    breaker = CircuitBreaker("shop.test", threshold=10)
+
+    breaker.record_failure(DROSSELUNG)
+    breaker.record_failure(DROSSELUNG)
+    assert breaker.interval == 2.0
+
+    breaker.before_request()
+    breaker.before_request()
+    assert clock.sleeps == [("breaker_abstand", 2.0)]
+
+    breaker.record_success()
+    assert breaker.interval == 1.0
+
+
+def test_breakers_are_shared_per_host():
+    breakers = CircuitBreakers(threshold=5)
+
+    assert breakers.for_url(URL) is breakers.for_url("http://shop.test/andere-seite")
+    assert breakers.for_url(URL) is not breakers.for_url("http://anderer-shop.test/")
+    assert breakers.for_url(URL).threshold == 5
+
+
+def test_backoff_is_capped():
+    policy = RetryPolicy(rng=random.Random(3))
+
+    delays = [policy.backoff(DROSSELUNG, attempt) for attempt in range(1, 12) for _ in range(20)]
+
+    assert all(0 <= delay <= 300.0 for delay in delays)
+    assert max(policy.backoff(ELEMENT_FEHLT, 1) for _ in range(50)) <= 1.0
+
+
+def test_attempts_wait_between_tries(clock):
+    policy = RetryPolicy(rng=random.Random(3))
+
+    attempts = list(policy.attempts(REVIEWS_FEHLEN))
+
+    assert attempts == [1, 2, 3, 4, 5]
+    assert [reason for reason, _ in clock.sleeps] == [f"retry_{REVIEWS_FEHLEN}"] * 4
+    assert not policy.should_retry(CLIENTFEHLER, 1)